@@ -0,0 +1,327 @@
+"""
+app/food_api.py
+──────────────────────────────────────────────────
+· 식약처 레시피 API(COOKRCP01) 비동기 수집기
+    - 커넥션 풀을 공유하는 httpx.AsyncClient 하나
+    - 토큰 버킷으로 초당 요청 수 제한 (FOOD_API_RATE / FOOD_API_BURST)
+    - 동시 요청 수 제한 (FOOD_API_CONCURRENCY)
+    - 네트워크 오류·5xx·429 는 지수 백오프로 재시도 (FOOD_API_RETRIES)
+    - 첫 페이지의 total_count 를 보고 나머지 페이지를 자동으로 요청
+· 응답 디스크 캐시 (FOOD_API_CACHE_DIR, 비우면 끔)
+    key = sha256(서비스 ID, 키워드, start, end) → {dir}/{서비스 ID}/{key[:2]}/{key}.json
+    - FOOD_API_MODE=live   : FOOD_API_CACHE_TTL 안의 캐시가 있으면 사용, 없으면 요청 후 저장
+    - FOOD_API_MODE=replay : 캐시만 사용 (TTL 무시, 없으면 FoodApiError) → 오프라인 재현
+· 사용 예
+      async with FoodSafetyClient() as api:
+          async for keyword, rows in api.iter_pages(["계란", "두부"]):
+              ...
+──────────────────────────────────────────────────
+"""
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import random
+import tempfile
+import time
+from typing import AsyncIterator, Dict, List, Optional, Sequence, Tuple
+from urllib.parse import quote
+
+import httpx
+
+API_KEY    = os.getenv("FOOD_SAFETY_API_KEY")
+SERVICE_ID = os.getenv("FOOD_SAFETY_SERVICE_ID", "COOKRCP01")
+# 부하 테스트 등에서 가짜 서버로 바꿀 수 있도록
+BASE_URL   = os.getenv("FOOD_SAFETY_BASE_URL", "http://openapi.foodsafetykorea.go.kr/api")
+PAGE_SIZE  = 100                      # 요청당 row 수
+
+FOOD_API_RATE        = float(os.getenv("FOOD_API_RATE", "4"))      # 초당 요청 수 (0 이면 제한 없음)
+FOOD_API_BURST       = int(os.getenv("FOOD_API_BURST", "4"))
+FOOD_API_CONCURRENCY = int(os.getenv("FOOD_API_CONCURRENCY", "4"))
+FOOD_API_RETRIES     = int(os.getenv("FOOD_API_RETRIES", "3"))
+FOOD_API_TIMEOUT     = float(os.getenv("FOOD_API_TIMEOUT", "10"))   # 초
+
+FOOD_API_MODE      = os.getenv("FOOD_API_MODE", "live")                       # live | replay
+FOOD_API_CACHE_DIR = os.getenv("FOOD_API_CACHE_DIR", "./food_api_cache")
+FOOD_API_CACHE_TTL = float(os.getenv("FOOD_API_CACHE_TTL", str(7 * 86400)))  # 초
+
+log = logging.getLogger("food_api")
+
+
+def page_url(keyword: str, start: int, end: int) -> str:
+    """재료명(RCP_PARTS_DTLS) 검색 결과의 start~end 번째 row (1부터, 양 끝 포함)."""
+    return (
+        f"{BASE_URL}/{API_KEY}/{SERVICE_ID}/json/{start}/{end}"
+        f"/RCP_PARTS_DTLS={quote(keyword)}"
+    )
+
+
+class FoodApiError(Exception):
+    """재시도해도 받지 못한 페이지 (replay 모드에서는 캐시에 없는 페이지)."""
+
+
+class ResponseCache:
+    """
+    페이지 응답(JSON)을 파일 하나씩 저장. 쓰기는 임시 파일 + os.replace 라
+    여러 프로세스가 같은 페이지를 동시에 저장해도 깨진 파일을 읽지 않습니다.
+    """
+
+    def __init__(self, root: str, ttl: float):
+        self.root = root
+        self.ttl  = ttl
+
+    def path(self, keyword: str, start: int, end: int) -> str:
+        raw = json.dumps([SERVICE_ID, keyword, start, end], ensure_ascii=False)
+        key = hashlib.sha256(raw.encode("utf-8")).hexdigest()
+        return os.path.join(self.root, SERVICE_ID, key[:2], f"{key}.json")
+
+    def get(self, keyword: str, start: int, end: int, max_age: Optional[float]) -> Optional[Dict]:
+        """캐시된 응답 본문. max_age 가 None 이면 오래된 것도 반환."""
+        try:
+            with open(self.path(keyword, start, end), encoding="utf-8") as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if max_age is not None and time.time() - entry["fetched_at"] > max_age:
+            return None
+        return entry["body"]
+
+    def put(self, keyword: str, start: int, end: int, body: Dict) -> None:
+        path = self.path(keyword, start, end)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        entry = {"service": SERVICE_ID, "keyword": keyword, "start": start, "end": end,
+                 "fetched_at": time.time(), "body": body}
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(entry, f, ensure_ascii=False)
+            os.replace(tmp, path)
+        except OSError:
+            log.warning("응답 캐시 저장 실패: %s", path, exc_info=True)
+            try:
+                os.remove(tmp)
+            except OSError:
+                pass
+
+
+response_cache: Optional[ResponseCache] = (
+    ResponseCache(FOOD_API_CACHE_DIR, FOOD_API_CACHE_TTL) if FOOD_API_CACHE_DIR else None
+)
+
+
+def _cached(keyword: str, start: int, end: int, mode: str,
+            max_age: Optional[float] = None) -> Optional[Dict]:
+    """max_age 를 주면 FOOD_API_CACHE_TTL 보다 짧게 제한 (replay 모드에서는 무시)."""
+    if mode == "replay":
+        body = response_cache.get(keyword, start, end, None) if response_cache else None
+        if body is None:
+            raise FoodApiError(f"replay 모드: 캐시에 없는 페이지 – {keyword} {start}~{end}")
+        return body
+    if response_cache is not None:
+        ttl = response_cache.ttl if max_age is None else min(response_cache.ttl, max_age)
+        return response_cache.get(keyword, start, end, ttl)
+    return None
+
+
+def _store(keyword: str, start: int, end: int, body: Dict) -> None:
+    # _parse 를 통과한(서비스 결과가 있는) 응답만 넘어옴
+    if response_cache is not None and SERVICE_ID in body:
+        response_cache.put(keyword, start, end, body)
+
+
+# 정상 / 결과 없음 (그 외 INFO-xxx, ERROR-xxx 는 인증키·호출 한도·요청 오류)
+_OK_CODES = ("INFO-000", "INFO-200")
+
+
+def _parse(body: Dict) -> Tuple[int, List[Dict]]:
+    """
+    응답 본문 → (total_count, rows).
+    인증키 오류·호출 한도 초과 등은 서비스 결과 없이 {"RESULT": …} 만 오므로 FoodApiError
+    → 빈 결과로 착각해 "수집 완료"로 기록하거나 캐시에 남기지 않음.
+    """
+    section = body.get(SERVICE_ID) if isinstance(body, dict) else None
+    result = (section if isinstance(section, dict) else body if isinstance(body, dict) else {}).get("RESULT") or {}
+    if not isinstance(section, dict) or result.get("CODE", "INFO-000") not in _OK_CODES:
+        raise FoodApiError(f"API 오류 응답: {result.get('CODE', '-')} {result.get('MSG', '')}".strip())
+    rows = section.get("row") or []
+    try:
+        total = int(section.get("total_count") or 0)
+    except ValueError:
+        total = len(rows)
+    return total, rows
+
+
+def fetch_rows(keyword: str, start: int = 1, end: int = PAGE_SIZE,
+               mode: str = FOOD_API_MODE) -> List[Dict]:
+    """
+    동기 단일 페이지 조회 (백그라운드 작업용). 캐시 → 없으면 요청 1회.
+    네트워크 오류·HTTP 오류·JSON 이상·API 오류 응답(RESULT 만 있는 본문)은 FoodApiError.
+    """
+    body = _cached(keyword, start, end, mode)
+    if body is None:
+        url = page_url(keyword, start, end)
+        try:
+            with httpx.Client(timeout=FOOD_API_TIMEOUT, trust_env=True) as client:
+                r = client.get(url)
+        except httpx.HTTPError as e:
+            raise FoodApiError(f"요청 오류: {e} – {url}") from e
+        if r.status_code != 200 or not r.text.strip():
+            raise FoodApiError(f"HTTP {r.status_code} – {url}")
+        try:
+            body = r.json()
+        except ValueError:
+            raise FoodApiError(f"JSON 파싱 실패 – {url}") from None
+        rows = _parse(body)[1]
+        _store(keyword, start, end, body)
+        return rows
+    return _parse(body)[1]
+
+
+class TokenBucket:
+    """rate 개/초로 채워지고 최대 capacity 개까지 쌓이는 토큰 버킷 (asyncio 용)."""
+
+    def __init__(self, rate: float, capacity: int):
+        self.rate     = rate
+        self.capacity = max(1, capacity)
+        self._tokens  = float(self.capacity)
+        self._t       = time.monotonic()
+        self._lock    = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        if self.rate <= 0:
+            return
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._t) * self.rate)
+                self._t = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+class FoodSafetyClient:
+    """
+    요청 하나하나가 버킷 토큰과 세마포어 슬롯을 얻은 뒤 나갑니다.
+    캐시 적중 페이지는 토큰/슬롯 없이 바로 반환.
+    cache_ttl 을 주면 그보다 오래된 캐시 페이지는 다시 요청 (FOOD_API_CACHE_TTL 이 상한).
+    """
+
+    def __init__(self, rate: float = FOOD_API_RATE, burst: int = FOOD_API_BURST,
+                 concurrency: int = FOOD_API_CONCURRENCY, retries: int = FOOD_API_RETRIES,
+                 timeout: float = FOOD_API_TIMEOUT, page_size: int = PAGE_SIZE,
+                 mode: str = FOOD_API_MODE, cache_ttl: Optional[float] = None):
+        if mode not in ("live", "replay"):
+            raise ValueError(f"알 수 없는 FOOD_API_MODE: {mode} (live | replay)")
+        self.mode      = mode
+        self.retries   = retries
+        self.page_size = page_size
+        self.cache_ttl = cache_ttl
+        self._bucket   = TokenBucket(rate, burst)
+        self._sem      = asyncio.Semaphore(max(1, concurrency))
+        self._client   = httpx.AsyncClient(
+            timeout=timeout,
+            limits=httpx.Limits(max_connections=max(1, concurrency)),
+        )
+        self.stats: Dict[str, int] = {"requests": 0, "retries": 0, "cache_hits": 0,
+                                      "failed_pages": 0, "rows": 0}
+
+    async def __aenter__(self) -> "FoodSafetyClient":
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        await self._client.aclose()
+
+    async def _get_json(self, url: str) -> Dict:
+        for attempt in range(self.retries + 1):
+            if attempt:
+                self.stats["retries"] += 1
+                # 0.5, 1, 2 … 초 + jitter
+                await asyncio.sleep(0.5 * 2 ** (attempt - 1) * (1 + random.random() / 2))
+            await self._bucket.acquire()
+            async with self._sem:
+                self.stats["requests"] += 1
+                try:
+                    r = await self._client.get(url)
+                except httpx.TransportError as e:
+                    log.warning("요청 오류 (%d/%d): %s – %s", attempt + 1, self.retries + 1, e, url)
+                    continue
+            if r.status_code == 429 or r.status_code >= 500:
+                log.warning("HTTP %s (%d/%d) – %s", r.status_code, attempt + 1, self.retries + 1, url)
+                continue
+            if r.status_code != 200:
+                raise FoodApiError(f"HTTP {r.status_code} – {url}")
+            try:
+                return r.json()
+            except ValueError:
+                log.warning("JSON 파싱 실패 (%d/%d) – %s", attempt + 1, self.retries + 1, url)
+        raise FoodApiError(f"{self.retries + 1}회 시도 실패 – {url}")
+
+    async def fetch_page(self, keyword: str, start: int, end: int) -> Tuple[int, List[Dict]]:
+        """(total_count, rows). 결과가 없으면 (0, []), API 오류 응답은 FoodApiError."""
+        body = _cached(keyword, start, end, self.mode, self.cache_ttl)
+        if body is not None:
+            self.stats["cache_hits"] += 1
+            total, rows = _parse(body)
+        else:
+            body = await self._get_json(page_url(keyword, start, end))
+            total, rows = _parse(body)
+            await asyncio.to_thread(_store, keyword, start, end, body)
+        self.stats["rows"] += len(rows)
+        return total, rows
+
+    async def iter_keyword(self, keyword: str,
+                           max_rows: Optional[int] = None) -> AsyncIterator[List[Dict]]:
+        """
+        키워드 하나의 결과를 페이지 단위로. 첫 페이지의 total_count 로 남은 페이지를 정해
+        동시에 요청하고, 끝나는 순서대로 내보냅니다. max_rows 로 전체 row 수를 제한.
+        """
+        first_end = self.page_size if max_rows is None else min(self.page_size, max_rows)
+        total, rows = await self.fetch_page(keyword, 1, first_end)
+        log.info("▶  %s: total_count=%d", keyword, total)
+        if rows:
+            yield rows
+        limit = total if max_rows is None else min(total, max_rows)
+        ranges = [(s, min(s + self.page_size - 1, limit))
+                  for s in range(first_end + 1, limit + 1, self.page_size)]
+        for fut in asyncio.as_completed([self.fetch_page(keyword, s, e) for s, e in ranges]):
+            try:
+                _, rows = await fut
+            except FoodApiError as e:
+                self.stats["failed_pages"] += 1
+                log.error("페이지 건너뜀: %s", e)
+                continue
+            if rows:
+                yield rows
+
+    async def iter_pages(self, keywords: Sequence[str],
+                         max_rows: Optional[int] = None) -> AsyncIterator[Tuple[str, List[Dict]]]:
+        """여러 키워드를 동시에 수집해 (keyword, rows) 를 도착 순서대로 내보냄."""
+        out: "asyncio.Queue[Optional[Tuple[str, List[Dict]]]]" = asyncio.Queue()
+
+        async def produce(kw: str):
+            try:
+                async for rows in self.iter_keyword(kw, max_rows):
+                    await out.put((kw, rows))
+            except FoodApiError as e:
+                self.stats["failed_pages"] += 1
+                log.error("키워드 건너뜀 (%s): %s", kw, e)
+            finally:
+                await out.put(None)
+
+        tasks = [asyncio.create_task(produce(kw)) for kw in keywords]
+        try:
+            remaining = len(tasks)
+            while remaining:
+                item = await out.get()
+                if item is None:
+                    remaining -= 1
+                else:
+                    yield item
+        finally:
+            for t in tasks:
+                t.cancel()
@@ -0,0 +1,312 @@
+"""
+app/ingest.py
+──────────────────────────────────────────────────
+· 식약처 레시피 row 묶음 → Recipe / IngredientMaster / IngredientRecipeMapping /
+  Instruction (/ UserRecipe) 일괄 삽입. 재료 수집 작업(app/ingredient_fetch.py)과 seed_data 가 공용으로 사용
+· 재료명 → IngredientMaster.id 는 프로세스 캐시(name_cache) 우선,
+  모르는 이름만 IN 조회 한 번 + 일괄 삽입 한 번으로 해결
+· 삽입은 dialect 별 upsert 로 중복을 무시
+    - MySQL            : INSERT … ON DUPLICATE KEY UPDATE (no-op)
+    - SQLite/Postgres  : INSERT … ON CONFLICT DO NOTHING
+  → 같은 재료/레시피를 동시에 넣는 백그라운드 작업끼리도 IntegrityError 없이 진행
+· ingest_items() 한 번 = 트랜잭션 하나 = 커밋 1회
+  묶음 삽입이 DB 오류로 실패하면 row 마다 savepoint 로 다시 넣고, 실패한 row 만 로그 후 건너뜀
+  → seed_data 와 재료 수집 작업이 같은 방식으로 나머지 레시피를 살림
+──────────────────────────────────────────────────
+"""
+from __future__ import annotations
+
+import logging
+import re
+import threading
+from typing import Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+
+from sqlalchemy import insert
+from sqlalchemy.dialects import mysql, postgresql, sqlite
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+from sqlmodel import Session, select
+
+from app.models import (
+    IngredientMaster,
+    IngredientRecipeMapping,
+    Instruction,
+    Recipe,
+    UserRecipe,
+)
+from app.recipe_summary import build_summary
+
+log = logging.getLogger("ingest")
+
+
+# ───────── row 파싱 ─────────────────────────────────────────
+def parse_parts_dtls(text: str) -> List[Tuple[str, float, str]]:
+    """
+    주어진 텍스트에서 쉼표/줄바꿈으로 분할한 후:
+    - ':'가 있으면 ':' 뒤 텍스트만 사용
+    - 괄호 전체 제거
+    - 수량(숫자)이 포함되지 않은 항목은 무시
+    - 수량/단위 제거 후 재료명만 추출
+    """
+    parts = re.split(r"[\n,]", text)
+    result = []
+
+    for part in parts:
+        part = part.strip()
+        if not part:
+            continue
+
+        # ":"가 있다면 뒷부분만 사용
+        if ":" in part:
+            part = part.split(":", 1)[-1].strip()
+
+        # 괄호 전체 제거
+        part = re.sub(r"\([^)]*\)", "", part).strip()
+
+        # 수량이 없으면 스킵 (숫자가 포함되지 않은 경우)
+        if not re.search(r"\d", part):
+            continue
+
+        # 한글과 공백만 남김
+        name_only = re.sub(r"[^가-힣\s]", "", part).strip()
+
+        if name_only:
+            result.append((name_only, 0.0, ""))
+
+    return result
+
+
+def _int(text: str | None) -> int | None:
+    """빈 문자열 → None, 그 외 int 변환."""
+    try:
+        return int(float(text)) if text and str(text).strip() else None
+    except ValueError:
+        return None
+
+
+def recipe_values(item: Dict) -> Optional[Dict]:
+    """API row → recipes 테이블 컬럼 값. 제목이 없으면 None (recipe_hash = 제목)."""
+    title = item.get("RCP_NM") or item.get("PRDLST_NM")
+    if not title:
+        return None
+    description = item.get("RCP_PARTS_DTLS") or item.get("PIC_URL")
+    return {
+        "name":                title,
+        "category":            item.get("RCP_PAT2") or item.get("PRDLST_DCNM"),    # e.g. 밥/죽/떡
+        "method":              item.get("RCP_WAY2"),                               # e.g. 끓이기 / 볶기
+        "description":         description,
+        "ingredients_summary": build_summary(description),
+        "calories":            _int(item.get("INFO_ENG") or item.get("NUTR_CONT1")),
+        "protein":             _int(item.get("INFO_PRO") or item.get("NUTR_CONT2")),
+        "carbs":               _int(item.get("INFO_CAR") or item.get("NUTR_CONT3")),
+        "fat":                 _int(item.get("INFO_FAT") or item.get("NUTR_CONT4")),
+        "sodium":              _int(item.get("INFO_NA") or item.get("NUTR_CONT5")),
+        "recipe_hash":         title,   # 👉 ‘제목’만으로 단순 중복 방지
+    }
+
+
+def instruction_steps(item: Dict) -> List[Tuple[int, str]]:
+    """MANUAL01 ··· MANUAL20 → [(step, text)] (빈 칸이 두 번 연속이면 중단)."""
+    steps, blank = [], 0
+    for i in range(1, 21):
+        txt = (item.get(f"MANUAL{i:02d}") or "").strip()
+        if not txt:
+            blank += 1
+            if blank >= 2:
+                break
+            continue
+        blank = 0
+        steps.append((i, txt))
+    return steps
+
+
+# ───────── 중복 무시 일괄 삽입 ──────────────────────────────
+def insert_ignore(db: Session, model, rows: Sequence[Dict], noop_col: str) -> None:
+    """
+    rows 를 한 문장으로 삽입하고 unique/PK 충돌 행은 건너뜀.
+    noop_col: MySQL ON DUPLICATE KEY UPDATE 에서 자기 자신으로 덮어쓸 컬럼
+    """
+    if not rows:
+        return
+    table = model.__table__
+    dialect = db.get_bind().dialect.name
+    if dialect == "mysql":
+        stmt = mysql.insert(table)
+        stmt = stmt.on_duplicate_key_update({noop_col: stmt.inserted[noop_col]})
+    elif dialect == "sqlite":
+        stmt = sqlite.insert(table).on_conflict_do_nothing()
+    elif dialect == "postgresql":
+        stmt = postgresql.insert(table).on_conflict_do_nothing()
+    else:
+        # upsert 구문이 없는 DB: 행마다 savepoint 로 충돌만 무시
+        for row in rows:
+            try:
+                with db.begin_nested():
+                    db.execute(insert(table).values(**row))
+            except IntegrityError:
+                pass
+        return
+    db.execute(stmt, list(rows))
+
+
+# ───────── 재료명 → id ─────────────────────────────────────
+class IngredientNameCache:
+    """
+    IngredientMaster.name → id (프로세스 단위).
+    재료 행은 지워지지 않으므로 만료 없이 보관하며, 커밋이 끝난 id 만 넣습니다
+    (롤백된 트랜잭션의 id 가 남지 않도록).
+    """
+
+    def __init__(self):
+        self._ids: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def lookup(self, names: Iterable[str]) -> Dict[str, int]:
+        with self._lock:
+            return {n: self._ids[n] for n in names if n in self._ids}
+
+    def update(self, ids: Dict[str, int]) -> None:
+        with self._lock:
+            self._ids.update(ids)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._ids.clear()
+
+    def size(self) -> int:
+        return len(self._ids)
+
+
+name_cache = IngredientNameCache()
+
+
+def _select_ingredient_ids(db: Session, names: Sequence[str]) -> Dict[str, int]:
+    if not names:
+        return {}
+    return dict(db.exec(
+        select(IngredientMaster.name, IngredientMaster.id)
+        .where(IngredientMaster.name.in_(list(names)))
+    ).all())
+
+
+def ingredient_ids(db: Session, names: Iterable[str]) -> Dict[str, int]:
+    """
+    재료명들의 IngredientMaster.id (없는 이름은 현재 트랜잭션에서 삽입, 커밋은 호출자 몫).
+    캐시에 없는 이름만 조회하고, 그래도 없는 이름은 한 번에 insert_ignore 후 다시 조회
+    → 다른 작업이 먼저 넣은 행이어도 그 id 를 그대로 받습니다.
+    """
+    names = list(dict.fromkeys(n for n in names if n))
+    ids = name_cache.lookup(names)
+    missing = [n for n in names if n not in ids]
+    if missing:
+        ids.update(_select_ingredient_ids(db, missing))
+        missing = [n for n in missing if n not in ids]
+    if missing:
+        insert_ignore(db, IngredientMaster, [{"name": n} for n in missing], "name")
+        ids.update(_select_ingredient_ids(db, missing))
+    return ids
+
+
+# ───────── 레시피 row 일괄 수집 ─────────────────────────────
+class IngestResult(NamedTuple):
+    recipe_ids:     List[int]               # 입력 row 순서의 레시피 id (중복 제거)
+    new_recipe_ids: List[int]               # 이번에 새로 들어간 레시피
+    mappings:       Dict[int, List[int]]    # 새 레시피 id → 재료 id (역색인 반영용)
+    skipped:        int = 0                 # 저장하지 못하고 건너뛴 row 수
+
+
+def _ingest(db: Session, by_hash: Dict[str, Tuple[Dict, Dict]], user_id: Optional[int]
+            ) -> Tuple[Dict[str, int], List[str], Dict[int, List[int]], Dict[str, int]]:
+    """
+    by_hash(recipe_hash → (recipes 컬럼 값, API row)) 삽입 (커밋은 호출자 몫).
+    반환: (recipe_hash → id, 새 hash, 새 레시피 id → 재료 id, 재료명 → id)
+    """
+    # 1) 레시피: 기존 hash 확인 → 새 것만 삽입 → 전체 id 조회
+    hashes = list(by_hash)
+    existing = set(db.exec(select(Recipe.recipe_hash).where(Recipe.recipe_hash.in_(hashes))).all())
+    new_hashes = [h for h in hashes if h not in existing]
+    insert_ignore(db, Recipe, [by_hash[h][0] for h in new_hashes], "recipe_hash")
+    recipe_id = dict(db.exec(
+        select(Recipe.recipe_hash, Recipe.id).where(Recipe.recipe_hash.in_(hashes))
+    ).all())
+
+    # 2) 새 레시피의 재료명 → id (캐시 / IN 조회 / 일괄 삽입)
+    parts = {
+        h: list(dict.fromkeys(n for n, _, _ in parse_parts_dtls(by_hash[h][1].get("RCP_PARTS_DTLS") or "")))
+        for h in new_hashes
+    }
+    name_ids = ingredient_ids(db, (n for names in parts.values() for n in names))
+
+    # 3) 매핑 / 조리 순서 / 사용자 연결
+    mappings = {recipe_id[h]: [name_ids[n] for n in parts[h] if n in name_ids]
+                for h in new_hashes if h in recipe_id}
+    insert_ignore(db, IngredientRecipeMapping, [
+        {"recipe_id": rid, "ingredient_id": iid}
+        for rid, iids in mappings.items() for iid in iids
+    ], "recipe_id")
+    insert_ignore(db, Instruction, [
+        {"recipe_id": recipe_id[h], "step": step, "instruction": txt}
+        for h in new_hashes if h in recipe_id
+        for step, txt in instruction_steps(by_hash[h][1])
+    ], "recipe_id")
+    if user_id is not None:
+        insert_ignore(db, UserRecipe, [
+            {"user_id": user_id, "recipe_id": recipe_id[h]} for h in hashes if h in recipe_id
+        ], "user_id")
+    return recipe_id, new_hashes, mappings, name_ids
+
+
+def ingest_items(db: Session, items: Sequence[Dict], user_id: Optional[int] = None) -> IngestResult:
+    """
+    API row 들을 한 트랜잭션으로 저장하고 커밋 1회.
+    · 이미 있는 레시피(recipe_hash)는 건드리지 않고, 새 레시피만 재료 매핑/조리 순서를 삽입
+    · user_id 를 주면 모든 레시피를 UserRecipe 로 연결
+    · 묶음 삽입이 DB 오류로 실패하면 row 마다 savepoint 로 다시 시도하고,
+      그래도 실패하는 row 는 로그를 남기고 건너뜀 (skipped)
+    그 밖의 실패(연결 끊김 등)는 롤백 후 예외를 그대로 올립니다.
+    """
+    by_hash: Dict[str, Tuple[Dict, Dict]] = {}
+    skipped = 0
+    for item in items:
+        try:
+            values = recipe_values(item)
+        except Exception as e:                  # dict 가 아닌 row 등
+            log.warning("레시피 row 건너뜀 (%s): %r", e, item)
+            skipped += 1
+            continue
+        if values is not None:
+            by_hash.setdefault(values["recipe_hash"], (values, item))
+    if not by_hash:
+        return IngestResult([], [], {}, skipped)
+
+    try:
+        try:
+            with db.begin_nested():
+                recipe_id, new_hashes, mappings, name_ids = _ingest(db, by_hash, user_id)
+        except SQLAlchemyError as e:
+            log.warning("레시피 %d건 일괄 저장 실패, 레시피 단위로 재시도: %s", len(by_hash), e)
+            recipe_id, new_hashes, mappings, name_ids = {}, [], {}, {}
+            for h, pair in by_hash.items():
+                try:
+                    with db.begin_nested():
+                        rid, new, mp, nids = _ingest(db, {h: pair}, user_id)
+                except SQLAlchemyError as e:
+                    log.warning("레시피 '%s' 건너뜀: %s", h, e)
+                    skipped += 1
+                    continue
+                recipe_id.update(rid)
+                new_hashes += new
+                mappings.update(mp)
+                name_ids.update(nids)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+
+    name_cache.update(name_ids)
+    hashes = list(by_hash)
+    return IngestResult(
+        [recipe_id[h] for h in hashes if h in recipe_id],
+        [recipe_id[h] for h in new_hashes if h in recipe_id],
+        mappings,
+        skipped,
+    )
@@ -0,0 +1,209 @@
+"""
+app/ingredient_fetch.py
+──────────────────────────────────────────────────
+· 냉장고 재료 추가 시의 레시피 수집(ingredient 작업, worker.py 에서 실행)을 재료명 단위로 합침
+    - 같은 프로세스에서 동시에 들어온 같은 재료 → 수집 1회를 함께 기다림 (single-flight)
+    - 다른 워커 프로세스와는 ingredient_fetch_log.fetching_since 임대로 한 곳만 수집
+    - INGREDIENT_FETCH_TTL 안에 수집된 재료는 API 호출 없이 저장된 recipe_ids 를 사용
+    - 수집은 FoodSafetyClient 로 total_count 만큼 페이지를 돌며 최대 INGREDIENT_FETCH_MAX_ROWS 건
+· 사용자별 UserRecipe 연결은 recipe_ids 로 처리 (네트워크 없음)
+· 수집한 레시피의 임베딩은 embed 작업으로 수집 기록과 같은 커밋에 넣음
+  → ingredient 작업이 done 이면 임베딩 요청도 작업 큐에 남아 있음 (워커가 죽어도 유실 없음)
+· run_ingredient_job(): 작업 큐(app/jobs.py) 의 ingredient 작업 처리기
+──────────────────────────────────────────────────
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import threading
+import time
+from concurrent.futures import Future
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional, Sequence
+
+from sqlalchemy import or_, update
+from sqlmodel import Session
+
+from app.db import engine
+from app.food_api import FoodApiError, FoodSafetyClient
+from app.ingest import ingest_items, ingredient_ids, insert_ignore, name_cache
+from app.jobs import enqueue
+from app.models import IngredientFetchLog, UserRecipe
+from recipe_rag_pipeline import EMBED_JOB
+
+INGREDIENT_FETCH_TTL   = float(os.getenv("INGREDIENT_FETCH_TTL", "86400"))   # 초
+INGREDIENT_FETCH_LEASE = float(os.getenv("INGREDIENT_FETCH_LEASE", "120"))   # 초
+# 재료 하나당 가져올 최대 row 수 (0 이면 total_count 전부)
+INGREDIENT_FETCH_MAX_ROWS = int(os.getenv("INGREDIENT_FETCH_MAX_ROWS", "1000"))
+POLL_SEC = 0.5
+
+log = logging.getLogger("ingredient_fetch")
+
+# 프로세스 단위 카운터
+fetch_stats: Dict[str, int] = {"fetches": 0, "fresh_hits": 0, "shared": 0, "waited": 0}
+
+
+class SingleFlight:
+    """같은 key 로 동시에 들어온 호출은 첫 호출(leader)의 결과/예외를 함께 받음."""
+
+    def __init__(self):
+        self._calls: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+
+    def do(self, key: str, fn: Callable[[], List[int]]) -> List[int]:
+        with self._lock:
+            fut = self._calls.get(key)
+            leader = fut is None
+            if leader:
+                fut = self._calls[key] = Future()
+        if not leader:
+            fetch_stats["shared"] += 1
+            return fut.result()
+        try:
+            fut.set_result(fn())
+        except BaseException as e:
+            fut.set_exception(e)
+        finally:
+            with self._lock:
+                del self._calls[key]
+        return fut.result()
+
+
+_flights = SingleFlight()
+_log = IngredientFetchLog.__table__.c
+
+
+def _now() -> datetime:
+    return datetime.utcnow()
+
+
+def _fresh_recipe_ids(db: Session, ingredient_id: int) -> Optional[List[int]]:
+    row = db.get(IngredientFetchLog, ingredient_id)
+    if row is not None and row.fetched_at is not None \
+            and row.fetched_at >= _now() - timedelta(seconds=INGREDIENT_FETCH_TTL):
+        return list(row.recipe_ids or [])
+    return None
+
+
+def _claim(db: Session, ingredient_id: int) -> bool:
+    """오래됐고 아무도 수집 중이 아니면(또는 임대 만료) fetching_since 를 잡음."""
+    insert_ignore(db, IngredientFetchLog, [{"ingredient_id": ingredient_id}], "ingredient_id")
+    now = _now()
+    res = db.execute(
+        update(IngredientFetchLog.__table__)
+        .where(_log.ingredient_id == ingredient_id)
+        .where(or_(_log.fetched_at.is_(None),
+                   _log.fetched_at < now - timedelta(seconds=INGREDIENT_FETCH_TTL)))
+        .where(or_(_log.fetching_since.is_(None),
+                   _log.fetching_since < now - timedelta(seconds=INGREDIENT_FETCH_LEASE)))
+        .values(fetching_since=now)
+    )
+    db.commit()
+    return res.rowcount == 1
+
+
+def _release(ingredient_id: int) -> None:
+    with Session(engine) as db:
+        db.execute(
+            update(IngredientFetchLog.__table__)
+            .where(_log.ingredient_id == ingredient_id)
+            .values(fetching_since=None)
+        )
+        db.commit()
+
+
+async def _fetch_items(name: str) -> List[Dict]:
+    """
+    재료명 검색 결과 전체 (최대 INGREDIENT_FETCH_MAX_ROWS 건).
+    중간 페이지가 하나라도 빠지면 FoodApiError → 일부만 "수집 완료"로 기록하지 않음
+    (받은 페이지는 응답 캐시에 남아 재시도 때 다시 요청하지 않음).
+    응답 캐시는 INGREDIENT_FETCH_TTL 보다 오래된 페이지를 쓰지 않음
+    → FOOD_API_CACHE_TTL(기본 7일)이 더 길어도 재수집 때 새 결과를 받음.
+    """
+    items: List[Dict] = []
+    async with FoodSafetyClient(cache_ttl=INGREDIENT_FETCH_TTL) as api:
+        async for rows in api.iter_keyword(name, INGREDIENT_FETCH_MAX_ROWS or None):
+            items.extend(rows)
+        if api.stats["failed_pages"]:
+            raise FoodApiError(f"'{name}' 페이지 {api.stats['failed_pages']}개 수집 실패")
+    return items
+
+
+def _fetch_and_store(ingredient_id: int, name: str) -> List[int]:
+    try:
+        items = asyncio.run(_fetch_items(name))
+        with Session(engine) as db:
+            result = ingest_items(db, items)
+            db.execute(
+                update(IngredientFetchLog.__table__)
+                .where(_log.ingredient_id == ingredient_id)
+                .values(fetched_at=_now(), row_count=len(items),
+                        recipe_ids=result.recipe_ids, fetching_since=None)
+            )
+            # 전체 recipe_ids: 이전 시도가 저장만 하고 죽었어도 임베딩 안 된 것은 여기서 다시 요청
+            if result.recipe_ids:
+                enqueue(db, EMBED_JOB, {"recipe_ids": result.recipe_ids})
+            db.commit()
+    except Exception:
+        _release(ingredient_id)
+        raise
+    fetch_stats["fetches"] += 1
+    # 재료 역색인(ingredient_index)은 API 프로세스가 추천 시 없는 레시피만 DB 에서 채움
+    log.info("'%s' 수집: row %d건, 신규 레시피 %d건, 건너뜀 %d건",
+             name, len(items), len(result.new_recipe_ids), result.skipped)
+    return result.recipe_ids
+
+
+def _recipe_ids_for(name: str) -> List[int]:
+    with Session(engine) as db:
+        ingredient_id = ingredient_ids(db, [name])[name]
+        db.commit()
+    name_cache.update({name: ingredient_id})
+
+    waited = False
+    while True:
+        with Session(engine) as db:
+            ids = _fresh_recipe_ids(db, ingredient_id)
+            if ids is not None:
+                fetch_stats["waited" if waited else "fresh_hits"] += 1
+                return ids
+            if _claim(db, ingredient_id):
+                break
+        # 다른 프로세스가 수집 중 → 끝나거나 임대가 만료될 때까지 대기
+        waited = True
+        time.sleep(POLL_SEC)
+    return _fetch_and_store(ingredient_id, name)
+
+
+def recipe_ids_for(name: str) -> List[int]:
+    """
+    재료명으로 검색되는 레시피 id.
+    최근 수집 기록이 있으면 그대로, 없으면 이 재료에 대해 한 곳에서만 수집합니다.
+    수집 실패(FoodApiError 등)는 같은 요청을 기다리던 호출들에도 전달됩니다.
+    """
+    return _flights.do(name, lambda: _recipe_ids_for(name))
+
+
+def link_user_recipes(user_id: int, recipe_ids: Sequence[int]) -> None:
+    with Session(engine) as db:
+        insert_ignore(db, UserRecipe, [
+            {"user_id": user_id, "recipe_id": rid} for rid in dict.fromkeys(recipe_ids)
+        ], "user_id")
+        db.commit()
+
+
+INGREDIENT_JOB = "ingredient"
+
+
+def run_ingredient_job(payload: Dict) -> Dict:
+    """
+    {"user_id", "name"} → 재료명 단위 수집 후 UserRecipe 연결.
+    FoodApiError 등 예외는 그대로 올려 작업 큐가 backoff 후 재시도하게 합니다.
+    """
+    user_id, name = payload["user_id"], payload["name"]
+    recipe_ids = recipe_ids_for(name)
+    link_user_recipes(user_id, recipe_ids)
+    log.info("'%s' → user_id=%s 레시피 %d건 연결", name, user_id, len(recipe_ids))
+    return {"recipe_count": len(recipe_ids)}
@@ -0,0 +1,146 @@
+"""
+app/jobs.py
+──────────────────────────────────────────────────
+· ingest_jobs 테이블 기반 작업 큐 (API 프로세스 → worker.py)
+    - enqueue()  : 호출자의 트랜잭션에 작업 한 건 추가 → 요청 데이터와 같은 커밋
+    - claim()    : queued 이고 run_after 가 지난 작업(또는 임대가 만료된 running 작업)을
+                   조건부 UPDATE 로 임대 → 여러 워커가 같은 작업을 동시에 잡지 않음
+                   (MySQL/Postgres 는 SELECT … FOR UPDATE SKIP LOCKED 로 후보끼리도 비켜감)
+    - renew()    : 실행 중인 작업의 임대 연장 (worker.py 가 JOB_HEARTBEAT_SEC 마다 호출)
+    - complete() : done + 결과 저장
+    - fail()     : attempts < max_attempts 면 지수 backoff 후 다시 queued, 아니면 failed
+  renew/complete/fail 은 (locked_by, attempts) 가 claim 때와 같을 때만 반영
+  → 임대가 다른 워커로 넘어간 뒤 늦게 끝난 쪽이 결과를 덮어쓰지 않음
+· 워커가 죽어 연장이 끊기면 locked_until(JOB_LEASE_SEC) 이 지난 뒤 다른 워커가 이어받음
+  (임대가 만료됐을 때 이미 시도 횟수를 다 쓴 작업은 failed)
+──────────────────────────────────────────────────
+"""
+from __future__ import annotations
+
+import os
+import random
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+from sqlalchemy import and_, func, or_, update
+from sqlmodel import Session, select
+
+from app.db import engine
+from app.models import IngestJob
+
+JOB_LEASE_SEC       = float(os.getenv("JOB_LEASE_SEC", "300"))
+JOB_HEARTBEAT_SEC   = float(os.getenv("JOB_HEARTBEAT_SEC", str(JOB_LEASE_SEC / 3)))
+JOB_MAX_ATTEMPTS    = int(os.getenv("JOB_MAX_ATTEMPTS", "5"))
+JOB_BACKOFF_SEC     = float(os.getenv("JOB_BACKOFF_SEC", "10"))
+JOB_BACKOFF_MAX_SEC = float(os.getenv("JOB_BACKOFF_MAX_SEC", "600"))
+
+QUEUED, RUNNING, DONE, FAILED = "queued", "running", "done", "failed"
+
+_job = IngestJob.__table__.c
+
+
+def _now() -> datetime:
+    return datetime.utcnow()
+
+
+def _claimable(now: datetime):
+    return or_(
+        and_(_job.status == QUEUED, _job.run_after <= now),
+        and_(_job.status == RUNNING, _job.locked_until < now, _job.attempts < _job.max_attempts),
+    )
+
+
+def enqueue(db: Session, kind: str, payload: Dict, max_attempts: Optional[int] = None) -> IngestJob:
+    """작업 추가 (flush 로 id 만 받고 커밋은 호출자 몫)."""
+    job = IngestJob(kind=kind, payload=payload, max_attempts=max_attempts or JOB_MAX_ATTEMPTS)
+    db.add(job)
+    db.flush()
+    return job
+
+
+def claim(worker_id: str, limit: int = 1) -> List[IngestJob]:
+    """실행할 작업을 최대 limit 건 임대 (attempts + 1). 반환 객체는 세션에서 분리된 상태."""
+    now = _now()
+    with Session(engine) as db:
+        # 임대 만료 + 시도 소진 → failed
+        db.execute(
+            update(IngestJob.__table__)
+            .where(_job.status == RUNNING)
+            .where(_job.locked_until < now)
+            .where(_job.attempts >= _job.max_attempts)
+            .values(status=FAILED, locked_by=None, locked_until=None, updated_at=now,
+                    last_error=func.coalesce(_job.last_error, "lease expired"))
+        )
+        ids = db.exec(
+            select(IngestJob.id).where(_claimable(now))
+            .order_by(IngestJob.id).limit(limit)
+            .with_for_update(skip_locked=True)
+        ).all()
+        claimed = []
+        for job_id in ids:
+            # SKIP LOCKED 가 없는 DB(SQLite)에서도 조건부 UPDATE 로 한 워커만 성공
+            res = db.execute(
+                update(IngestJob.__table__)
+                .where(_job.id == job_id)
+                .where(_claimable(now))
+                .values(status=RUNNING, locked_by=worker_id,
+                        locked_until=now + timedelta(seconds=JOB_LEASE_SEC),
+                        attempts=_job.attempts + 1, updated_at=now)
+            )
+            if res.rowcount == 1:
+                claimed.append(job_id)
+        db.commit()
+        if not claimed:
+            return []
+        jobs = db.exec(select(IngestJob).where(IngestJob.id.in_(claimed)).order_by(IngestJob.id)).all()
+        db.expunge_all()
+        return list(jobs)
+
+
+def _update_owned(job: IngestJob, worker_id: str, **values) -> bool:
+    """이 워커가 claim 한 그 시도(attempts)가 아직 임대 중일 때만 반영 (넘어갔으면 False)."""
+    with Session(engine) as db:
+        res = db.execute(
+            update(IngestJob.__table__)
+            .where(_job.id == job.id)
+            .where(_job.status == RUNNING)
+            .where(_job.locked_by == worker_id)
+            .where(_job.attempts == job.attempts)
+            .values(updated_at=_now(), **values)
+        )
+        db.commit()
+        return res.rowcount == 1
+
+
+def renew(job: IngestJob, worker_id: str) -> bool:
+    """임대를 지금부터 JOB_LEASE_SEC 로 연장. False 면 임대를 잃은 것(결과는 반영되지 않음)."""
+    return _update_owned(job, worker_id, locked_until=_now() + timedelta(seconds=JOB_LEASE_SEC))
+
+
+def _finish(job: IngestJob, worker_id: str, **values) -> bool:
+    return _update_owned(job, worker_id, locked_by=None, locked_until=None, **values)
+
+
+def complete(job: IngestJob, worker_id: str, result: Optional[Dict] = None) -> bool:
+    return _finish(job, worker_id, status=DONE, result=result, last_error=None)
+
+
+def backoff_sec(attempts: int) -> float:
+    """JOB_BACKOFF_SEC · 2^(attempts-1), 상한 JOB_BACKOFF_MAX_SEC, ±25% jitter."""
+    base = min(JOB_BACKOFF_MAX_SEC, JOB_BACKOFF_SEC * 2 ** max(0, attempts - 1))
+    return base * (0.75 + random.random() / 2)
+
+
+def fail(job: IngestJob, worker_id: str, error: str) -> bool:
+    """재시도가 남았으면 backoff 뒤로 미뤄 queued, 아니면 failed."""
+    if job.attempts >= job.max_attempts:
+        return _finish(job, worker_id, status=FAILED, last_error=error)
+    run_after = _now() + timedelta(seconds=backoff_sec(job.attempts))
+    return _finish(job, worker_id, status=QUEUED, run_after=run_after, last_error=error)
+
+
+def queue_stats() -> Dict[str, int]:
+    """status 별 작업 수."""
+    with Session(engine) as db:
+        rows = db.exec(select(IngestJob.status, func.count()).group_by(IngestJob.status)).all()
+    return {status: 0 for status in (QUEUED, RUNNING, DONE, FAILED)} | dict(rows)
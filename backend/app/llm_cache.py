@@ -0,0 +1,227 @@
+"""
+app/llm_cache.py
+──────────────────────────────────────────────────
+· generate_llm_recommendations 응답 캐시
+    key = sha256(정규화 쿼리, 후보 레시피 id 순서, 모델명, 프롬프트 지문)
+  같은 쿼리가 같은 후보를 만들면 OpenAI 호출 없이 바로 응답합니다.
+  프롬프트 지문(쿼리를 뺀 메시지: 시스템 문구 + 템플릿 + 후보 재료 요약)이 바뀌면
+  예전 프롬프트로 만든 응답은 (sqlite 에 남아 있어도) 쓰지 않습니다.
+· 저장소 (LLM_CACHE_BACKEND)
+    - memory : 프로세스 내 LRU (기본)
+    - sqlite : LLM_CACHE_PATH 파일 → 같은 호스트의 여러 워커가 공유
+    - none   : 캐시 끔
+· LLM_CACHE_TTL(초)이 지난 항목은 miss 로 보고 지우며, 크기는 LLM_CACHE_SIZE 로 제한
+──────────────────────────────────────────────────
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Sequence
+
+from recipe_rag_pipeline import _norm
+
+LLM_CACHE_BACKEND = os.getenv("LLM_CACHE_BACKEND", "memory")
+LLM_CACHE_SIZE    = int(os.getenv("LLM_CACHE_SIZE", "2048"))
+LLM_CACHE_TTL     = float(os.getenv("LLM_CACHE_TTL", "86400"))
+LLM_CACHE_PATH    = os.getenv("LLM_CACHE_PATH", "./llm_cache.sqlite3")
+
+log = logging.getLogger("llm_cache")
+
+
+class CacheBackend:
+    """직렬화된(JSON 문자열) 값을 TTL·크기 제한과 함께 보관하는 저장소."""
+
+    name = "base"
+
+    def get(self, key: str) -> Optional[str]:
+        raise NotImplementedError
+
+    def put(self, key: str, value: str) -> None:
+        raise NotImplementedError
+
+    def size(self) -> int:
+        raise NotImplementedError
+
+    def clear(self) -> None:
+        raise NotImplementedError
+
+
+class MemoryBackend(CacheBackend):
+    name = "memory"
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl     = ttl
+        self._data: "OrderedDict[str, tuple[float, str]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            if item[0] < time.time():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return item[1]
+
+    def put(self, key: str, value: str) -> None:
+        with self._lock:
+            self._data[key] = (time.time() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def size(self) -> int:
+        return len(self._data)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+
+class SQLiteBackend(CacheBackend):
+    """여러 워커가 같은 파일을 읽고 씀 (WAL). 조회 때 last_used 를 갱신해 LRU 로 정리."""
+
+    name = "sqlite"
+
+    def __init__(self, path: str, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl     = ttl
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=5, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS llm_responses ("
+            " key TEXT PRIMARY KEY, value TEXT NOT NULL,"
+            " expires_at REAL NOT NULL, last_used REAL NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS ix_llm_responses_last_used"
+            " ON llm_responses (last_used)"
+        )
+        self._conn.commit()
+
+    def get(self, key: str) -> Optional[str]:
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, expires_at FROM llm_responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            if row[1] < now:
+                self._conn.execute("DELETE FROM llm_responses WHERE key = ?", (key,))
+            else:
+                self._conn.execute(
+                    "UPDATE llm_responses SET last_used = ? WHERE key = ?", (now, key)
+                )
+            self._conn.commit()
+            return row[0] if row[1] >= now else None
+
+    def put(self, key: str, value: str) -> None:
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO llm_responses VALUES (?, ?, ?, ?)",
+                (key, value, now + self.ttl, now),
+            )
+            self._conn.execute("DELETE FROM llm_responses WHERE expires_at < ?", (now,))
+            self._conn.execute(
+                "DELETE FROM llm_responses WHERE key IN ("
+                " SELECT key FROM llm_responses ORDER BY last_used DESC"
+                " LIMIT -1 OFFSET ?)",
+                (self.maxsize,),
+            )
+            self._conn.commit()
+
+    def size(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM llm_responses").fetchone()[0]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM llm_responses")
+            self._conn.commit()
+
+
+class LLMResponseCache:
+    """
+    LLM 추천 결과(JSON 배열) 캐시 + 적중률/절약 토큰 통계 (통계는 프로세스 단위).
+    backend 가 None 이면 항상 miss 이고 저장하지 않습니다.
+    """
+
+    def __init__(self, backend: Optional[CacheBackend]):
+        self.backend = backend
+        self.hits   = 0
+        self.misses = 0
+        self.tokens_saved = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(query: str, candidate_ids: Sequence[int], model: str, prompt: str = "") -> str:
+        fingerprint = hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+        raw = json.dumps([_norm(query), [int(i) for i in candidate_ids], model, fingerprint],
+                         ensure_ascii=False, separators=(",", ":"))
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[List[dict]]:
+        if self.backend is None:
+            return None
+        raw = self.backend.get(key)
+        with self._lock:
+            if raw is None:
+                self.misses += 1
+                return None
+            entry = json.loads(raw)
+            self.hits += 1
+            self.tokens_saved += entry["tokens"]
+        return entry["data"]
+
+    def put(self, key: str, data: List[dict], tokens: int = 0) -> None:
+        if self.backend is None:
+            return
+        self.backend.put(key, json.dumps({"data": data, "tokens": tokens}, ensure_ascii=False))
+
+    def clear(self) -> None:
+        if self.backend is not None:
+            self.backend.clear()
+        with self._lock:
+            self.hits = self.misses = self.tokens_saved = 0
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "backend":      self.backend.name if self.backend else "none",
+                "size":         self.backend.size() if self.backend else 0,
+                "maxsize":      self.backend.maxsize if self.backend else 0,
+                "ttl_sec":      self.backend.ttl if self.backend else 0,
+                "hits":         self.hits,
+                "misses":       self.misses,
+                "hit_rate":     self.hits / total if total else 0.0,
+                "tokens_saved": self.tokens_saved,
+            }
+
+
+def create_llm_cache(backend: str = LLM_CACHE_BACKEND) -> LLMResponseCache:
+    if backend == "memory":
+        return LLMResponseCache(MemoryBackend(LLM_CACHE_SIZE, LLM_CACHE_TTL))
+    if backend == "sqlite":
+        log.info("LLM 응답 캐시: %s", LLM_CACHE_PATH)
+        return LLMResponseCache(SQLiteBackend(LLM_CACHE_PATH, LLM_CACHE_SIZE, LLM_CACHE_TTL))
+    if backend == "none":
+        return LLMResponseCache(None)
+    raise ValueError(f"알 수 없는 LLM_CACHE_BACKEND: {backend} (memory | sqlite | none)")
+
+
+llm_cache = create_llm_cache()
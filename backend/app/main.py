@@ -1,4 +1,7 @@
 import os
+import logging
+import threading
+import time
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -6,7 +9,11 @@ load_dotenv()
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from app.db import init_db
-from app.routers import ingredients, users, user_ingredients, recipes, rag
+from app.metrics import METRICS_ENABLED, SERVER_TIMING, ServerTimingMiddleware, metrics_response
+from app.routers import ingredients, users, user_ingredients, recipes, rag, health, jobs
+from recipe_rag_pipeline import warmup, query_cache, watch_embeddings
+
+log = logging.getLogger("startup")
 
 app = FastAPI(title="My Recipe RAG API")
 
@@ -20,14 +27,48 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Server-Timing"],
 )
 
+# 단계별 소요 시간 → Server-Timing 응답 헤더 (app/metrics.py)
+if SERVER_TIMING:
+    app.add_middleware(ServerTimingMiddleware)
+
+WARMUP_RETRY_SEC = float(os.getenv("WARMUP_RETRY_SEC", "5"))
+
+
+def _warmup_until_ready():
+    # Qdrant 가 아직 안 떠 있을 수 있으므로 성공할 때까지 재시도
+    while True:
+        try:
+            warmup()
+            return
+        except Exception:
+            log.exception("워밍업 실패 – %.0f초 후 재시도", WARMUP_RETRY_SEC)
+            time.sleep(WARMUP_RETRY_SEC)
+
+
 @app.on_event("startup")
 def on_startup():
     init_db()
+    # 모델 로드는 수 초가 걸리므로 별도 스레드에서; 끝나기 전까지 /health/ready 는 503
+    threading.Thread(target=_warmup_until_ready, name="warmup", daemon=True).start()
+    # 임베딩은 worker.py 에서 일어나므로 검색 결과 캐시 무효화는 DB 폴링으로
+    watch_embeddings()
+
+
+@app.on_event("shutdown")
+def on_shutdown():
+    # 적중 시 모아 둔 last_used 갱신 반영 (재시작 시 최근 사용 순 로드용)
+    query_cache.flush()
 
 app.include_router(users.router)
 app.include_router(user_ingredients.router)
 app.include_router(recipes.router)
 app.include_router(rag.router)
-app.include_router(ingredients.router)
\ No newline at end of file
+app.include_router(ingredients.router)
+app.include_router(health.router)
+app.include_router(jobs.router)
+
+if METRICS_ENABLED:
+    app.add_api_route("/metrics", metrics_response, methods=["GET"], include_in_schema=False)
\ No newline at end of file
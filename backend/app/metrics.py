@@ -0,0 +1,149 @@
+"""
+app/metrics.py
+──────────────────────────────────────────────────
+· 추천 파이프라인 단계별 지연 계측
+    encode / vector_search / overlap_sql / recipe_fetch / llm / assemble
+      with stage("encode"):
+          ...
+· METRICS_ENABLED=1 : Prometheus 히스토그램·카운터 + GET /metrics
+                      (prometheus_client 필요, 멀티 프로세스면 PROMETHEUS_MULTIPROC_DIR)
+· SERVER_TIMING=1   : 요청마다 Server-Timing 응답 헤더로 단계별 소요 시간(ms)
+· 둘 다 끄면 stage() 는 아무것도 하지 않는 공유 객체를 돌려줍니다.
+──────────────────────────────────────────────────
+"""
+from __future__ import annotations
+
+import contextlib
+import logging
+import os
+import time
+from contextvars import ContextVar
+from typing import Dict, Optional
+
+log = logging.getLogger("metrics")
+
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "0").lower() in ("1", "true", "yes")
+SERVER_TIMING   = os.getenv("SERVER_TIMING", "1").lower() in ("1", "true", "yes")
+
+STAGE_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+_stage_seconds = _candidates = _llm_tokens = None
+_llm_fallbacks = _llm_timeouts = _llm_hedges = None
+if METRICS_ENABLED:
+    try:
+        from prometheus_client import Counter, Histogram
+    except ImportError:
+        log.warning("METRICS_ENABLED 이지만 prometheus_client 가 없어 비활성화합니다")
+        METRICS_ENABLED = False
+    else:
+        _stage_seconds = Histogram(
+            "rag_stage_seconds", "추천 파이프라인 단계별 소요 시간", ["stage"],
+            buckets=STAGE_BUCKETS,
+        )
+        _candidates = Counter("rag_candidates_total", "벡터 검색이 돌려준 후보 수")
+        _llm_tokens = Counter("rag_llm_tokens_total", "LLM 사용 토큰 수", ["kind"])
+        _llm_fallbacks = Counter(
+            "rag_llm_fallbacks_total", "LLM 실패로 벡터 검색 결과로 대체한 횟수", ["reason"],
+        )
+        _llm_timeouts = Counter("rag_llm_timeouts_total", "LLM 단계 시간 초과 횟수")
+        _llm_hedges = Counter("rag_llm_hedges_total", "응답이 늦어 LLM 요청을 하나 더 보낸 횟수")
+
+# 요청 단위 {stage: 누적 초}. ServerTimingMiddleware 가 요청마다 새 dict 를 넣음
+_timings: ContextVar[Optional[Dict[str, float]]] = ContextVar("rag_stage_timings", default=None)
+
+
+class _Stage:
+    __slots__ = ("name", "t0")
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def __enter__(self):
+        self.t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        elapsed = time.perf_counter() - self.t0
+        if _stage_seconds is not None:
+            _stage_seconds.labels(self.name).observe(elapsed)
+        timings = _timings.get()
+        if timings is not None:
+            timings[self.name] = timings.get(self.name, 0.0) + elapsed
+        return False
+
+
+_NOOP = contextlib.nullcontext()
+
+
+def stage(name: str):
+    """단계 하나의 소요 시간을 재는 context manager (계측이 꺼져 있으면 no-op)."""
+    if METRICS_ENABLED or SERVER_TIMING:
+        return _Stage(name)
+    return _NOOP
+
+
+def count_candidates(n: int) -> None:
+    if _candidates is not None:
+        _candidates.inc(n)
+
+
+def count_llm_tokens(prompt: int, completion: int) -> None:
+    if _llm_tokens is not None:
+        _llm_tokens.labels("prompt").inc(prompt)
+        _llm_tokens.labels("completion").inc(completion)
+
+
+def count_llm_fallback(reason: str) -> None:
+    """reason: timeout / parse_error / api_error (시간 초과는 rag_llm_timeouts_total 에도)."""
+    if _llm_fallbacks is not None:
+        _llm_fallbacks.labels(reason).inc()
+        if reason == "timeout":
+            _llm_timeouts.inc()
+
+
+def count_llm_hedge() -> None:
+    if _llm_hedges is not None:
+        _llm_hedges.inc()
+
+
+def metrics_response():
+    """GET /metrics 본문 (Prometheus text format)."""
+    from fastapi import Response
+    from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, generate_latest
+
+    registry = REGISTRY
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        from prometheus_client import multiprocess
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    return Response(generate_latest(registry), media_type=CONTENT_TYPE_LATEST)
+
+
+class ServerTimingMiddleware:
+    """
+    요청마다 단계별 누적 시간을 모아 Server-Timing 헤더로 붙이는 ASGI 미들웨어.
+    스트리밍 응답은 헤더를 보내는 시점까지 끝난 단계만 포함됩니다.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        timings: Dict[str, float] = {}
+        token = _timings.set(timings)
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start" and timings:
+                value = ", ".join(f"{k};dur={v * 1000:.1f}" for k, v in timings.items())
+                message["headers"] = list(message.get("headers", [])) + [
+                    (b"server-timing", value.encode("latin-1"))
+                ]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _timings.reset(token)
@@ -4,7 +4,8 @@ from typing import Optional, List
 from datetime import datetime
 
 from sqlmodel import SQLModel, Field, Relationship
-from sqlalchemy import Column, String, JSON, DateTime, Integer, Float, UniqueConstraint, Text
+import numpy as np
+from sqlalchemy import Column, String, JSON, DateTime, Integer, Float, UniqueConstraint, Text, LargeBinary, Index
 from sqlalchemy.sql import func
 
 
@@ -69,6 +70,8 @@ class Recipe(SQLModel, table=True):
         default=None,
         sa_column=Column(Text)      # ← VARCHAR → TEXT 로 확장
     )
+    # LLM 프롬프트용 재료 요약 (app/recipe_summary.py 의 build_summary)
+    ingredients_summary: Optional[str] = Field(default=None, sa_column=Column(Text))
     calories:     Optional[int]
     protein:      Optional[int]
     carbs:        Optional[int]
@@ -124,8 +127,74 @@ class UserRecipe(SQLModel, table=True):
     recipe_id: int = Field(foreign_key="recipes.id", primary_key=True)
 
 
+# 저장 dtype → little-endian numpy dtype
+EMBEDDING_DTYPES = {"float32": "<f4", "float16": "<f2"}
+
+
 class RecipeEmbedding(SQLModel, table=True):
     __tablename__ = "recipe_embeddings"
 
-    recipe_id: int         = Field(foreign_key="recipes.id", primary_key=True)
-    embedding: List[float] = Field(sa_column=Column(JSON, nullable=False))
+    recipe_id:  int   = Field(foreign_key="recipes.id", primary_key=True)
+    # 벡터 원시 바이트 (JSON 텍스트 대비 float32 기준 수 배 작음)
+    vector:     bytes = Field(sa_column=Column(LargeBinary, nullable=False))
+    dtype:      str   = Field(default="float32", sa_column=Column(String(16), nullable=False))
+    dim:        int   = Field(sa_column=Column(Integer, nullable=False))
+    model_name: str   = Field(sa_column=Column(String(255), nullable=False))
+
+    @classmethod
+    def from_array(cls, recipe_id: int, vec, model_name: str, dtype: str = "float32") -> "RecipeEmbedding":
+        arr = np.asarray(vec, dtype=EMBEDDING_DTYPES[dtype]).ravel()
+        return cls(
+            recipe_id=recipe_id,
+            vector=arr.tobytes(),
+            dtype=dtype,
+            dim=arr.shape[0],
+            model_name=model_name,
+        )
+
+    @staticmethod
+    def stack(blobs: List[bytes], dtype: str = "float32", dim: Optional[int] = None) -> np.ndarray:
+        """같은 dtype 의 벡터 바이트들을 한 번의 버퍼 읽기로 (n, dim) float32 행렬로 변환."""
+        if not blobs:
+            return np.empty((0, dim or 0), dtype=np.float32)
+        flat = np.frombuffer(b"".join(blobs), dtype=EMBEDDING_DTYPES[dtype])
+        return flat.reshape(len(blobs), dim or -1).astype(np.float32, copy=False)
+
+
+class IngredientFetchLog(SQLModel, table=True):
+    """
+    재료명별 식약처 API 수집 기록 (app/ingredient_fetch.py).
+    fetched_at 이 INGREDIENT_FETCH_TTL 안이면 다시 호출하지 않고 recipe_ids 로 UserRecipe 연결.
+    fetching_since 는 수집 중인 프로세스의 임대 시작 시각 (끝나면 NULL).
+    """
+    __tablename__ = "ingredient_fetch_log"
+
+    ingredient_id:  int                = Field(foreign_key="ingredient_master.id", primary_key=True)
+    fetched_at:     Optional[datetime] = Field(default=None, sa_column=Column(DateTime, nullable=True))
+    row_count:      int                = Field(default=0, sa_column=Column(Integer, nullable=False, server_default="0"))
+    recipe_ids:     Optional[List[int]] = Field(default=None, sa_column=Column(JSON, nullable=True))
+    fetching_since: Optional[datetime] = Field(default=None, sa_column=Column(DateTime, nullable=True))
+
+
+class IngestJob(SQLModel, table=True):
+    """
+    백그라운드 수집 작업 큐 (app/jobs.py, worker.py).
+    status: queued → running → done | failed (실패 시 run_after 까지 미룬 뒤 다시 queued)
+    running 인 작업은 locked_until 까지 locked_by 워커가 임대, 만료되면 다른 워커가 가져감.
+    """
+    __tablename__ = "ingest_jobs"
+    __table_args__ = (Index("ix_ingest_jobs_status_run_after", "status", "run_after"),)
+
+    id:           Optional[int]      = Field(default=None, primary_key=True)
+    kind:         str                = Field(sa_column=Column(String(50), nullable=False))
+    payload:      dict               = Field(default_factory=dict, sa_column=Column(JSON, nullable=False))
+    status:       str                = Field(default="queued", sa_column=Column(String(20), nullable=False))
+    attempts:     int                = Field(default=0, sa_column=Column(Integer, nullable=False, server_default="0"))
+    max_attempts: int                = Field(default=5, sa_column=Column(Integer, nullable=False, server_default="5"))
+    run_after:    datetime           = Field(default_factory=datetime.utcnow, sa_column=Column(DateTime, nullable=False))
+    locked_by:    Optional[str]      = Field(default=None, sa_column=Column(String(100), nullable=True))
+    locked_until: Optional[datetime] = Field(default=None, sa_column=Column(DateTime, nullable=True))
+    last_error:   Optional[str]      = Field(default=None, sa_column=Column(Text, nullable=True))
+    result:       Optional[dict]     = Field(default=None, sa_column=Column(JSON, nullable=True))
+    created_at:   datetime           = Field(default_factory=datetime.utcnow, sa_column=Column(DateTime, nullable=False))
+    updated_at:   datetime           = Field(default_factory=datetime.utcnow, sa_column=Column(DateTime, nullable=False))
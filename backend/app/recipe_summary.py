@@ -0,0 +1,102 @@
+"""
+app/recipe_summary.py
+──────────────────────────────────────────────────
+· Recipe.description(RCP_PARTS_DTLS) → LLM 프롬프트용 재료 요약
+    "계란 2개, 양파 1/2개(100g)" → "계란, 양파"
+· 레시피마다 한 번만 계산해 Recipe.ingredients_summary 에 저장합니다.
+  (수집 시점에 채우고, 기존 행은 아래 backfill 로 채움)
+· RECIPE_SUMMARY_MAX_CHARS 를 넘으면 재료 단위로 잘라 프롬프트 토큰을 제한
+      $ python -m app.recipe_summary            # 비어 있는 행만
+      $ python -m app.recipe_summary --all      # 전체 다시 계산
+──────────────────────────────────────────────────
+"""
+from __future__ import annotations
+
+import argparse
+import logging
+import os
+import re
+from typing import List, Optional
+
+from sqlmodel import Session, select
+
+RECIPE_SUMMARY_MAX_CHARS = int(os.getenv("RECIPE_SUMMARY_MAX_CHARS", "160"))
+
+log = logging.getLogger("recipe_summary")
+
+
+def extract_ingredient_names(text: str) -> str:
+    parts = re.split(r"[\n,]", text)
+    ingredients = []
+    for part in parts:
+        cleaned = re.sub(
+            r"\s*\d+(?:\.\d+)?\s*[^\s()]*\s*(?:\([^)]*\))?",
+            "",
+            part
+        ).strip()
+        if cleaned:
+            ingredients.append(cleaned)
+    return ", ".join(ingredients)
+
+
+def build_summary(description: Optional[str], max_chars: int = RECIPE_SUMMARY_MAX_CHARS) -> str:
+    """중복 재료를 빼고, max_chars 안에 들어가는 앞쪽 재료까지만 ", " 로 연결."""
+    names = list(dict.fromkeys(
+        n for n in extract_ingredient_names(description or "").split(", ") if n
+    ))
+    summary = ""
+    for name in names:
+        candidate = f"{summary}, {name}" if summary else name
+        if len(candidate) > max_chars:
+            break
+        summary = candidate
+    return summary
+
+
+def ingredient_names(text: Optional[str]) -> List[str]:
+    """
+    요약/원문 → 재료명만 (중복 제거, 순서 유지).
+    "●주재료 : 계란, 대파, ●양념 : 간장, 소금 약간()" → ["계란", "대파", "간장", "소금"]
+    """
+    names = []
+    for part in extract_ingredient_names(text or "").split(", "):
+        part = part.rsplit(":", 1)[-1]                         # "●주재료 : 계란" → 계란
+        part = re.sub(r"\([^)]*\)|\[[^\]]*\]", "", part)        # 남은 괄호
+        part = re.sub(r"\s+(?:약간|조금|적당량|적당히)$", "", part.strip())
+        part = re.sub(r"^[^\w가-힣]+", "", part).strip()           # ●, · 같은 머리 기호
+        if part:
+            names.append(part)
+    return list(dict.fromkeys(names))
+
+
+def backfill(batch: int = 500, recompute: bool = False) -> int:
+    """ingredients_summary 가 비어 있는(또는 전체) 레시피를 id 순으로 채움."""
+    from app.db import engine
+    from app.models import Recipe
+
+    total, last_id = 0, 0
+    with Session(engine) as db:
+        while True:
+            stmt = select(Recipe).where(Recipe.id > last_id)
+            if not recompute:
+                stmt = stmt.where(Recipe.ingredients_summary.is_(None))
+            rows = db.exec(stmt.order_by(Recipe.id).limit(batch)).all()
+            if not rows:
+                break
+            for r in rows:
+                r.ingredients_summary = build_summary(r.description)
+                db.add(r)
+            last_id = rows[-1].id
+            total += len(rows)
+            db.commit()
+            log.info("요약 %d건 저장 (last_id=%d)", total, last_id)
+    return total
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s:%(message)s")
+    parser = argparse.ArgumentParser(description="레시피 재료 요약(ingredients_summary) backfill")
+    parser.add_argument("--all", action="store_true", help="이미 채워진 행도 다시 계산")
+    parser.add_argument("--batch", type=int, default=500)
+    args = parser.parse_args()
+    print(f"✅ {backfill(args.batch, args.all)}건 갱신")
@@ -0,0 +1,26 @@
+from fastapi import APIRouter, HTTPException, status
+
+from recipe_rag_pipeline import is_ready
+
+router = APIRouter(
+    prefix="/health",
+    tags=["health"],
+)
+
+
+@router.get("/live")
+def live():
+    return {"status": "ok"}
+
+
+@router.get("/ready")
+def ready():
+    """
+    워밍업(모델 로드 + 더미 인코딩 + Qdrant ping)이 끝난 워커만 ready.
+    """
+    if not is_ready():
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="warming up",
+        )
+    return {"status": "ready"}
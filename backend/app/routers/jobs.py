@@ -0,0 +1,28 @@
+from typing import Dict
+
+from fastapi import APIRouter, Depends, HTTPException
+from sqlmodel import Session
+
+from app.db import get_session
+from app.jobs import queue_stats
+from app.models import IngestJob
+from app.schemas import IngestJobRead
+
+router = APIRouter(
+    prefix="/api/jobs",
+    tags=["jobs"],
+)
+
+
+@router.get("/stats")
+def job_stats() -> Dict[str, int]:
+    """status 별 작업 수 (queued 가 계속 쌓이면 워커 수/concurrency 를 늘릴 때)."""
+    return queue_stats()
+
+
+@router.get("/{job_id}", response_model=IngestJobRead)
+def read_job(job_id: int, session: Session = Depends(get_session)):
+    job = session.get(IngestJob, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail=f"Job id={job_id} not found")
+    return job
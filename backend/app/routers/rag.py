@@ -3,57 +3,82 @@
 import re
 import json
 import os
+import asyncio
+import logging
 
 import openai
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-from typing import List, Optional
+from typing import AsyncIterator, List, Optional, Tuple
 
-from sqlmodel import Session, select
-
-from app.db import get_session
-from app.models import Recipe, IngredientMaster, UserIngredient
-from recipe_rag_pipeline import recommend_for_user
+from app.llm_cache import llm_cache
+from app.metrics import count_llm_fallback, count_llm_hedge, count_llm_tokens, stage
+from app.models import Recipe
+from app.recipe_summary import build_summary, ingredient_names
+from recipe_rag_pipeline import (
+    arecommend_with_fridge, fridge_cache, hit_cache, query_cache, recommend_batch, run_db,
+)
+from vector_store import SearchFilter
 
 # OpenAI 클라이언트 초기화 (비동기)
 client = openai.AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"))
 
 router = APIRouter(prefix="/api/rag", tags=["rag"])
+log = logging.getLogger("rag")
+
+# LLM 단계 지연 예산 (초). 넘기면 벡터 검색 상위 결과 + 템플릿 reason 으로 대체
+LLM_TIMEOUT_SEC     = float(os.getenv("LLM_TIMEOUT_SEC", "8"))
+# 0 보다 크면, 이 시간 안에 응답이 없을 때 같은 요청을 하나 더 보내 먼저 온 쪽 사용
+LLM_HEDGE_DELAY_SEC = float(os.getenv("LLM_HEDGE_DELAY_SEC", "0"))
+LLM_FALLBACK_COUNT  = 3
+# /recommend/batch 한 번에 받을 최대 건수
+RAG_BATCH_MAX       = int(os.getenv("RAG_BATCH_MAX", "256"))
 
+# LLM 단계 카운터 (워커 프로세스 단위, GET /api/rag/llm/stats)
+llm_stats = {
+    "calls":        0,
+    "timeouts":     0,
+    "parse_errors": 0,
+    "api_errors":   0,
+    "fallbacks":    0,
+    "hedges":       0,
+}
 
-class RecommendRequest(BaseModel):
+
+class RecommendQuery(BaseModel):
     user_id: int
     query: str
+    # 선택 필터 (벡터 검색 단계에서 Qdrant payload 조건으로 적용)
+    category: Optional[str] = None          # 요리종류 (예: 국&찌개)
+    method: Optional[str] = None            # 조리법 (예: 끓이기)
+    min_calories: Optional[int] = None
+    max_calories: Optional[int] = None
+    min_protein: Optional[int] = None
+    max_protein: Optional[int] = None
+
+    def search_filter(self) -> SearchFilter:
+        return SearchFilter(
+            category=self.category,
+            method=self.method,
+            calories=(self.min_calories, self.max_calories),
+            protein=(self.min_protein, self.max_protein),
+        )
+
+
+class RecommendRequest(RecommendQuery):
     top_k: Optional[int] = 5
     boost: Optional[float] = 0.2
 
 
-def extract_ingredient_names(text: str) -> str:
-    parts = re.split(r"[\n,]", text)
-    ingredients = []
-    for part in parts:
-        cleaned = re.sub(
-            r"\s*\d+(?:\.\d+)?\s*[^\s()]*\s*(?:\([^)]*\))?",
-            "",
-            part
-        ).strip()
-        if cleaned:
-            ingredients.append(cleaned)
-    return ", ".join(ingredients)
+class BatchRecommendRequest(BaseModel):
+    items: List[RecommendQuery]
+    top_k: Optional[int] = 5
+    boost: Optional[float] = 0.2
 
 
-async def generate_llm_recommendations(
-    query: str,
-    user_ingredients: List[str],
-    recipes: List[str],
-    model: str = "gpt-3.5-turbo"
-) -> List[str]:
-    """
-    query: 사용자 요청 문장
-    user_ingredients: 사용자가 명시한 재료 리스트
-    recipes: 후보 레시피 목록 (각 dict에 'id','name','method','category','description' 포함)
-    model: "gpt-3.5-turbo" 사용
-    """
+def build_llm_messages(query: str, recipes: List[dict]) -> List[dict]:
+    """후보 레시피(simplify_recipes 결과)로 chat 메시지 구성 (일반/스트리밍 공용)."""
     # 1) 후보 레시피 목록 문자열화
     recipe_lines = "\n".join(
         f"- {r['id']} / {r['name']} ({r['method']} / {r['category']}) — 재료: {r['description']}"
@@ -77,100 +102,443 @@ RULES:
 다시 강조: JSON 배열(id(int), name(str), reason(str)) 외에는 아무것도 출력하지 마세요.
 """
 
-    # 3) OpenAI API 호출 (새 openai-python v1.x 인터페이스)
+    return [
+        {
+            "role": "system",
+            "content": (
+                "당신은 요리 추천 도우미입니다. 반드시 순수 JSON 배열만 반환하세요. "
+                "배열 길이는 0~3, 필드는 id(int)/name(str)/reason(str)뿐입니다."
+            )
+        },
+        {"role": "user", "content": prompt}
+    ]
+
+
+def llm_cache_key(query: str, recipes: List[dict], model: str) -> str:
+    """llm_cache 키. 쿼리를 뺀 메시지를 지문으로 넣어 프롬프트·요약 형식이 바뀌면 새 키가 됨."""
+    prompt = json.dumps(build_llm_messages("", recipes), ensure_ascii=False)
+    return llm_cache.key(query, [r["id"] for r in recipes], model, prompt)
+
+
+async def generate_llm_recommendations(
+    query: str,
+    user_ingredients: List[str],
+    recipes: List[str],
+    model: str = "gpt-3.5-turbo"
+) -> List[str]:
+    """
+    query: 사용자 요청 문장
+    user_ingredients: 사용자가 명시한 재료 리스트
+    recipes: 후보 레시피 목록 (각 dict에 'id','name','method','category','description' 포함)
+    model: "gpt-3.5-turbo" 사용
+    (쿼리 + 후보 id 순서 + 모델 + 프롬프트가 같으면 llm_cache 결과를 그대로 반환)
+    llm_cache 조회/저장은 sqlite 백엔드가 잠금 대기(timeout=5)로 막힐 수 있어 DB 스레드에서 실행
+    """
+    cache_key = llm_cache_key(query, recipes, model)
+    cached = await run_db(llm_cache.get, cache_key)
+    if cached is not None:
+        return cached
+
+    data, tokens = await _hedged_complete(query, recipes, model)
+    await run_db(llm_cache.put, cache_key, data, tokens)
+    return data
+
+
+async def _complete(query: str, recipes: List[dict], model: str) -> Tuple[List[dict], int]:
+    """LLM 한 번 호출 → (파싱된 배열, 사용 토큰 수). 파싱 실패는 ValueError."""
+    # 1) OpenAI API 호출 (새 openai-python v1.x 인터페이스)
     resp = await client.chat.completions.create(
         model=model,
-        messages=[
-            {
-                "role": "system",
-                "content": (
-                    "당신은 요리 추천 도우미입니다. 반드시 순수 JSON 배열만 반환하세요. "
-                    "배열 길이는 0~3, 필드는 id(int)/name(str)/reason(str)뿐입니다."
-                )
-            },
-            {"role": "user", "content": prompt}
-        ],
+        messages=build_llm_messages(query, recipes),
         temperature=0.5
     )
 
-    # 4) 결과 문자열 정제
+    # 2) 결과 문자열 정제
     raw = resp.choices[0].message.content.strip()
     if raw.startswith("```"):
         raw = re.sub(r"^```(?:json)?\s*", "", raw)
         raw = re.sub(r"\s*```$", "", raw)
 
-    # 5) JSON 파싱 및 검증
+    # 3) JSON 파싱 및 검증 (원소 형식까지 확인해야 깨진 응답이 캐시에 남지 않음)
     data = json.loads(raw)
     if not isinstance(data, list):
         raise ValueError(f"LLM 응답이 JSON 배열이 아닙니다:\n{raw}")
-    return data
+    candidate_ids = {r["id"] for r in recipes}
+    for rec in data:
+        check_llm_rec(rec, candidate_ids)
+    if not resp.usage:
+        return data, 0
+    count_llm_tokens(resp.usage.prompt_tokens, resp.usage.completion_tokens)
+    return data, resp.usage.total_tokens
+
+
+def check_llm_rec(rec, candidate_ids) -> dict:
+    """LLM 배열 원소 검증: dict + 후보 중 하나인 int id + str reason. 아니면 ValueError."""
+    if not isinstance(rec, dict):
+        raise ValueError(f"LLM 응답 원소가 객체가 아닙니다: {rec!r}")
+    rid = rec.get("id")
+    if not isinstance(rid, int) or isinstance(rid, bool) or rid not in candidate_ids:
+        raise ValueError(f"LLM 응답 원소의 id 가 후보에 없습니다: {rec!r}")
+    if not isinstance(rec.get("reason"), str):
+        raise ValueError(f"LLM 응답 원소에 reason 이 없습니다: {rec!r}")
+    return rec
+
+
+async def _hedged_complete(query: str, recipes: List[dict], model: str) -> Tuple[List[dict], int]:
+    """
+    LLM_HEDGE_DELAY_SEC 안에 첫 요청이 끝나지 않으면 같은 요청을 하나 더 보내고,
+    먼저 성공한 결과를 사용 (나머지는 취소). 둘 다 실패하면 마지막 예외를 올립니다.
+    """
+    tasks = [asyncio.ensure_future(_complete(query, recipes, model))]
+    try:
+        if LLM_HEDGE_DELAY_SEC > 0:
+            done, _ = await asyncio.wait(tasks, timeout=LLM_HEDGE_DELAY_SEC)
+            if not done:
+                llm_stats["hedges"] += 1
+                count_llm_hedge()
+                tasks.append(asyncio.ensure_future(_complete(query, recipes, model)))
+        pending = set(tasks)
+        while True:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            ok = [t for t in done if t.exception() is None]
+            if ok:
+                return ok[0].result()
+            if not pending:
+                return done.pop().result()
+    finally:
+        for t in tasks:
+            t.cancel()
+
+
+class JsonArrayStream:
+    """
+    조각으로 들어오는 JSON 배열 텍스트에서 최상위 객체가 닫히는 즉시 파싱해 돌려줌.
+    '[' 이전의 텍스트(```json 코드펜스 등)와 ']' 이후는 무시합니다.
+    """
+
+    def __init__(self):
+        self.started = False
+        self.done    = False
+        self._depth  = 0
+        self._in_str = False
+        self._escape = False
+        self._buf: List[str] = []
+
+    def feed(self, chunk: str) -> List[dict]:
+        items = []
+        for ch in chunk:
+            if self.done:
+                break
+            if not self.started:
+                if ch == "[":
+                    self.started, self._depth = True, 1
+                continue
+            if self._depth >= 2:
+                self._buf.append(ch)
+            if self._in_str:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_str = False
+            elif ch == '"':
+                self._in_str = True
+            elif ch in "{[":
+                self._depth += 1
+                if self._depth == 2:
+                    self._buf = [ch]
+            elif ch in "}]":
+                self._depth -= 1
+                if self._depth == 1:
+                    items.append(json.loads("".join(self._buf)))
+                elif self._depth == 0:
+                    self.done = True
+        return items
+
+
+async def stream_llm_recommendations(
+    query: str,
+    recipes: List[dict],
+    model: str = "gpt-3.5-turbo"
+) -> AsyncIterator[dict]:
+    """
+    generate_llm_recommendations 의 스트리밍판: 배열 원소 {id, name, reason} 가
+    완성될 때마다 yield. 끝까지 받은 결과만 llm_cache 에 저장합니다.
+    """
+    cache_key = llm_cache_key(query, recipes, model)
+    cached = await run_db(llm_cache.get, cache_key)
+    if cached is not None:
+        for rec in cached:
+            yield rec
+        return
+
+    stream = await client.chat.completions.create(
+        model=model,
+        messages=build_llm_messages(query, recipes),
+        temperature=0.5,
+        stream=True,
+        stream_options={"include_usage": True},
+    )
+    parser = JsonArrayStream()
+    candidate_ids = {r["id"] for r in recipes}
+    data: List[dict] = []
+    tokens = 0
+    async for chunk in stream:
+        if chunk.usage:
+            tokens = chunk.usage.total_tokens
+            count_llm_tokens(chunk.usage.prompt_tokens, chunk.usage.completion_tokens)
+        if not chunk.choices or not chunk.choices[0].delta.content:
+            continue
+        for rec in parser.feed(chunk.choices[0].delta.content):
+            data.append(check_llm_rec(rec, candidate_ids))
+            yield rec
+
+    if not parser.done:
+        raise ValueError("LLM 스트리밍 응답이 완결된 JSON 배열이 아닙니다")
+    await run_db(llm_cache.put, cache_key, data, tokens)
+
+
+def simplify_recipes(recipes: List[Recipe]) -> List[dict]:
+    """LLM 입력용 단순화 (최대 20개). 재료는 저장된 요약을 그대로 사용."""
+    return [
+        {
+            "id": r.id,
+            "name": r.name,
+            "category": r.category or "",
+            "method": r.method or "",
+            "description": (r.ingredients_summary if r.ingredients_summary is not None
+                            else build_summary(r.description))
+        }
+        for r in recipes[:20]
+    ]
+
+
+def recipe_card(recipe: Recipe, reason: Optional[str] = None) -> dict:
+    card = {
+        "id":          recipe.id,
+        "name":        recipe.name,
+        "category":    recipe.category,
+        "method":      recipe.method,
+        "description": recipe.description,
+    }
+    if reason is not None:
+        card["reason"] = reason
+    return card
+
+
+def fallback_recommendations(query: str, recipes: List[dict], n: int = LLM_FALLBACK_COUNT,
+                             exclude: Tuple[int, ...] = ()) -> List[dict]:
+    """LLM 없이 벡터 검색 순서대로 n개 + 분류/조리법/재료로 만든 reason."""
+    recs = []
+    for r in recipes:
+        if len(recs) >= n:
+            break
+        if r["id"] in exclude:
+            continue
+        kind = " ".join(p for p in (r["category"], r["method"]) if p)
+        kind = f"{kind} 요리" if kind else "요리"
+        ings = ", ".join(ingredient_names(r["description"])[:4])
+        reason = (f"{ings}(으)로 만드는 {kind}예요. " if ings else f"{kind}예요. ")
+        reason += f"'{query}' 요청과 가장 가까운 레시피라 추천드려요."
+        recs.append({"id": r["id"], "name": r["name"], "reason": reason})
+    return recs
+
+
+_LLM_FAILURES = (asyncio.TimeoutError, ValueError, openai.OpenAIError)
+
+def _record_llm_failure(e: BaseException) -> None:
+    if isinstance(e, asyncio.TimeoutError):
+        kind, reason = "timeouts", "timeout"
+    elif isinstance(e, ValueError):
+        kind, reason = "parse_errors", "parse_error"
+    else:
+        kind, reason = "api_errors", "api_error"
+    llm_stats[kind] += 1
+    llm_stats["fallbacks"] += 1
+    count_llm_fallback(reason)
+    log.warning("LLM 단계 실패(%s) → 벡터 검색 결과로 대체: %r", kind, e)
+
+
+async def recommend_with_deadline(
+    query: str,
+    user_ingredients: List[str],
+    recipes: List[dict],
+) -> Tuple[List[dict], bool]:
+    """LLM_TIMEOUT_SEC 예산 안에서 LLM 추천 → (추천 목록, 대체 여부)."""
+    llm_stats["calls"] += 1
+    try:
+        with stage("llm"):
+            llm_recs = await asyncio.wait_for(
+                generate_llm_recommendations(query, user_ingredients, recipes),
+                timeout=LLM_TIMEOUT_SEC,
+            )
+        return llm_recs, False
+    except _LLM_FAILURES as e:
+        _record_llm_failure(e)
+        return fallback_recommendations(query, recipes), True
 
 
 @router.post("/recommend")
-async def recommend(req: RecommendRequest, session: Session = Depends(get_session)):
+async def recommend(req: RecommendRequest):
     try:
-        # 1) RAG로 후보 레시피 조회
-        recipes: List[Recipe] = recommend_for_user(
+        # 1) RAG로 후보 레시피 조회 (냉장고 id·이름은 캐시에서, DB 왕복은 한 세션)
+        fridge, recipes = await arecommend_with_fridge(
             user_id=req.user_id,
             query=req.query,
             top_k=req.top_k,
-            boost=req.boost
+            boost=req.boost,
+            flt=req.search_filter()
         )
 
-        # 2) 사용자 냉장고 재료 조회
-        fridge = [
-            name for name in session.exec(
-                select(IngredientMaster.name)
-                .join(UserIngredient, IngredientMaster.id == UserIngredient.ingredient_id)
-                .where(UserIngredient.user_id == req.user_id)
-            )
-        ]
-
-        # 3) LLM 입력용 단순화 (최대 20개)
-        simplified = [
-            {
-                "id": r.id,
-                "name": r.name,
-                "category": r.category or "",
-                "method": r.method or "",
-                "description": extract_ingredient_names(r.description or "")
-            }
-            for r in recipes
-        ]
-
-        # 4) LLM 호출 (id, name, reason 포함)
-        llm_recs = await generate_llm_recommendations(
+        # 2) LLM 호출 (id, name, reason 포함). 시간 초과/파싱 실패 시 벡터 결과로 대체
+        llm_recs, fallback = await recommend_with_deadline(
             query=req.query,
-            user_ingredients=fridge,
-            recipes=simplified[:20]
+            user_ingredients=fridge.names,
+            recipes=simplify_recipes(recipes)
         )
 
-        # 5) LLM 응답의 id 로 실제 Recipe 레코드 조회
-        rec_ids = [rec["id"] for rec in llm_recs]
-        db_recipes = {
-            r.id: r for r in session.exec(
-                select(Recipe).where(Recipe.id.in_(rec_ids))
-            ).all()
-        }
+        with stage("assemble"):
+            # 3) LLM 응답의 id 를 1) 에서 읽은 Recipe 와 매칭 (재조회 없음)
+            db_recipes = {r.id: r for r in recipes}
 
-        # 6) 최종 응답 포맷으로 통합
-        final_recs = []
-        for rec in llm_recs:
-            recipe = db_recipes.get(rec["id"])
-            if not recipe:
-                continue
-            final_recs.append({
-                "id":          recipe.id,
-                "name":        recipe.name,
-                "category":    recipe.category,
-                "method":      recipe.method,
-                "description": recipe.description,
-                "reason":      rec["reason"],
-            })
+            # 4) 최종 응답 포맷으로 통합
+            final_recs = [
+                recipe_card(db_recipes[rec["id"]], rec["reason"])
+                for rec in llm_recs
+                if rec["id"] in db_recipes
+            ]
 
-        return {"fridge": fridge, "recommendations": final_recs}
+        return {"fridge": fridge.names, "recommendations": final_recs, "fallback": fallback}
 
     except ValueError as ve:
         raise HTTPException(status_code=500, detail=str(ve))
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"추천 중 오류 발생: {e}")
+
+
+def _ndjson(event: dict) -> bytes:
+    return (json.dumps(event, ensure_ascii=False) + "\n").encode("utf-8")
+
+
+@router.post("/recommend/stream")
+async def recommend_stream(req: RecommendRequest):
+    """
+    /recommend 의 NDJSON 스트리밍판. 한 줄에 이벤트 하나:
+      {"type": "fridge", "fridge": [...]}              ← 벡터 검색 직후
+      {"type": "candidates", "candidates": [...]}
+      {"type": "recommendation", id, name, ..., reason} ← LLM 이 원소 하나를 끝낼 때마다
+      {"type": "done", "count": n, "fallback": bool}  또는  {"type": "error", "detail": "..."}
+    LLM_TIMEOUT_SEC 를 넘기거나 응답이 깨지면, 남은 자리를 벡터 검색 결과로 채웁니다
+    (해당 recommendation 이벤트에 "fallback": true).
+    """
+    try:
+        fridge, recipes = await arecommend_with_fridge(
+            user_id=req.user_id,
+            query=req.query,
+            top_k=req.top_k,
+            boost=req.boost,
+            flt=req.search_filter()
+        )
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"추천 중 오류 발생: {e}")
+
+    async def events():
+        yield _ndjson({"type": "fridge", "fridge": fridge.names})
+        yield _ndjson({"type": "candidates",
+                       "candidates": [recipe_card(r) for r in recipes]})
+
+        db_recipes = {r.id: r for r in recipes}
+        simplified = simplify_recipes(recipes)
+        emitted: List[int] = []
+        fallback = False
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + LLM_TIMEOUT_SEC
+        llm_stats["calls"] += 1
+        agen = stream_llm_recommendations(req.query, simplified).__aiter__()
+        with stage("llm"):
+            try:
+                while True:
+                    try:
+                        rec = await asyncio.wait_for(agen.__anext__(),
+                                                     timeout=max(deadline - loop.time(), 0))
+                    except StopAsyncIteration:
+                        break
+                    recipe = db_recipes.get(rec.get("id"))
+                    if not recipe or recipe.id in emitted:
+                        continue
+                    emitted.append(recipe.id)
+                    yield _ndjson({"type": "recommendation",
+                                   **recipe_card(recipe, rec.get("reason", ""))})
+            except _LLM_FAILURES as e:
+                _record_llm_failure(e)
+                fallback = True
+            except Exception as e:
+                yield _ndjson({"type": "error", "detail": f"추천 중 오류 발생: {e}"})
+                return
+            finally:
+                await agen.aclose()
+
+        if fallback:
+            rest = fallback_recommendations(req.query, simplified,
+                                            n=LLM_FALLBACK_COUNT - len(emitted),
+                                            exclude=tuple(emitted))
+            for rec in rest:
+                emitted.append(rec["id"])
+                yield _ndjson({"type": "recommendation", "fallback": True,
+                               **recipe_card(db_recipes[rec["id"]], rec["reason"])})
+        yield _ndjson({"type": "done", "count": len(emitted), "fallback": fallback})
+
+    # nginx 등 프록시가 줄 단위 전송을 버퍼링하지 않도록
+    return StreamingResponse(events(), media_type="application/x-ndjson",
+                             headers={"X-Accel-Buffering": "no",
+                                      "Cache-Control": "no-cache"})
+
+
+@router.post("/recommend/batch")
+async def recommend_batch_route(req: BatchRecommendRequest):
+    """
+    (user_id, query) 여러 건을 벡터 검색 + 냉장고 가산점만으로 추천 (LLM 단계 없음).
+    인코딩·벡터 검색·DB 조회를 각각 한 번씩 묶어 처리하며, 결과는 items 순서대로.
+    """
+    if len(req.items) > RAG_BATCH_MAX:
+        raise HTTPException(status_code=400,
+                            detail=f"items 는 최대 {RAG_BATCH_MAX}건까지 가능합니다")
+    try:
+        results = await run_db(
+            recommend_batch,
+            [(it.user_id, it.query) for it in req.items],
+            req.top_k,
+            req.boost,
+            [it.search_filter() for it in req.items],
+        )
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"추천 중 오류 발생: {e}")
+    return {
+        "results": [
+            {"user_id": it.user_id, "query": it.query,
+             "recommendations": [recipe_card(r) for r in recipes]}
+            for it, recipes in zip(req.items, results)
+        ]
+    }
+
+
+@router.get("/cache/stats")
+def cache_stats():
+    """추천 경로 캐시들의 크기/적중률 (워커 프로세스 단위)."""
+    return {
+        "llm":             llm_cache.stats(),
+        "query_embedding": query_cache.stats(),
+        "fridge":          fridge_cache.stats(),
+        "semantic_hits":   hit_cache.stats(),
+    }
+
+
+@router.get("/llm/stats")
+def llm_stage_stats():
+    """LLM 단계 호출/시간 초과/파싱 실패/대체/헤징 횟수 (워커 프로세스 단위)."""
+    return {
+        **llm_stats,
+        "timeout_sec":     LLM_TIMEOUT_SEC,
+        "hedge_delay_sec": LLM_HEDGE_DELAY_SEC,
+    }
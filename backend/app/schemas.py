@@ -32,6 +32,7 @@ class UserIngredientRead(SQLModel):
     name:       str
     quantity:   float
     created_at: datetime
+    job_id:     Optional[int] = None   # 추가 시 등록된 레시피 수집 작업 (GET /api/jobs/{job_id})
 
     class Config:
         from_attributes = True  # orm_mode 대신 이 옵션 사용
@@ -70,3 +71,23 @@ class IngredientRead(SQLModel):
 
     class Config:
         from_attributes = True  # orm_mode 대신 이 옵션 사용
+
+# ───────────────────────────────────────────────────────────────────────────────
+class IngestJobRead(SQLModel):
+    """
+    ingest_jobs 작업 상태 (GET /api/jobs/{job_id})
+    """
+    id:           int
+    kind:         str
+    payload:      dict
+    status:       str                  # queued / running / done / failed
+    attempts:     int
+    max_attempts: int
+    run_after:    datetime             # queued 일 때 다음 실행 가능 시각 (UTC)
+    last_error:   Optional[str]
+    result:       Optional[dict]
+    created_at:   datetime
+    updated_at:   datetime
+
+    class Config:
+        from_attributes = True  # orm_mode 대신 이 옵션 사용
@@ -0,0 +1,92 @@
+"""
+benchmarks/concurrency.py
+──────────────────────────────────────────────────
+· 동시 요청 수(in-flight)별 추천 처리량 비교 (프로세스 내, 실제 DB/벡터 저장소 사용)
+    - async    : arecommend_for_user (이벤트 루프 비차단)
+    - blocking : 예전 라우터처럼 코루틴 안에서 recommend_for_user 를 직접 호출
+· --llm_ms 로 OpenAI 호출 대기 시간을 흉내 낼 수 있습니다 (asyncio.sleep).
+· --unique 를 주면 매 요청 쿼리를 다르게 만들어 임베딩 캐시를 우회합니다.
+      $ python -m benchmarks.concurrency --user_id 1 --levels 1,4,16,32 --llm_ms 300
+──────────────────────────────────────────────────
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import statistics
+import time
+from typing import Dict, List
+
+from benchmarks.encoder_backends import load_texts
+from recipe_rag_pipeline import arecommend_for_user, recommend_for_user, warmup
+
+
+async def _one(mode: str, user_id: int, query: str, llm_ms: float) -> float:
+    t0 = time.perf_counter()
+    if mode == "async":
+        await arecommend_for_user(user_id, query, top_k=5)
+    else:
+        recommend_for_user(user_id, query, top_k=5)
+    if llm_ms:
+        await asyncio.sleep(llm_ms / 1000)
+    return (time.perf_counter() - t0) * 1000
+
+
+async def _level(mode: str, concurrency: int, total: int, user_id: int,
+                 queries: List[str], llm_ms: float, unique: bool) -> Dict:
+    sem = asyncio.Semaphore(concurrency)
+
+    async def run(i: int) -> float:
+        q = queries[i % len(queries)]
+        if unique:
+            q = f"{q} {mode}{concurrency}-{i}"
+        async with sem:
+            return await _one(mode, user_id, q, llm_ms)
+
+    t0 = time.perf_counter()
+    lat = sorted(await asyncio.gather(*(run(i) for i in range(total))))
+    elapsed = time.perf_counter() - t0
+    return {
+        "mode":        mode,
+        "concurrency": concurrency,
+        "rps":         round(total / elapsed, 2),
+        "p50_ms":      round(statistics.median(lat), 1),
+        "p95_ms":      round(lat[int(len(lat) * 0.95) - 1], 1),
+    }
+
+
+async def _main(args) -> List[Dict]:
+    queries = load_texts(args.queries_csv) if args.queries_csv else load_texts()
+    results = []
+    for mode in args.modes.split(","):
+        for c in [int(x) for x in args.levels.split(",")]:
+            row = await _level(mode, c, args.requests, args.user_id, queries,
+                               args.llm_ms, args.unique)
+            results.append(row)
+            print(f"{mode:<9} in-flight {c:>3}  {row['rps']:>8} req/s  "
+                  f"p50 {row['p50_ms']:>8}ms  p95 {row['p95_ms']:>8}ms")
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="동시 요청 수별 추천 처리량")
+    parser.add_argument("--user_id", type=int, required=True)
+    parser.add_argument("--levels", default="1,2,4,8,16,32")
+    parser.add_argument("--modes", default="blocking,async")
+    parser.add_argument("--requests", type=int, default=200, help="단계별 총 요청 수")
+    parser.add_argument("--llm_ms", type=float, default=0.0)
+    parser.add_argument("--unique", action="store_true")
+    parser.add_argument("--queries_csv", default=None)
+    parser.add_argument("--output_json", default=None)
+    args = parser.parse_args()
+
+    warmup()
+    results = asyncio.run(_main(args))
+    if args.output_json:
+        with open(args.output_json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
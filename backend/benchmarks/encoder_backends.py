@@ -0,0 +1,129 @@
+"""
+benchmarks/encoder_backends.py
+──────────────────────────────────────────────────
+· 인코더 백엔드별 정합성/속도/메모리 비교
+    - drift   : fp32(torch) 벡터 대비 cosine 유사도 (mean / min)
+    - latency : 단건(batch=1) 인코딩 p50 / p95 (ms)
+    - thruput : batch=32 인코딩 처리량 (문장/초)
+    - memory  : 모델 로드 전후 RSS 증가량 (MB)
+· 각 백엔드는 별도 프로세스에서 로드해 메모리가 섞이지 않게 합니다.
+      $ python -m benchmarks.encoder_backends --backends torch,torch-int8,onnx,onnx-int8
+──────────────────────────────────────────────────
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import multiprocessing as mp
+import os
+import statistics
+import time
+from typing import Dict, List
+
+import numpy as np
+
+QUERIES_CSV = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                           "evaluation_queries.csv")
+
+
+def _rss_mb() -> float:
+    """현재 프로세스 RSS(MB). /proc 가 없으면 최대 RSS 로 대체."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except OSError:
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def load_texts(path: str = QUERIES_CSV) -> List[str]:
+    import csv
+    with open(path, encoding="utf-8") as f:
+        return [row["query_text"].strip() for row in csv.DictReader(f, skipinitialspace=True)
+                if row.get("query_text")]
+
+
+def _run_backend(backend: str, texts: List[str], repeat: int) -> Dict:
+    from encoder_backends import load_encoder
+    from recipe_rag_pipeline import MODEL_NAME
+
+    rss0 = _rss_mb()
+    t0 = time.perf_counter()
+    model = load_encoder(MODEL_NAME, backend)
+    load_s = time.perf_counter() - t0
+    model.encode(texts[:2], normalize_embeddings=True)           # 워밍업
+    rss1 = _rss_mb()
+
+    single: List[float] = []
+    for _ in range(repeat):
+        for t in texts:
+            t0 = time.perf_counter()
+            model.encode([t], normalize_embeddings=True)
+            single.append((time.perf_counter() - t0) * 1000)
+
+    batch = (texts * (32 // len(texts) + 1))[:32]
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        model.encode(batch, batch_size=32, normalize_embeddings=True)
+    batch_s = time.perf_counter() - t0
+
+    vecs = model.encode(texts, normalize_embeddings=True)
+    single.sort()
+    return {
+        "backend":        backend,
+        "load_s":         round(load_s, 2),
+        "rss_mb":         round(rss1 - rss0, 1),
+        "p50_ms":         round(statistics.median(single), 2),
+        "p95_ms":         round(single[int(len(single) * 0.95) - 1], 2),
+        "batch32_per_s":  round(32 * repeat / batch_s, 1),
+        "vectors":        np.asarray(vecs, dtype=np.float32).tolist(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="인코더 백엔드 정합성/성능 비교")
+    parser.add_argument("--backends", default="torch,torch-int8,onnx,onnx-int8")
+    parser.add_argument("--queries_csv", default=QUERIES_CSV)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--output_json", default=None)
+    args = parser.parse_args()
+
+    texts = load_texts(args.queries_csv)
+    backends = [b.strip() for b in args.backends.split(",") if b.strip()]
+    if "torch" not in backends:
+        backends.insert(0, "torch")                 # drift 기준(fp32)은 항상 측정
+
+    ctx = mp.get_context("spawn")
+    results = []
+    for b in backends:
+        with ctx.Pool(1) as pool:
+            try:
+                results.append(pool.apply(_run_backend, (b, texts, args.repeat)))
+            except Exception as e:
+                print(f"⚠︎  {b}: {e}")
+
+    ref = next((r["vectors"] for r in results if r["backend"] == "torch"), None)
+    if ref is None:
+        print("⚠︎  torch(fp32) 기준 벡터가 없어 drift 는 건너뜁니다")
+    else:
+        ref = np.asarray(ref)
+    print(f"\n{'backend':<12}{'load(s)':>9}{'rss(MB)':>9}{'p50(ms)':>9}{'p95(ms)':>9}"
+          f"{'b32/s':>9}{'cos mean':>10}{'cos min':>9}")
+    for r in results:
+        vecs = np.asarray(r.pop("vectors"))
+        if ref is None:
+            r["cos_mean"] = r["cos_min"] = "-"
+        else:
+            cos = np.sum(ref * vecs, axis=1)                  # 정규화 벡터 → 내적 = cosine
+            r["cos_mean"] = round(float(cos.mean()), 5)
+            r["cos_min"]  = round(float(cos.min()), 5)
+        print(f"{r['backend']:<12}{r['load_s']:>9}{r['rss_mb']:>9}{r['p50_ms']:>9}"
+              f"{r['p95_ms']:>9}{r['batch32_per_s']:>9}{r['cos_mean']:>10}{r['cos_min']:>9}")
+
+    if args.output_json:
+        with open(args.output_json, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
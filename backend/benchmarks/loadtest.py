@@ -0,0 +1,505 @@
+"""
+benchmarks/loadtest.py
+──────────────────────────────────────────────────
+· 외부 서비스 없이 FastAPI 앱 전체를 띄워 처리량/지연/메모리를 재는 부하 테스트
+    - DB       : 임시 디렉토리의 SQLite
+    - 벡터     : 워커마다 인메모리 Qdrant (qdrant-local ":memory:"),
+                 시작 시 recipe_embeddings 로 채움
+    - OpenAI   : 지연을 조절할 수 있는 가짜 chat.completions 서버 (OPENAI_BASE_URL)
+    - 식약처 API: fixtures/cookrcp01.json 을 돌려주는 가짜 서버 (FOOD_SAFETY_BASE_URL)
+    - 작업 큐  : 재료 추가로 쌓인 ingest_jobs 는 별도 worker.py 프로세스가 처리
+                 (--job_workers 0 이면 띄우지 않음 → API 프로세스만 측정)
+· /api/rag/recommend 와 /api/user_ingredients (추가/삭제) 를 섞어 동시 요청을 보내고
+  RPS, p50/p95/p99, 워커 RSS 를 JSON 으로 저장 → 커밋 간 비교용
+      $ python -m benchmarks.loadtest run --duration 30 --concurrency 16 --llm_ms 800 \\
+            --output_json loadtest.json
+      $ python -m benchmarks.loadtest run --app_env LLM_CACHE_BACKEND=none --workers 2
+· 실제 API 응답으로 fixture 다시 녹화 (FOOD_SAFETY_API_KEY 필요):
+      $ python -m benchmarks.loadtest record --keywords 계란,두부,김치
+──────────────────────────────────────────────────
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import re
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+from urllib.parse import unquote
+
+import httpx
+import numpy as np
+
+from benchmarks.encoder_backends import load_texts
+
+BACKEND_DIR  = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FIXTURE_PATH = os.path.join(BACKEND_DIR, "benchmarks", "fixtures", "cookrcp01.json")
+SERVICE_ID   = "COOKRCP01"
+FRIDGE_ITEMS = ["계란", "두부", "김치", "양파", "대파", "감자", "당근", "버섯", "애호박", "시금치"]
+
+
+# ───────── 가짜 외부 서버 ───────────────────────────────────
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _serve(handler_cls) -> ThreadingHTTPServer:
+    server = ThreadingHTTPServer(("127.0.0.1", _free_port()), handler_cls)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def fake_openai_server(latency_ms: float, jitter_ms: float) -> ThreadingHTTPServer:
+    """
+    POST /v1/chat/completions: latency_ms(±jitter_ms) 뒤에 프롬프트의 후보 앞 3개를
+    {id, name, reason} 배열로 반환. stream=True 면 같은 내용을 SSE 조각으로 나눠 보냄.
+    """
+    line_re = re.compile(r"^- (\d+) / (.+?) \(", re.M)
+
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def do_POST(self):
+            body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+            prompt = body["messages"][-1]["content"]
+            picks = [{"id": int(i), "name": n, "reason": f"{n}은(는) 요청과 잘 어울리는 레시피입니다."}
+                     for i, n in line_re.findall(prompt)[:3]]
+            content = json.dumps(picks, ensure_ascii=False)
+            usage = {"prompt_tokens": len(prompt) // 2, "completion_tokens": len(content) // 2}
+            usage["total_tokens"] = usage["prompt_tokens"] + usage["completion_tokens"]
+            delay = max(latency_ms + random.uniform(-jitter_ms, jitter_ms), 0) / 1000
+            base = {"id": "chatcmpl-loadtest", "created": int(time.time()), "model": body["model"]}
+
+            if not body.get("stream"):
+                time.sleep(delay)
+                self._send(200, "application/json", json.dumps({
+                    **base, "object": "chat.completion",
+                    "choices": [{"index": 0, "finish_reason": "stop",
+                                 "message": {"role": "assistant", "content": content}}],
+                    "usage": usage,
+                }).encode())
+                return
+
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.end_headers()
+            pieces = [content[i:i + 16] for i in range(0, len(content), 16)] or [""]
+            for piece in pieces:
+                time.sleep(delay / len(pieces))
+                self._event({**base, "object": "chat.completion.chunk",
+                             "choices": [{"index": 0, "delta": {"content": piece},
+                                          "finish_reason": None}]})
+            if (body.get("stream_options") or {}).get("include_usage"):
+                self._event({**base, "object": "chat.completion.chunk",
+                             "choices": [], "usage": usage})
+            self.wfile.write(b"data: [DONE]\n\n")
+
+        def _event(self, obj: Dict):
+            self.wfile.write(f"data: {json.dumps(obj, ensure_ascii=False)}\n\n".encode())
+            self.wfile.flush()
+
+        def _send(self, code: int, ctype: str, payload: bytes):
+            self.send_response(code)
+            self.send_header("Content-Type", ctype)
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+    return _serve(Handler)
+
+
+def fake_food_server(fixture_path: str, latency_ms: float) -> ThreadingHTTPServer:
+    """
+    GET /api/{key}/{service}/json/{start}/{end}[/RCP_PARTS_DTLS={kw}]
+    fixture 행 중 재료에 kw 가 들어간 것을 start~end (1부터) 범위로 반환.
+    """
+    with open(fixture_path, encoding="utf-8") as f:
+        rows: List[Dict] = json.load(f)[SERVICE_ID]["row"]
+    path_re = re.compile(r"^/api/[^/]+/([^/]+)/json/(\d+)/(\d+)(?:/RCP_PARTS_DTLS=([^/?]*))?")
+
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def do_GET(self):
+            m = path_re.match(self.path)
+            if not m:
+                self.send_error(404)
+                return
+            service, start, end, kw = m.group(1), int(m.group(2)), int(m.group(3)), m.group(4)
+            kw = unquote(kw or "")
+            hits = [r for r in rows if kw in r.get("RCP_PARTS_DTLS", "")]
+            time.sleep(latency_ms / 1000)
+            payload = json.dumps({service: {
+                "total_count": str(len(hits)),
+                "row": hits[start - 1:end],
+                "RESULT": {"MSG": "정상처리되었습니다.", "CODE": "INFO-000"},
+            }}, ensure_ascii=False).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json;charset=UTF-8")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+    return _serve(Handler)
+
+
+# ───────── 앱 프로세스 ──────────────────────────────────────
+def create_app():
+    """
+    uvicorn --factory 진입점. 워커마다 인메모리 Qdrant 를 recipe_embeddings 로 채운 뒤
+    요청을 받습니다 (모델 인코딩 없이 저장된 벡터만 올림).
+    """
+    import recipe_rag_pipeline as rp
+    from app.main import app
+
+    @app.on_event("startup")
+    def _load_vectors():
+        ids, matrix, payloads = rp._load_vectors()
+        store = rp.get_store()
+        store.reset(matrix.shape[1] if len(ids) else rp.get_dim())
+        for s in range(0, len(ids), 512):
+            store.upsert(ids[s:s + 512], matrix[s:s + 512], payloads[s:s + 512])
+        store.flush()
+
+    return app
+
+
+def _app_env(tmp: str, llm_port: int, food_port: int, extra: List[str]) -> Dict[str, str]:
+    env = {
+        **os.environ,
+        "DATABASE_URL":           f"sqlite:///{os.path.join(tmp, 'loadtest.db')}",
+        "VECTOR_BACKEND":         "qdrant-local",
+        "QDRANT_PATH":            ":memory:",
+        "OPENAI_BASE_URL":        f"http://127.0.0.1:{llm_port}/v1",
+        "OPENAI_API_KEY":         "loadtest",
+        "FOOD_SAFETY_BASE_URL":   f"http://127.0.0.1:{food_port}/api",
+        "FOOD_SAFETY_API_KEY":    "loadtest",
+        "FOOD_SAFETY_SERVICE_ID": SERVICE_ID,
+        "FOOD_API_CACHE_DIR":     os.path.join(tmp, "food_api_cache"),
+        "PYTHONUNBUFFERED":       "1",
+    }
+    for kv in extra:
+        k, _, v = kv.partition("=")
+        env[k] = v
+    return env
+
+
+def _setup_db(env: Dict[str, str], log) -> None:
+    """테이블 생성 → 가짜 식약처 API 로 시드 → 레시피 임베딩 (recipe_embeddings)."""
+    code = (
+        "import app.models\nfrom app.db import init_db; init_db()\n"
+        "from seed_data import seed; seed()\n"
+        "from recipe_rag_pipeline import embed_new_recipes, reset_qdrant\n"
+        "reset_qdrant(); embed_new_recipes()\n"
+    )
+    subprocess.run([sys.executable, "-c", code], cwd=BACKEND_DIR, env=env,
+                   stdout=log, stderr=subprocess.STDOUT, check=True)
+
+
+def _start_app(env: Dict[str, str], port: int, workers: int, log) -> subprocess.Popen:
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "benchmarks.loadtest:create_app", "--factory",
+         "--host", "127.0.0.1", "--port", str(port), "--workers", str(workers),
+         "--log-level", "warning"],
+        cwd=BACKEND_DIR, env=env, stdout=log, stderr=subprocess.STDOUT,
+    )
+
+
+def _start_worker(env: Dict[str, str], concurrency: int, log) -> subprocess.Popen:
+    # 인메모리 Qdrant 는 프로세스마다 따로 → 워커는 빈 콜렉션을 만들고 신규 임베딩만 올림
+    code = "from recipe_rag_pipeline import reset_qdrant; reset_qdrant()\nimport worker; worker.main()\n"
+    return subprocess.Popen(
+        [sys.executable, "-c", code, "--concurrency", str(concurrency)],
+        cwd=BACKEND_DIR, env=env, stdout=log, stderr=subprocess.STDOUT,
+    )
+
+
+def _wait_ready(base: str, proc: subprocess.Popen, timeout: float) -> None:
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError("앱 프로세스가 종료되었습니다 (로그 확인)")
+        try:
+            if httpx.get(f"{base}/health/ready", timeout=2).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.5)
+    raise TimeoutError(f"{timeout:.0f}초 안에 /health/ready 가 200 이 되지 않았습니다")
+
+
+# ───────── RSS ──────────────────────────────────────────────
+def _children(pid: int) -> List[int]:
+    kids = []
+    for entry in os.listdir("/proc"):
+        if entry.isdigit():
+            try:
+                with open(f"/proc/{entry}/stat") as f:
+                    if int(f.read().rsplit(")", 1)[1].split()[1]) == pid:
+                        kids.append(int(entry))
+            except (OSError, IndexError, ValueError):
+                continue
+    return kids
+
+
+def _rss_mb(pid: int) -> float:
+    try:
+        with open(f"/proc/{pid}/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except OSError:
+        return 0.0
+
+
+class RssSampler(threading.Thread):
+    """앱 프로세스와 (멀티 워커면) 자식 워커들의 RSS 를 주기적으로 기록."""
+
+    def __init__(self, pid: int, interval: float = 0.5):
+        super().__init__(daemon=True)
+        self.pid, self.interval = pid, interval
+        self.peak: Dict[int, float] = {}
+        self.last: Dict[int, float] = {}
+        self._stop_evt = threading.Event()
+
+    def run(self):
+        if not os.path.isdir("/proc"):
+            return
+        while not self._stop_evt.wait(self.interval):
+            for pid in [self.pid] + _children(self.pid):
+                rss = _rss_mb(pid)
+                if rss:
+                    self.last[pid] = rss
+                    self.peak[pid] = max(self.peak.get(pid, 0.0), rss)
+
+    def stop(self) -> Dict:
+        self._stop_evt.set()
+        return {
+            "per_process_peak": {str(p): round(v, 1) for p, v in self.peak.items()},
+            "peak_total":       round(sum(self.peak.values()), 1),
+            "final_total":      round(sum(self.last.values()), 1),
+        }
+
+
+# ───────── 부하 생성 ─────────────────────────────────────────
+async def _prepare_users(client: httpx.AsyncClient, n_users: int, per_user: int) -> List[int]:
+    tag = int(time.time())
+    user_ids = []
+    for i in range(n_users):
+        r = await client.post("/api/users/", json={"username": f"load{i}",
+                                                   "email": f"load{i}-{tag}@example.com"})
+        r.raise_for_status()
+        user_ids.append(r.json()["id"])
+    for uid in user_ids:
+        for name in random.sample(FRIDGE_ITEMS, per_user):
+            await client.post("/api/user_ingredients/",
+                              json={"user_id": uid, "name": name, "quantity": 1})
+    return user_ids
+
+
+async def _drive(base: str, args, user_ids: List[int], queries: List[str]) -> Dict:
+    lat: Dict[str, List[float]] = {}
+    errors: Dict[str, int] = {}
+    held = set()                           # harness 가 추가해 둔 (user_id, 재료)
+
+    async def one(client: httpx.AsyncClient, record: bool):
+        if random.random() < args.ingredient_ratio:
+            uid, name = random.choice(user_ids), random.choice(FRIDGE_ITEMS)
+            if (uid, name) in held:
+                op = "user_ingredients_delete"
+                held.discard((uid, name))
+                req = client.delete(f"/api/user_ingredients/{uid}/{name}")
+            else:
+                op = "user_ingredients_add"
+                held.add((uid, name))
+                req = client.post("/api/user_ingredients/",
+                                  json={"user_id": uid, "name": name, "quantity": 1})
+        else:
+            op = "recommend"
+            req = client.post("/api/rag/recommend", json={
+                "user_id": random.choice(user_ids), "query": random.choice(queries),
+                "top_k": args.top_k,
+            })
+        t0 = time.perf_counter()
+        try:
+            r = await req
+            ok = r.status_code < 400 or (op != "recommend" and r.status_code in (400, 404))
+        except httpx.HTTPError:
+            ok = False
+        if record:
+            lat.setdefault(op, []).append((time.perf_counter() - t0) * 1000)
+            if not ok:
+                errors[op] = errors.get(op, 0) + 1
+
+    async def worker(client: httpx.AsyncClient, until: float, record: bool):
+        while time.perf_counter() < until:
+            await one(client, record)
+
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=base, timeout=60, limits=limits) as client:
+        if args.warmup:
+            until = time.perf_counter() + args.warmup
+            await asyncio.gather(*(worker(client, until, False) for _ in range(args.concurrency)))
+        t0 = time.perf_counter()
+        until = t0 + args.duration
+        await asyncio.gather(*(worker(client, until, True) for _ in range(args.concurrency)))
+        elapsed = time.perf_counter() - t0
+
+    ops = {}
+    for op, xs in sorted(lat.items()):
+        arr = np.asarray(xs)
+        ops[op] = {
+            "count":   len(xs),
+            "errors":  errors.get(op, 0),
+            "rps":     round(len(xs) / elapsed, 2),
+            "mean_ms": round(float(arr.mean()), 1),
+            "p50_ms":  round(float(np.percentile(arr, 50)), 1),
+            "p95_ms":  round(float(np.percentile(arr, 95)), 1),
+            "p99_ms":  round(float(np.percentile(arr, 99)), 1),
+        }
+    return {"elapsed_s": round(elapsed, 2),
+            "total_rps": round(sum(len(x) for x in lat.values()) / elapsed, 2),
+            "ops": ops}
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(args) -> Dict:
+    llm = fake_openai_server(args.llm_ms, args.llm_jitter_ms)
+    food = fake_food_server(args.fixture, args.food_ms)
+    tmp = tempfile.mkdtemp(prefix="loadtest-")
+    env = _app_env(tmp, llm.server_port, food.server_port, args.app_env)
+    log_path = os.path.join(tmp, "app.log")
+    port = _free_port()
+    base = f"http://127.0.0.1:{port}"
+    print(f"임시 디렉토리: {tmp} (앱 로그: {log_path})")
+
+    with open(log_path, "ab") as log:
+        t0 = time.perf_counter()
+        _setup_db(env, log)
+        proc = _start_app(env, port, args.workers, log)
+        worker = _start_worker(env, args.job_workers, log) if args.job_workers else None
+        try:
+            _wait_ready(base, proc, args.ready_timeout)
+            setup_s = time.perf_counter() - t0
+
+            async def go():
+                async with httpx.AsyncClient(base_url=base, timeout=60) as client:
+                    user_ids = await _prepare_users(client, args.users, args.fridge_items)
+                queries = load_texts(args.queries_csv) if args.queries_csv else load_texts()
+                return await _drive(base, args, user_ids, queries)
+
+            sampler = RssSampler(proc.pid)
+            sampler.start()
+            result = asyncio.run(go())
+            rss = sampler.stop()
+        finally:
+            for p in filter(None, (proc, worker)):
+                p.terminate()
+                try:
+                    p.wait(timeout=15)
+                except subprocess.TimeoutExpired:
+                    p.kill()
+            llm.shutdown()
+            food.shutdown()
+
+    return {
+        "commit":    _git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "config":    {k: v for k, v in vars(args).items() if k != "func"},
+        "setup_s":   round(setup_s, 1),
+        **result,
+        "rss_mb":    rss,
+    }
+
+
+# ───────── fixture 녹화 ──────────────────────────────────────
+def record(args) -> None:
+    """실제 식약처 API 를 키워드별로 호출해 fixture 를 새로 저장 (RCP_SEQ 로 중복 제거)."""
+    api_key = os.getenv("FOOD_SAFETY_API_KEY")
+    if not api_key:
+        sys.exit("❌  환경변수 FOOD_SAFETY_API_KEY 가 필요합니다.")
+    base = os.getenv("FOOD_SAFETY_BASE_URL", "http://openapi.foodsafetykorea.go.kr/api")
+    rows: Dict[str, Dict] = {}
+    with httpx.Client(timeout=30) as client:
+        for kw in args.keywords.split(","):
+            r = client.get(f"{base}/{api_key}/{SERVICE_ID}/json/1/{args.per_keyword}"
+                           f"/RCP_PARTS_DTLS={kw}")
+            r.raise_for_status()
+            for row in r.json().get(SERVICE_ID, {}).get("row", []) or []:
+                rows[row.get("RCP_SEQ") or row["RCP_NM"]] = row
+            print(f"{kw}: 누적 {len(rows)}건")
+    with open(args.fixture, "w", encoding="utf-8") as f:
+        f.write('{"%s": {"total_count": "%d", "RESULT": {"MSG": "정상처리되었습니다.", '
+                '"CODE": "INFO-000"}, "row": [\n' % (SERVICE_ID, len(rows)))
+        f.write(",\n".join(json.dumps(r, ensure_ascii=False) for r in rows.values()))
+        f.write("\n]}}\n")
+    print(f"✅ {args.fixture} 저장")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="오프라인 부하 테스트 (가짜 OpenAI/식약처 API)")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+
+    p = sub.add_parser("run", help="앱을 띄우고 부하를 건 뒤 결과를 출력/저장")
+    p.add_argument("--duration", type=float, default=30, help="측정 시간(초)")
+    p.add_argument("--warmup", type=float, default=5, help="측정 전 워밍업(초)")
+    p.add_argument("--concurrency", type=int, default=16, help="동시 in-flight 요청 수")
+    p.add_argument("--workers", type=int, default=1, help="uvicorn 워커 수")
+    p.add_argument("--job_workers", type=int, default=2,
+                   help="worker.py 동시 작업 수 (0 이면 작업 워커를 띄우지 않음)")
+    p.add_argument("--users", type=int, default=20)
+    p.add_argument("--fridge_items", type=int, default=3, help="사용자별 초기 냉장고 재료 수")
+    p.add_argument("--ingredient_ratio", type=float, default=0.1,
+                   help="요청 중 /api/user_ingredients 추가·삭제 비율")
+    p.add_argument("--top_k", type=int, default=5)
+    p.add_argument("--llm_ms", type=float, default=800, help="가짜 OpenAI 응답 지연")
+    p.add_argument("--llm_jitter_ms", type=float, default=200)
+    p.add_argument("--food_ms", type=float, default=100, help="가짜 식약처 API 응답 지연")
+    p.add_argument("--fixture", default=FIXTURE_PATH)
+    p.add_argument("--queries_csv", default=None)
+    p.add_argument("--app_env", action="append", default=[], metavar="KEY=VALUE",
+                   help="앱 프로세스에 넘길 환경 변수 (반복 가능)")
+    p.add_argument("--ready_timeout", type=float, default=300)
+    p.add_argument("--output_json", default=None)
+
+    r = sub.add_parser("record", help="실제 식약처 API 응답으로 fixture 녹화")
+    r.add_argument("--keywords", default="계란,두부,김치,우유,양파,대파,감자,당근,닭고기,돼지고기")
+    r.add_argument("--per_keyword", type=int, default=100)
+    r.add_argument("--fixture", default=FIXTURE_PATH)
+
+    args = parser.parse_args()
+    if args.cmd == "record":
+        record(args)
+        return
+
+    result = run(args)
+    for op, row in result["ops"].items():
+        print(f"{op:<24} {row['rps']:>8} req/s  p50 {row['p50_ms']:>8}ms  "
+              f"p95 {row['p95_ms']:>8}ms  p99 {row['p99_ms']:>8}ms  errors {row['errors']}")
+    print(f"total {result['total_rps']} req/s, RSS peak {result['rss_mb']['peak_total']} MB")
+    if args.output_json:
+        with open(args.output_json, "w", encoding="utf-8") as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
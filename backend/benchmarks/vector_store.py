@@ -0,0 +1,104 @@
+"""
+benchmarks/vector_store.py
+──────────────────────────────────────────────────
+· 벡터 저장소 백엔드별 top-k 검색 지연 비교 (무작위 정규화 벡터)
+    - numpy        : memmap 행렬 + matmul + argpartition
+    - qdrant-local : 임베디드 Qdrant (":memory:")
+    - qdrant       : --qdrant_url 을 준 경우에만 (별도 임시 컬렉션 사용)
+      $ python -m benchmarks.vector_store --sizes 1000,10000,100000
+──────────────────────────────────────────────────
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import statistics
+import tempfile
+import time
+from typing import Dict, List
+
+import numpy as np
+from qdrant_client import QdrantClient
+
+from vector_store import NumpyStore, QdrantStore, VectorStore
+
+BENCH_COL = "bench_vector_store"
+
+
+def _random_unit(n: int, dim: int, rng: np.random.Generator) -> np.ndarray:
+    m = rng.standard_normal((n, dim), dtype=np.float32)
+    return m / np.linalg.norm(m, axis=1, keepdims=True)
+
+
+def _fill(store: VectorStore, matrix: np.ndarray, chunk: int = 2048) -> float:
+    t0 = time.perf_counter()
+    if isinstance(store, NumpyStore):
+        store.ping()                                          # loader → .npy 1회 기록 후 mmap
+        return time.perf_counter() - t0
+    store.reset(matrix.shape[1])
+    for s in range(0, len(matrix), chunk):
+        ids = list(range(s + 1, s + 1 + len(matrix[s:s + chunk])))
+        store.upsert(ids, matrix[s:s + chunk], [{"recipe_id": i} for i in ids])
+    return time.perf_counter() - t0
+
+
+def _measure(store: VectorStore, queries: np.ndarray, limit: int) -> Dict[str, float]:
+    store.search(queries[0], limit)                           # 워밍업
+    lat: List[float] = []
+    for q in queries:
+        t0 = time.perf_counter()
+        store.search(q, limit)
+        lat.append((time.perf_counter() - t0) * 1000)
+    lat.sort()
+    return {
+        "p50_ms": round(statistics.median(lat), 3),
+        "p95_ms": round(lat[int(len(lat) * 0.95) - 1], 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="벡터 저장소 검색 지연 비교")
+    parser.add_argument("--sizes", default="1000,10000,100000")
+    parser.add_argument("--dim", type=int, default=768)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--limit", type=int, default=40)
+    parser.add_argument("--qdrant_url", default=None, help="원격 Qdrant 도 측정하려면 지정")
+    parser.add_argument("--output_json", default=None)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    queries = _random_unit(args.queries, args.dim, rng)
+    results = []
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for n in [int(x) for x in args.sizes.split(",")]:
+            matrix = _random_unit(n, args.dim, rng)
+            stores: Dict[str, VectorStore] = {
+                "numpy":        NumpyStore(
+                    os.path.join(tmp, f"vec_{n}.npy"),
+                    loader=lambda: (np.arange(1, n + 1, dtype=np.int64), matrix,
+                                    [{"recipe_id": i} for i in range(1, n + 1)]),
+                ),
+                "qdrant-local": QdrantStore(QdrantClient(":memory:"), BENCH_COL),
+            }
+            if args.qdrant_url:
+                stores["qdrant"] = QdrantStore(QdrantClient(args.qdrant_url), BENCH_COL)
+
+            for name, store in stores.items():
+                load_s = _fill(store, matrix)
+                row = {"backend": name, "n": n, "load_s": round(load_s, 2),
+                       **_measure(store, queries, args.limit)}
+                results.append(row)
+                print(f"{name:<13} n={n:>7}  load {row['load_s']:>7}s  "
+                      f"p50 {row['p50_ms']:>8}ms  p95 {row['p95_ms']:>8}ms")
+                if isinstance(store, QdrantStore):
+                    store.client.delete_collection(BENCH_COL)
+
+    if args.output_json:
+        with open(args.output_json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+encoder_backends.py
+──────────────────────────────────────────────────
+· KoSimCSE-bert 인코더를 CPU 추론 백엔드별로 로드합니다.
+    - torch      : fp32 PyTorch (기본값)
+    - torch-int8 : Linear 레이어 동적 int8 양자화 PyTorch
+    - onnx       : ONNX Runtime (fp32)
+    - onnx-int8  : ONNX Runtime + 동적 int8 양자화
+· ONNX 백엔드는 hf_cache 의 가중치로부터 오프라인으로 미리 만들어 둡니다.
+      $ pip install "optimum[onnxruntime]"
+      $ python encoder_backends.py export-onnx
+· 정합성(fp32 대비 cosine drift) / 속도·메모리 비교:
+      $ python -m benchmarks.encoder_backends
+──────────────────────────────────────────────────
+"""
+from __future__ import annotations
+
+import argparse
+import logging
+import os
+from typing import TYPE_CHECKING, Optional
+
+if TYPE_CHECKING:
+    from sentence_transformers import SentenceTransformer
+
+log = logging.getLogger("encoder")
+
+BACKENDS = ("torch", "torch-int8", "onnx", "onnx-int8")
+
+_DEFAULT_HF_CACHE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "hf_cache")
+# 저장소에 포함된 hf_cache 가 있으면 그 가중치를 사용 (없으면 HF 기본 캐시)
+HF_CACHE_DIR: Optional[str] = os.getenv("HF_CACHE_DIR") or (
+    _DEFAULT_HF_CACHE if os.path.isdir(_DEFAULT_HF_CACHE) else None
+)
+ONNX_DIR = os.getenv(
+    "ENCODER_ONNX_DIR",
+    os.path.join(HF_CACHE_DIR or _DEFAULT_HF_CACHE, "onnx", "KoSimCSE-bert"),
+)
+ONNX_QUANT_CONFIG = "avx2"                       # avx512_vnni 미지원 CPU 에서도 동작
+ONNX_INT8_FILE    = f"onnx/model_qint8_{ONNX_QUANT_CONFIG}.onnx"
+
+
+def load_encoder(model_name: str, backend: str = "torch") -> "SentenceTransformer":
+    """backend 에 맞는 SentenceTransformer 인스턴스를 CPU 위에 생성."""
+    from sentence_transformers import SentenceTransformer
+
+    if backend == "torch":
+        return SentenceTransformer(model_name, cache_folder=HF_CACHE_DIR, device="cpu")
+
+    if backend == "torch-int8":
+        import torch
+
+        model = SentenceTransformer(model_name, cache_folder=HF_CACHE_DIR, device="cpu")
+        model[0].auto_model = torch.quantization.quantize_dynamic(
+            model[0].auto_model, {torch.nn.Linear}, dtype=torch.qint8
+        )
+        return model
+
+    if backend in ("onnx", "onnx-int8"):
+        if not os.path.isdir(os.path.join(ONNX_DIR, "onnx")):
+            raise RuntimeError(
+                f"ONNX 모델이 없습니다: {ONNX_DIR}\n"
+                "먼저 `python encoder_backends.py export-onnx` 를 실행하세요."
+            )
+        model_kwargs = {"file_name": ONNX_INT8_FILE} if backend == "onnx-int8" else None
+        return SentenceTransformer(
+            ONNX_DIR, backend="onnx", device="cpu", model_kwargs=model_kwargs
+        )
+
+    raise ValueError(f"알 수 없는 인코더 백엔드: {backend} (가능: {', '.join(BACKENDS)})")
+
+
+def export_onnx(model_name: str, out_dir: str = ONNX_DIR) -> str:
+    """
+    hf_cache 의 PyTorch 가중치 → ONNX(fp32) + 동적 int8 양자화 ONNX 를 out_dir 에 저장.
+    optimum[onnxruntime] 필요.
+    """
+    from sentence_transformers import SentenceTransformer, export_dynamic_quantized_onnx_model
+
+    model = SentenceTransformer(
+        model_name, cache_folder=HF_CACHE_DIR, backend="onnx", device="cpu"
+    )
+    model.save_pretrained(out_dir)
+    export_dynamic_quantized_onnx_model(model, ONNX_QUANT_CONFIG, out_dir)
+    log.info("ONNX export 완료: %s", out_dir)
+    return out_dir
+
+
+if __name__ == "__main__":
+    from recipe_rag_pipeline import MODEL_NAME
+
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s:%(message)s")
+    parser = argparse.ArgumentParser(description="KoSimCSE-bert 인코더 백엔드 도구")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    p_export = sub.add_parser("export-onnx", help="ONNX / int8 ONNX 모델 생성")
+    p_export.add_argument("--out_dir", default=ONNX_DIR)
+    args = parser.parse_args()
+
+    if args.cmd == "export-onnx":
+        export_onnx(MODEL_NAME, args.out_dir)
@@ -26,7 +26,7 @@ from typing import List, Dict, Tuple
 # ────── 추천 파이프라인에서 직접 가져오기 ─────────────────
 # 같은 디렉토리에 recipe_rag_pipeline.py가 있다고 가정합니다.
 # (만약 다른 경로에 있다면, PYTHONPATH를 설정하거나 import 경로를 수정하세요.)
-from recipe_rag_pipeline import recommend_for_user
+from recipe_rag_pipeline import recommend_batch
 
 
 def load_queries(queries_csv_path: str) -> pd.DataFrame:
@@ -114,10 +114,11 @@ def recall_at_k(retrieved: List[str], ground_truth: List[str], k: int) -> float:
 
 
 def evaluate(
-    queries_df: pd.DataFrame, user_id: int, k: int
+    queries_df: pd.DataFrame, user_id: int, k: int, batch_size: int = 64
 ) -> Tuple[pd.DataFrame, Dict[str, float]]:
     """
-    모든 쿼리에 대해 recommend_for_user(user_id, query_text, k)을 호출하여
+    쿼리들을 batch_size 개씩 recommend_batch([(user_id, query_text), ...], k)로 보내
+    (recommend_for_user 와 같은 결과, 인코딩/벡터 검색/DB 조회는 묶어서)
     상위 K개 레시피를 얻은 뒤 Precision@K, Recall@K, AP@K을 계산합니다.
 
     반환:
@@ -133,16 +134,21 @@ def evaluate(
     recalls = []
     average_precisions = []
 
-    for _, qrow in queries_df.iterrows():
+    # ==================================================================
+    # 여기가 핵심: recommend_batch 로 batch_size 개씩 한 번에 추천
+    # (쿼리마다 sqlalchemy 모델 Recipe 객체 리스트, 입력 순서 유지)
+    # ==================================================================
+    texts = queries_df["query_text"].tolist()  # 이미 빈 문자열로 채워져 있음
+    recommended = []
+    for start in range(0, len(texts), batch_size):
+        chunk = texts[start:start + batch_size]
+        recommended += recommend_batch([(user_id, q) for q in chunk], top_k=k)
+
+    for (_, qrow), recipes in zip(queries_df.iterrows(), recommended):
         qid = qrow["query_id"]
-        qtext = qrow["query_text"]  # 이미 빈 문자열로 채워져 있음
+        qtext = qrow["query_text"]
         gt_list = qrow["gt_list"]
 
-        # ==================================================================
-        # 여기가 핵심: recommend_for_user(user_id, qtext, top_k)를 실제 호출
-        # (리턴되는 것은 sqlalchemy 모델 Recipe 객체 리스트라고 가정)
-        # ==================================================================
-        recipes = recommend_for_user(user_id=user_id, query=qtext, top_k=k)
         # Recipe 객체에서 .id 속성(또는 PK)을 꺼내서 리스트로 변환
         retrieved_ids = [str(r.id) for r in recipes]
 
@@ -191,6 +197,10 @@ def main():
         "--user_id", type=int, required=True,
         help="추천을 수행할 사용자의 ID (recommend_for_user의 첫 번째 인자)"
     )
+    parser.add_argument(
+        "--batch_size", type=int, default=64,
+        help="recommend_batch 한 번에 보낼 쿼리 수 (default: 64)"
+    )
     parser.add_argument(
         "--output_results_csv",
         default=None,
@@ -203,9 +213,9 @@ def main():
     queries_df = load_queries(args.queries_csv)
     print(f"  → Loaded {len(queries_df)} queries.")
 
-    # 2) 평가 수행 (RAG recommend_for_user 호출)
+    # 2) 평가 수행 (RAG recommend_batch 호출)
     print(f"Running evaluation (user_id={args.user_id}, K={args.k}) ...")
-    results_df, metrics = evaluate(queries_df, args.user_id, args.k)
+    results_df, metrics = evaluate(queries_df, args.user_id, args.k, args.batch_size)
 
     print("\n=== Per-query Results (첫 5개 행) ===")
     print(results_df.head().to_string(index=False))
@@ -0,0 +1,102 @@
+"""
+ingredient_index.py
+──────────────────────────────────────────────────
+· ingredient_recipe_mapping 의 프로세스 내 역색인
+    recipe_id → 정렬된 ingredient_id 배열
+· 추천 시 "후보 레시피 × 냉장고 재료" 겹침 수를 SQL GROUP BY 대신
+  numpy 연산 한 번으로 계산합니다.
+· 시작 시 load() 로 전체를 올리고, 신규 매핑은 add() 로 반영합니다.
+  (다른 프로세스가 추가한 레시피는 처음 조회될 때 해당 id 만 DB 에서 읽음)
+──────────────────────────────────────────────────
+"""
+from __future__ import annotations
+
+import logging
+import threading
+from typing import Dict, Iterable, List, Sequence
+
+import numpy as np
+from sqlalchemy.engine import Engine
+from sqlmodel import Session, select
+
+from app.models import IngredientRecipeMapping
+
+log = logging.getLogger("ingredient_index")
+
+_EMPTY = np.empty(0, dtype=np.int64)
+
+
+class RecipeIngredientIndex:
+    def __init__(self):
+        self._ings: Dict[int, np.ndarray] = {}
+        self._loaded = False
+        self._lock = threading.Lock()
+
+    @property
+    def loaded(self) -> bool:
+        return self._loaded
+
+    def __len__(self) -> int:
+        return len(self._ings)
+
+    @staticmethod
+    def _group(rows: Sequence[tuple]) -> Dict[int, np.ndarray]:
+        """(recipe_id, ingredient_id) 행들 → recipe_id 별 정렬된 배열."""
+        if not rows:
+            return {}
+        pairs = np.asarray(rows, dtype=np.int64)
+        pairs = pairs[np.lexsort((pairs[:, 1], pairs[:, 0]))]
+        rids, starts = np.unique(pairs[:, 0], return_index=True)
+        return {
+            int(r): np.unique(ings)
+            for r, ings in zip(rids, np.split(pairs[:, 1], starts[1:]))
+        }
+
+    def load(self, engine: Engine) -> int:
+        """ingredient_recipe_mapping 전체를 다시 읽어 교체."""
+        with Session(engine) as db:
+            rows = db.exec(
+                select(IngredientRecipeMapping.recipe_id, IngredientRecipeMapping.ingredient_id)
+            ).all()
+        ings = self._group(rows)
+        with self._lock:
+            self._ings = ings
+            self._loaded = True
+        log.info("재료 역색인 로드: 레시피 %d건, 매핑 %d건", len(ings), len(rows))
+        return len(rows)
+
+    def load_recipes(self, db: Session, recipe_ids: Iterable[int]) -> None:
+        """
+        색인에 없는 레시피만 DB 에서 읽어 채움 (매핑이 없으면 빈 배열로 기록).
+        호출 측 세션을 그대로 써서 추천 요청의 다른 조회와 커넥션을 공유합니다.
+        """
+        recipe_ids = list(recipe_ids)
+        rows = db.exec(
+            select(IngredientRecipeMapping.recipe_id, IngredientRecipeMapping.ingredient_id)
+            .where(IngredientRecipeMapping.recipe_id.in_(recipe_ids))
+        ).all()
+        found = self._group(rows)
+        with self._lock:
+            for rid in recipe_ids:
+                self._ings[rid] = found.get(rid, _EMPTY)
+
+    def add(self, recipe_id: int, ingredient_ids: Iterable[int]) -> None:
+        new = np.fromiter(ingredient_ids, dtype=np.int64)
+        with self._lock:
+            self._ings[recipe_id] = np.union1d(self._ings.get(recipe_id, _EMPTY), new)
+
+    def missing(self, recipe_ids: Iterable[int]) -> List[int]:
+        return [rid for rid in recipe_ids if rid not in self._ings]
+
+    def overlap(self, recipe_ids: Sequence[int], fridge_ids: Iterable[int]) -> np.ndarray:
+        """recipe_ids 순서대로, 각 레시피 재료 중 fridge_ids 에 포함된 개수."""
+        n = len(recipe_ids)
+        fridge = np.unique(np.fromiter(fridge_ids, dtype=np.int64))
+        if n == 0 or fridge.size == 0:
+            return np.zeros(n, dtype=np.int64)
+        arrays = [self._ings.get(rid, _EMPTY) for rid in recipe_ids]
+        lens = np.fromiter((a.size for a in arrays), dtype=np.int64, count=n)
+        flat = np.concatenate(arrays)
+        hit = np.isin(flat, fridge, assume_unique=True)
+        owner = np.repeat(np.arange(n), lens)
+        return np.bincount(owner, weights=hit, minlength=n).astype(np.int64)
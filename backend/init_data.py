@@ -2,8 +2,11 @@
 """
 프로젝트 초기 데이터 설정 스크립트
 순서: delete_and_recreate.py -> seed_data.py -> recipe_rag_pipeline.py
+--offline: 식약처 API 대신 응답 캐시(FOOD_API_CACHE_DIR)만 사용 (FOOD_API_MODE=replay)
 """
 
+import argparse
+import os
 import subprocess
 import sys
 import time
@@ -32,6 +35,14 @@ def run_script(script_name):
 
 def main():
     """메인 실행 함수"""
+    parser = argparse.ArgumentParser(description="프로젝트 초기 데이터 설정")
+    parser.add_argument("--offline", action="store_true",
+                        help="식약처 API 를 호출하지 않고 응답 캐시만 사용")
+    if parser.parse_args().offline:
+        # 하위 스크립트들이 환경 변수를 그대로 물려받음
+        os.environ["FOOD_API_MODE"] = "replay"
+        logger.info("📦 오프라인 모드: 식약처 API 응답 캐시만 사용")
+
     logger.info("🚀 프로젝트 초기 데이터 설정 시작")
     
     scripts = [
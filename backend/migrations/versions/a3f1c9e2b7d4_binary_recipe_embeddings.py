@@ -0,0 +1,97 @@
+"""binary recipe embeddings
+
+Revision ID: a3f1c9e2b7d4
+Revises: 56c6990bf321
+Create Date: 2026-10-17 10:12:41.228513
+
+"""
+from typing import Sequence, Union
+from alembic import op
+import numpy as np
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = 'a3f1c9e2b7d4'
+down_revision: Union[str, None] = '56c6990bf321'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+MODEL_NAME = 'BM-K/KoSimCSE-bert'
+BATCH = 500
+
+recipe_embeddings = sa.table(
+    'recipe_embeddings',
+    sa.column('recipe_id', sa.Integer()),
+    sa.column('embedding', sa.JSON()),
+    sa.column('vector', sa.LargeBinary()),
+    sa.column('dtype', sa.String()),
+    sa.column('dim', sa.Integer()),
+    sa.column('model_name', sa.String()),
+)
+
+
+def _batches(conn, *cols):
+    """recipe_id keyset 으로 BATCH 건씩 읽기."""
+    last_id = -1
+    while True:
+        rows = conn.execute(
+            sa.select(recipe_embeddings.c.recipe_id, *cols)
+            .where(recipe_embeddings.c.recipe_id > last_id)
+            .order_by(recipe_embeddings.c.recipe_id)
+            .limit(BATCH)
+        ).all()
+        if not rows:
+            return
+        last_id = rows[-1][0]
+        yield rows
+
+
+def upgrade() -> None:
+    """JSON float 리스트 → float32 바이트 + dtype/dim/model_name."""
+    with op.batch_alter_table('recipe_embeddings') as batch_op:
+        batch_op.add_column(sa.Column('vector', sa.LargeBinary(), nullable=True))
+        batch_op.add_column(sa.Column('dtype', sa.String(length=16), nullable=True))
+        batch_op.add_column(sa.Column('dim', sa.Integer(), nullable=True))
+        batch_op.add_column(sa.Column('model_name', sa.String(length=255), nullable=True))
+
+    conn = op.get_bind()
+    for rows in _batches(conn, recipe_embeddings.c.embedding):
+        for rid, emb in rows:
+            arr = np.asarray(emb, dtype='<f4')
+            conn.execute(
+                recipe_embeddings.update()
+                .where(recipe_embeddings.c.recipe_id == rid)
+                .values(vector=arr.tobytes(), dtype='float32', dim=arr.shape[0],
+                        model_name=MODEL_NAME)
+            )
+
+    with op.batch_alter_table('recipe_embeddings') as batch_op:
+        batch_op.alter_column('vector', existing_type=sa.LargeBinary(), nullable=False)
+        batch_op.alter_column('dtype', existing_type=sa.String(length=16), nullable=False)
+        batch_op.alter_column('dim', existing_type=sa.Integer(), nullable=False)
+        batch_op.alter_column('model_name', existing_type=sa.String(length=255), nullable=False)
+        batch_op.drop_column('embedding')
+
+
+def downgrade() -> None:
+    """바이트 벡터 → JSON float 리스트."""
+    with op.batch_alter_table('recipe_embeddings') as batch_op:
+        batch_op.add_column(sa.Column('embedding', sa.JSON(), nullable=True))
+
+    conn = op.get_bind()
+    dtypes = {'float32': '<f4', 'float16': '<f2'}
+    for rows in _batches(conn, recipe_embeddings.c.vector, recipe_embeddings.c.dtype):
+        for rid, blob, dtype in rows:
+            vec = np.frombuffer(blob, dtype=dtypes[dtype]).astype(np.float32).tolist()
+            conn.execute(
+                recipe_embeddings.update()
+                .where(recipe_embeddings.c.recipe_id == rid)
+                .values(embedding=vec)
+            )
+
+    with op.batch_alter_table('recipe_embeddings') as batch_op:
+        batch_op.alter_column('embedding', existing_type=sa.JSON(), nullable=False)
+        batch_op.drop_column('model_name')
+        batch_op.drop_column('dim')
+        batch_op.drop_column('dtype')
+        batch_op.drop_column('vector')
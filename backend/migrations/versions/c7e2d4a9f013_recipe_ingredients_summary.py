@@ -0,0 +1,27 @@
+"""recipe ingredients summary
+
+Revision ID: c7e2d4a9f013
+Revises: a3f1c9e2b7d4
+Create Date: 2026-10-17 14:03:27.519204
+
+"""
+from typing import Sequence, Union
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = 'c7e2d4a9f013'
+down_revision: Union[str, None] = 'a3f1c9e2b7d4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """recipes.ingredients_summary 추가 (기존 행은 python -m app.recipe_summary 로 채움)."""
+    with op.batch_alter_table('recipes') as batch_op:
+        batch_op.add_column(sa.Column('ingredients_summary', sa.Text(), nullable=True))
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('recipes') as batch_op:
+        batch_op.drop_column('ingredients_summary')
@@ -0,0 +1,34 @@
+"""ingredient fetch log
+
+Revision ID: e4b8a1d6c352
+Revises: c7e2d4a9f013
+Create Date: 2026-10-17 16:41:08.730915
+
+"""
+from typing import Sequence, Union
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = 'e4b8a1d6c352'
+down_revision: Union[str, None] = 'c7e2d4a9f013'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """재료명별 식약처 API 수집 기록 (신선도 + 수집 임대)."""
+    op.create_table(
+        'ingredient_fetch_log',
+        sa.Column('ingredient_id', sa.Integer(), nullable=False),
+        sa.Column('fetched_at', sa.DateTime(), nullable=True),
+        sa.Column('row_count', sa.Integer(), server_default='0', nullable=False),
+        sa.Column('recipe_ids', sa.JSON(), nullable=True),
+        sa.Column('fetching_since', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['ingredient_id'], ['ingredient_master.id']),
+        sa.PrimaryKeyConstraint('ingredient_id'),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('ingredient_fetch_log')
@@ -3,14 +3,23 @@ from __future__ import annotations
 from dotenv import load_dotenv
 load_dotenv()
 
-import os, uuid, time, logging, re, unicodedata
-from typing import List, Dict
+import os, argparse, asyncio, contextvars, time, logging, re, unicodedata, sqlite3, threading, queue
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import List, Dict, NamedTuple, Optional, Sequence, Tuple, TYPE_CHECKING
 
-from sentence_transformers import SentenceTransformer
+import numpy as np
 from sqlmodel import SQLModel, Session, select, create_engine
-from qdrant_client import QdrantClient, models as qd
 from sqlalchemy.exc import IntegrityError
-from sqlalchemy import func
+from sqlalchemy import and_, delete, func
+
+from encoder_backends import load_encoder
+from vector_store import VectorStore, SearchFilter, Hit, create_store
+from ingredient_index import RecipeIngredientIndex
+from app.metrics import stage, count_candidates
+
+if TYPE_CHECKING:
+    from sentence_transformers import SentenceTransformer
 
 
 # ───────── 기본 설정 ──────────────────────────────────────
@@ -18,8 +27,44 @@ DB_URL      = os.getenv("DATABASE_URL", "sqlite:///example.db")
 QDRANT_URL  = os.getenv("QDRANT_URL",  "http://localhost:6201")
 COL         = "recipes_bert_vector"
 
-MODEL_NAME  = "BM-K/KoSimCSE-bert"
+# qdrant | qdrant-local | numpy  (vector_store.py 참고)
+VECTOR_BACKEND   = os.getenv("VECTOR_BACKEND", "qdrant")
+QDRANT_PATH      = os.getenv("QDRANT_PATH", "./qdrant_local")          # qdrant-local 전용
+VECTOR_MMAP_PATH = os.getenv("VECTOR_MMAP_PATH", "./recipe_vectors.npy")  # numpy 전용
+
+MODEL_NAME  = os.getenv("MODEL_NAME", "BM-K/KoSimCSE-bert")
 BATCH_SIZE  = 64
+# torch | torch-int8 | onnx | onnx-int8  (encoder_backends.py 참고)
+ENCODER_BACKEND = os.getenv("ENCODER_BACKEND", "torch")
+# RecipeEmbedding.model_name: 양자화/ONNX 벡터는 fp32 와 조금 달라 백엔드별로 따로 기록
+# (torch 는 기존 행과 호환되도록 모델 이름 그대로)
+EMBED_MODEL_ID = MODEL_NAME if ENCODER_BACKEND == "torch" else f"{MODEL_NAME}:{ENCODER_BACKEND}"
+# RecipeEmbedding 저장 정밀도: float32 | float16
+EMBED_STORE_DTYPE = os.getenv("EMBED_STORE_DTYPE", "float32")
+
+QUERY_CACHE_SIZE = int(os.getenv("QUERY_CACHE_SIZE", "1024"))
+QUERY_CACHE_PATH = os.getenv("QUERY_CACHE_PATH")   # 설정 시 SQLite 파일에 영속화
+
+ENCODER_MAX_BATCH   = int(os.getenv("ENCODER_MAX_BATCH", "32"))
+ENCODER_MAX_WAIT_MS = float(os.getenv("ENCODER_MAX_WAIT_MS", "5"))
+ENCODER_TIMEOUT_SEC = float(os.getenv("ENCODER_TIMEOUT_SEC", "30"))   # 동기 encode() 대기 상한
+
+# 비동기 추천 경로에서 동기 DB 작업을 돌릴 스레드 수
+RAG_DB_THREADS = int(os.getenv("RAG_DB_THREADS", "8"))
+
+# 워터마크 없이 처음부터 훑는 주기 (늦게 커밋된 낮은 id 레시피 복구용, 초)
+EMBED_RESCAN_SEC    = float(os.getenv("EMBED_RESCAN_SEC", "600"))
+
+# 사용자별 냉장고(재료 id·이름) 캐시. 변경 핸들러가 무효화하며 TTL 은 안전장치
+FRIDGE_CACHE_SIZE = int(os.getenv("FRIDGE_CACHE_SIZE", "4096"))
+FRIDGE_CACHE_TTL  = float(os.getenv("FRIDGE_CACHE_TTL", "30"))
+
+# 근접 중복 쿼리 검색 결과 캐시 (코사인 유사도 threshold 이상이면 재사용, SIZE=0 이면 끔)
+SEMANTIC_CACHE_SIZE      = int(os.getenv("SEMANTIC_CACHE_SIZE", "1024"))
+SEMANTIC_CACHE_THRESHOLD = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.97"))
+SEMANTIC_CACHE_TTL       = float(os.getenv("SEMANTIC_CACHE_TTL", "300"))
+# 다른 프로세스(worker.py)의 임베딩을 감지해 캐시를 비우는 폴링 주기 (초, 0 이면 TTL 만)
+SEMANTIC_CACHE_SYNC_SEC  = float(os.getenv("SEMANTIC_CACHE_SYNC_SEC", "5"))
 
 logging.basicConfig(level=logging.INFO, format="%(levelname)s:%(message)s")
 log = logging.getLogger("engine")
@@ -27,31 +72,464 @@ log = logging.getLogger("engine")
 # ───────── DB 모델 ────────────────────────────────────────
 from app.models import (
     Recipe, Ingredient, IngredientMaster,
-    RecipeEmbedding, UserIngredient, IngredientRecipeMapping
+    RecipeEmbedding, UserIngredient
 )
 
 engine = create_engine(DB_URL, echo=False)
 
-# ───────── Qdrant & SBERT ─────────────────────────────────
-qc    = QdrantClient(QDRANT_URL)
-model = SentenceTransformer(MODEL_NAME)
-DIM   = model.get_sentence_embedding_dimension()
+# recipe_id → 재료 id 역색인 (warmup 또는 첫 추천 때 로드)
+ingredient_index = RecipeIngredientIndex()
+
+# ───────── 벡터 저장소 & SBERT (지연 초기화) ──────────────
+# import 만으로는 모델/클라이언트를 만들지 않습니다. (alembic, 일회성 스크립트 등)
+_store: Optional[VectorStore]           = None
+_model: Optional["SentenceTransformer"] = None
+_init_lock = threading.Lock()
+_ready     = threading.Event()
+
+def get_store() -> VectorStore:
+    global _store
+    if _store is None:
+        with _init_lock:
+            if _store is None:
+                _store = create_store(
+                    VECTOR_BACKEND, COL,
+                    qdrant_url=QDRANT_URL, qdrant_path=QDRANT_PATH,
+                    mmap_path=VECTOR_MMAP_PATH, loader=_load_vectors,
+                )
+    return _store
+
+def get_model() -> "SentenceTransformer":
+    global _model
+    if _model is None:
+        with _init_lock:
+            if _model is None:
+                log.info("임베딩 모델 로드: %s (%s)", MODEL_NAME, ENCODER_BACKEND)
+                _model = load_encoder(MODEL_NAME, ENCODER_BACKEND)
+    return _model
+
+def get_dim() -> int:
+    return get_model().get_sentence_embedding_dimension()
 
 def reset_qdrant():
-    """콜렉션을 새로 시작하고 싶을 때만 호출하세요."""
-    if COL in [c.name for c in qc.get_collections().collections]:
-        qc.delete_collection(collection_name=COL)
-    qc.create_collection(
-        collection_name=COL,
-        vectors_config={"vector": qd.VectorParams(size=DIM, distance="Cosine")}
-    )
-    log.info("Qdrant 컬렉션 초기화 완료")
+    """벡터 저장소(콜렉션)를 새로 시작하고 싶을 때만 호출하세요."""
+    get_store().reset(get_dim())
+    hit_cache.invalidate()
+    log.info("%s 벡터 저장소 초기화 완료", VECTOR_BACKEND)
 
 # ───────── build_doc: 태그 기반 문서 ──────────────────────
 def _norm(txt: str) -> str:
     txt = unicodedata.normalize("NFKC", txt or "")
     return re.sub(r"\s+", " ", txt).strip().lower()
 
+# ───────── 쿼리 임베딩 캐시 ───────────────────────────────
+class QueryEmbeddingCache:
+    """
+    정규화된 쿼리(_norm) → 임베딩 벡터 LRU 캐시.
+    path 를 주면 SQLite 파일에도 저장하고, 재시작 시 최근 사용 순으로 maxsize 개를 다시 올립니다.
+    · get/put 은 메모리 LRU 만 만지고 바로 반환 (이벤트 루프에서 호출됨)
+    · 파일 쓰기(추가/삭제/last_used 갱신)는 모아 두었다가 백그라운드 스레드가 한 번에 커밋
+      (put 이 오면 바로, 적중 갱신은 touch_batch 건 / touch_flush_sec 마다)
+    · flush() 는 남은 쓰기를 호출 스레드에서 끝까지 반영 (종료 시)
+    """
+
+    touch_batch     = 64
+    touch_flush_sec = 30.0
+
+    def __init__(self, maxsize: int = QUERY_CACHE_SIZE, path: Optional[str] = None,
+                 namespace: str = f"{MODEL_NAME}:{ENCODER_BACKEND}"):
+        self.maxsize   = maxsize
+        self.namespace = namespace
+        self.hits      = 0
+        self.misses    = 0
+        self._data: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._io_lock = threading.Lock()                          # _conn 사용 직렬화
+        self._wake = threading.Event()
+        self._writes: Dict[str, Optional[Tuple[bytes, float]]] = {}  # None = 삭제
+        self._touched: Dict[str, float] = {}
+        self._touched_at = time.monotonic()
+        if path:
+            self._open(path)
+
+    def _open(self, path: str):
+        # 같은 파일을 여러 워커가 공유 → WAL + busy timeout (app/llm_cache.py 와 동일)
+        self._conn = sqlite3.connect(path, timeout=5, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS query_vectors ("
+            " namespace TEXT NOT NULL, query TEXT NOT NULL,"
+            " vector BLOB NOT NULL, last_used REAL NOT NULL,"
+            " PRIMARY KEY (namespace, query))"
+        )
+        rows = self._conn.execute(
+            "SELECT query, vector FROM query_vectors WHERE namespace = ?"
+            " ORDER BY last_used DESC LIMIT ?",
+            (self.namespace, self.maxsize),
+        ).fetchall()
+        for q, blob in reversed(rows):      # 오래된 것부터 넣어 LRU 순서 유지
+            self._data[q] = self._freeze(np.frombuffer(blob, dtype=np.float32))
+        self._conn.execute(
+            "DELETE FROM query_vectors WHERE namespace = ? AND query NOT IN"
+            " (SELECT query FROM query_vectors WHERE namespace = ?"
+            "  ORDER BY last_used DESC LIMIT ?)",
+            (self.namespace, self.namespace, self.maxsize),
+        )
+        self._conn.commit()
+        threading.Thread(target=self._writer, name="query-cache-writer", daemon=True).start()
+        log.info("쿼리 임베딩 캐시 %d건 로드 (%s)", len(self._data), path)
+
+    @staticmethod
+    def _freeze(vec) -> np.ndarray:
+        arr = np.asarray(vec, dtype=np.float32)
+        arr.setflags(write=False)           # 캐시 공유 벡터가 호출자에게 수정되지 않도록
+        return arr
+
+    def get(self, key: str) -> Optional[np.ndarray]:
+        with self._lock:
+            vec = self._data.get(key)
+            if vec is None:
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            if self._conn is not None:
+                self._touched[key] = time.time()
+                if len(self._touched) >= self.touch_batch:
+                    self._wake.set()
+            return vec
+
+    def put(self, key: str, vec) -> np.ndarray:
+        vec = self._freeze(vec)
+        with self._lock:
+            self._data[key] = vec
+            self._data.move_to_end(key)
+            evicted = []
+            while len(self._data) > self.maxsize:
+                evicted.append(self._data.popitem(last=False)[0])
+            if self._conn is not None:
+                self._writes[key] = (vec.tobytes(), time.time())
+                for k in evicted:
+                    self._writes[k] = None
+                self._wake.set()
+        return vec
+
+    def _writer(self):
+        while True:
+            self._wake.wait(self.touch_flush_sec)
+            self._wake.clear()
+            try:
+                self._drain(force=False)
+            except Exception:
+                log.exception("쿼리 임베딩 캐시 저장 실패")
+
+    def flush(self):
+        """모아 둔 추가/삭제/적중 갱신을 지금 한 트랜잭션으로 반영."""
+        if self._conn is not None:
+            self._drain(force=True)
+
+    def _drain(self, force: bool):
+        with self._io_lock:
+            with self._lock:
+                writes, self._writes = self._writes, {}
+                touched = {}
+                if force or len(self._touched) >= self.touch_batch \
+                        or time.monotonic() - self._touched_at >= self.touch_flush_sec:
+                    touched, self._touched = self._touched, {}
+                    self._touched_at = time.monotonic()
+            if not writes and not touched:
+                return
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO query_vectors VALUES (?, ?, ?, ?)",
+                [(self.namespace, k, w[0], w[1]) for k, w in writes.items() if w is not None],
+            )
+            self._conn.executemany(
+                "DELETE FROM query_vectors WHERE namespace = ? AND query = ?",
+                [(self.namespace, k) for k, w in writes.items() if w is None],
+            )
+            self._conn.executemany(
+                "UPDATE query_vectors SET last_used = ? WHERE namespace = ? AND query = ?",
+                [(t, self.namespace, k) for k, t in touched.items() if k not in writes],
+            )
+            self._conn.commit()
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._writes.clear()
+            self._touched.clear()
+            self.hits = self.misses = 0
+        if self._conn is not None:
+            with self._io_lock:
+                self._conn.execute(
+                    "DELETE FROM query_vectors WHERE namespace = ?", (self.namespace,)
+                )
+                self._conn.commit()
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "size":     len(self._data),
+                "maxsize":  self.maxsize,
+                "hits":     self.hits,
+                "misses":   self.misses,
+                "hit_rate": self.hits / total if total else 0.0,
+            }
+
+query_cache = QueryEmbeddingCache(QUERY_CACHE_SIZE, QUERY_CACHE_PATH)
+
+# ───────── 근접 중복 쿼리 검색 결과 캐시 ───────────────────
+class SemanticHitCache:
+    """
+    쿼리 벡터 → 벡터 검색 결과(Hit 목록, 냉장고 가산점 적용 전) 캐시.
+    · 같은 필터로 저장된 벡터 중 코사인 유사도가 threshold 이상인 것이 있으면 그 결과를 재사용
+      ("얼큰한 찌개" / "얼큰한 찌개 추천") → 사용자별 가산점은 호출자가 매번 다시 적용
+    · 벡터는 (maxsize, dim) 행렬 한 장에 두어 조회는 matmul 1회 (정규화 벡터라 내적 = 코사인)
+    · LRU + TTL. 레시피가 새로 임베딩되면 invalidate() 로 비우고, generation 이 바뀐 뒤
+      도착한 (무효화 전에 시작한) 검색 결과는 저장하지 않음
+    · 다른 프로세스의 임베딩은 watch_embeddings() 가 recipe_embeddings 의 (건수, 최대 id) 변화로
+      감지해 invalidate(). 기존 레시피를 다시 임베딩한 경우(건수 그대로)는 TTL 로만 반영
+    """
+
+    def __init__(self, maxsize: int, threshold: float, ttl: float):
+        self.maxsize   = max(0, maxsize)
+        self.threshold = threshold
+        self.ttl       = ttl
+        self.hits = self.misses = self.invalidations = 0
+        self._vecs: Optional[np.ndarray] = None          # 첫 put 때 (maxsize, dim) 할당
+        # slot → (필터 key, 만료 시각, hits), LRU 순
+        self._slots: "OrderedDict[int, tuple[Optional[tuple], float, Tuple[Hit, ...]]]" = OrderedDict()
+        self._free = list(range(self.maxsize))
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(flt: Optional[SearchFilter]) -> Optional[tuple]:
+        return None if flt is None or flt.is_empty() else tuple(flt)
+
+    def generation(self) -> int:
+        with self._lock:
+            return self._generation
+
+    def get(self, qv: np.ndarray, flt: Optional[SearchFilter] = None) -> Optional[Tuple[Hit, ...]]:
+        if not self.maxsize:
+            return None
+        key, now = self._key(flt), time.monotonic()
+        with self._lock:
+            if self._slots:
+                sims = self._vecs @ qv
+                close = np.flatnonzero(sims >= self.threshold)
+                for slot in close[np.argsort(-sims[close])]:
+                    entry = self._slots.get(int(slot))
+                    if entry is not None and entry[0] == key and entry[1] > now:
+                        self._slots.move_to_end(int(slot))
+                        self.hits += 1
+                        return entry[2]
+            self.misses += 1
+            return None
+
+    def put(self, qv: np.ndarray, flt: Optional[SearchFilter], hits: Sequence[Hit],
+            generation: int) -> None:
+        if not self.maxsize:
+            return
+        with self._lock:
+            if generation != self._generation:
+                return                                   # 검색 중 레시피가 새로 임베딩됨
+            if self._vecs is None:
+                self._vecs = np.zeros((self.maxsize, len(qv)), dtype=np.float32)
+            if self._free:
+                slot = self._free.pop()
+            else:
+                slot, _ = self._slots.popitem(last=False)
+            self._vecs[slot] = qv
+            self._slots[slot] = (self._key(flt), time.monotonic() + self.ttl, tuple(hits))
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._generation += 1
+            self.invalidations += 1
+            self._slots.clear()
+            self._free = list(range(self.maxsize))
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "size":          len(self._slots),
+                "maxsize":       self.maxsize,
+                "threshold":     self.threshold,
+                "hits":          self.hits,
+                "misses":        self.misses,
+                "hit_rate":      self.hits / total if total else 0.0,
+                "invalidations": self.invalidations,
+            }
+
+hit_cache = SemanticHitCache(SEMANTIC_CACHE_SIZE, SEMANTIC_CACHE_THRESHOLD, SEMANTIC_CACHE_TTL)
+
+def embedding_version() -> tuple:
+    """recipe_embeddings 의 (건수, 최대 recipe_id) — 새 레시피가 임베딩되면 바뀜."""
+    with Session(engine) as db:
+        return tuple(db.exec(
+            select(func.count(), func.max(RecipeEmbedding.recipe_id)).select_from(RecipeEmbedding)
+        ).one())
+
+def sync_hit_cache(last: Optional[tuple]) -> tuple:
+    """embedding_version() 이 last 와 다르면 hit_cache 비움. 반환: 현재 version"""
+    version = embedding_version()
+    if last is not None and version != last:
+        hit_cache.invalidate()
+    return version
+
+def watch_embeddings(interval: float = SEMANTIC_CACHE_SYNC_SEC) -> Optional[threading.Thread]:
+    """API 프로세스용: interval 초마다 sync_hit_cache() (다른 프로세스의 임베딩 반영)."""
+    if interval <= 0 or not hit_cache.maxsize:
+        return None
+
+    def loop():
+        last = None
+        while True:
+            try:
+                last = sync_hit_cache(last)
+            except Exception:
+                log.exception("임베딩 변경 확인 실패")
+            time.sleep(interval)
+
+    t = threading.Thread(target=loop, name="embed-watch", daemon=True)
+    t.start()
+    return t
+
+# ───────── 마이크로 배칭 인코더 ────────────────────────────
+class MicroBatchEncoder:
+    """
+    동시에 들어온 쿼리들을 최대 max_wait_ms 동안(최대 max_batch 개) 모아
+    model.encode 한 번으로 처리하고, 각 호출자에게 자기 벡터를 돌려줍니다.
+    같은 배치 안의 중복 문장은 한 번만 인코딩합니다.
+    """
+
+    def __init__(self, encode_fn, max_batch: int = ENCODER_MAX_BATCH,
+                 max_wait_ms: float = ENCODER_MAX_WAIT_MS):
+        self._encode   = encode_fn
+        self.max_batch = max(1, max_batch)
+        self.max_wait  = max(0.0, max_wait_ms) / 1000
+        self.batches   = 0
+        self.items     = 0
+        self._queue: "queue.Queue[tuple[str, Future]]" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def _ensure_started(self):
+        # fork 이후(uvicorn workers)에 스레드가 생기도록 첫 호출 시점에 시작
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(
+                        target=self._run, name="micro-batch-encoder", daemon=True
+                    )
+                    self._thread.start()
+
+    def submit(self, text: str) -> Future:
+        self._ensure_started()
+        fut: Future = Future()
+        self._queue.put((text, fut))
+        return fut
+
+    def encode(self, text: str, timeout: Optional[float] = ENCODER_TIMEOUT_SEC) -> np.ndarray:
+        return self.submit(text).result(timeout)
+
+    def _collect(self) -> list:
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            try:
+                if remaining > 0:
+                    batch.append(self._queue.get(timeout=remaining))
+                else:
+                    batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        # 이 스레드가 죽으면 이후 submit() 이 모두 멈추므로 배치 단위 예외는 여기서 끝냄
+        while True:
+            try:
+                self._run_batch(self._collect())
+            except Exception:
+                log.exception("마이크로 배치 인코딩 실패")
+
+    def _run_batch(self, batch: list) -> None:
+        # 호출자가 이미 취소한 Future 는 빼고, 나머지는 RUNNING 으로 (이후 cancel() 불가)
+        batch = [(t, fut) for t, fut in batch if fut.set_running_or_notify_cancel()]
+        if not batch:
+            return
+        texts = list(dict.fromkeys(t for t, _ in batch))
+        try:
+            vecs = dict(zip(texts, self._encode(texts)))
+        except Exception as e:
+            for _, fut in batch:
+                fut.set_exception(e)
+            return
+        self.batches += 1
+        self.items   += len(batch)
+        for text, fut in batch:
+            fut.set_result(vecs[text])
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            "batches":        self.batches,
+            "items":          self.items,
+            "avg_batch_size": self.items / self.batches if self.batches else 0.0,
+        }
+
+def _encode_batch(texts: List[str]):
+    return get_model().encode(texts, batch_size=len(texts), normalize_embeddings=True)
+
+query_encoder = MicroBatchEncoder(_encode_batch, ENCODER_MAX_BATCH, ENCODER_MAX_WAIT_MS)
+
+# ───────── 워밍업 & 준비 상태 ──────────────────────────────
+def warmup():
+    """모델 로드 + 더미 인코딩 + 벡터 저장소 ping/인덱스 확인. 끝나야 is_ready() 가 True 가 됩니다."""
+    t0 = time.perf_counter()
+    _encode_batch(["워밍업"])
+    get_store().ping()
+    get_store().ensure_indexes()
+    ingredient_index.load(engine)
+    _ready.set()
+    log.info("워밍업 완료 (%.2fs)", time.perf_counter() - t0)
+
+def is_ready() -> bool:
+    return _ready.is_set()
+
+def encode_query(query: str) -> np.ndarray:
+    """쿼리 벡터 반환. 캐시 적중 시 인코더를 전혀 거치지 않습니다."""
+    key = _norm(query)
+    with stage("encode"):
+        vec = query_cache.get(key)
+        if vec is None:
+            vec = query_cache.put(key, query_encoder.encode(key))
+    return vec
+
+def encode_queries(queries: Sequence[str]) -> np.ndarray:
+    """
+    여러 쿼리 → (n, dim) 행렬 (입력 순서). 캐시에 없는 고유 쿼리만
+    model.encode 한 번으로 인코딩합니다 (배치 추천/평가용).
+    """
+    keys = [_norm(q) for q in queries]
+    with stage("encode"):
+        vecs = {k: query_cache.get(k) for k in dict.fromkeys(keys)}
+        todo = [k for k, v in vecs.items() if v is None]
+        if todo:
+            encoded = get_model().encode(todo, batch_size=BATCH_SIZE, normalize_embeddings=True)
+            for k, v in zip(todo, encoded):
+                vecs[k] = query_cache.put(k, v)
+    if not keys:
+        return np.empty((0, get_dim()), dtype=np.float32)
+    return np.stack([vecs[k] for k in keys])
+
 def build_doc(r: Recipe, ing_names: List[str]) -> str:
     tags = [
         f"[레시피명:{_norm(r.name)}]",
@@ -63,104 +541,314 @@ def build_doc(r: Recipe, ing_names: List[str]) -> str:
     return " ".join(tags) + " " + summary
 
 # ───────── 1) 신규 레시피 임베딩 & 업서트 ────────────────
-def embed_new_recipes(batch: int = BATCH_SIZE):
-    with Session(engine) as db:
-        subq = select(RecipeEmbedding.recipe_id)  # 이미 임베딩된 레시피 id
-
+def _payload(r: Recipe) -> Dict:
+    # category/method/calories/protein 은 검색 필터(SearchFilter)에 쓰입니다
+    return {
+        "recipe_id": r.id,
+        "name":      r.name,
+        "category":  r.category,
+        "method":    r.method,
+        "calories":  r.calories,
+        "protein":   r.protein,
+        "carbs":     r.carbs,
+        "fat":       r.fat,
+        "sodium":    r.sodium,
+    }
+
+def _ingredient_names(db: Session, rid_list: List[int]) -> Dict[int, List[str]]:
+    ing_map: Dict[int, List[str]] = {}
+    rows = db.exec(
+        select(Ingredient.recipe_id, IngredientMaster.name)
+        .join(IngredientMaster, Ingredient.master_id == IngredientMaster.id)
+        .where(Ingredient.recipe_id.in_(rid_list))
+    ).all()
+    for rid, iname in rows:
+        ing_map.setdefault(rid, []).append(iname)
+    return ing_map
+
+def _upsert_points(ids: List[int], vecs: np.ndarray, payloads: List[Dict]):
+    get_store().upsert(ids, vecs, payloads)
+    # 새 레시피가 검색 대상이 되었으므로 이전 검색 결과는 재사용하지 않음
+    hit_cache.invalidate()
+
+def _save_embeddings(db: Session, upload: Future, rows: List[RecipeEmbedding]) -> List[int]:
+    """Qdrant 업로드가 끝난 배치만 RecipeEmbedding 으로 기록. 반환: 커밋되지 못한 recipe id."""
+    upload.result()
+    ids = [e.recipe_id for e in rows]
+    db.execute(delete(RecipeEmbedding).where(RecipeEmbedding.recipe_id.in_(ids)))
+    db.add_all(rows)
+    try:
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        log.warning("임베딩 %d건 저장 실패 (다음 패스에서 다시 시도)", len(rows))
+        return ids
+    log.info("업서트 %d건 완료", len(rows))
+    return []
+
+def _embed_batches(db: Session, fetch_batch, batch: int, start_id: int = 0) -> tuple[int, int, List[int]]:
+    """
+    fetch_batch(last_id) 가 돌려주는 레시피 배치를 차례로 임베딩.
+    배치 N 을 Qdrant 에 올리는 동안 배치 N+1 을 인코딩합니다(업로드 스레드 1개).
+    반환: (임베딩 건수, 마지막으로 본 recipe id, 저장에 실패한 recipe id)
+    """
+    model = None                    # 임베딩할 레시피가 없으면 모델을 로드하지 않음
+    total, last_id = 0, start_id
+    failed: List[int] = []
+    pending = None
+    with ThreadPoolExecutor(max_workers=1, thread_name_prefix="qdrant-upsert") as uploader:
         while True:
-            recs: List[Recipe] = db.exec(
-                select(Recipe)
-                .where(~Recipe.id.in_(subq))
-                .limit(batch)
-            ).all()
+            recs: List[Recipe] = fetch_batch(last_id)
             if not recs:
                 break
+            last_id = recs[-1].id
+            model = model or get_model()
 
-            rid_list = [r.id for r in recs]
-
-            # 재료 이름 매핑
-            ing_map: Dict[int, List[str]] = {}
-            rows = db.exec(
-                select(Ingredient.recipe_id, IngredientMaster.name)
-                .join(IngredientMaster, Ingredient.master_id == IngredientMaster.id)
-                .where(Ingredient.recipe_id.in_(rid_list))
-            ).all()
-
-            for rid, iname in rows:
-                ing_map.setdefault(rid, []).append(iname)
-
-            # 임베딩
+            ing_map = _ingredient_names(db, [r.id for r in recs])
             docs = [build_doc(r, ing_map.get(r.id, [])) for r in recs]
-            vecs = model.encode(docs, convert_to_list=True, normalize_embeddings=True)
-
-            for r, v in zip(recs, vecs):
-                pid = str(uuid.uuid4())
-                qc.upsert(
-                    collection_name=COL,
-                    points=[qd.PointStruct(
-                        id=pid,
-                        vector={"vector": v},
-                        payload={
-                            "recipe_id": r.id,
-                            "name":      r.name,
-                            "category":  r.category,
-                            "method":    r.method
-                        }
-                    )]
-                )
-                db.add(RecipeEmbedding(recipe_id=r.id, embedding=v.tolist()))
+            vecs = model.encode(docs, batch_size=batch, normalize_embeddings=True)
 
-            try:
-                db.commit()
-            except IntegrityError:
-                db.rollback()
+            rows = [
+                RecipeEmbedding.from_array(r.id, v, EMBED_MODEL_ID, EMBED_STORE_DTYPE)
+                for r, v in zip(recs, vecs)
+            ]
 
-            log.info("업서트 %d건 완료", len(recs))
-            time.sleep(0.05)
+            if pending:
+                failed += _save_embeddings(db, *pending)
+            upload = uploader.submit(
+                _upsert_points, [r.id for r in recs], vecs, [_payload(r) for r in recs]
+            )
+            pending = (upload, rows)
+            total += len(recs)
 
-# ───────── 2) 사용자 맞춤 추천 ────────────────────────────
-def recommend_for_user(user_id: int, query: str, top_k: int = 10, boost: float = 0.2):
-    # 1) 사용자 냉장고 재료 ID 조회
+        if pending:
+            failed += _save_embeddings(db, *pending)
+    # numpy 저장소: 패스 동안 덧붙인 delta 를 행렬 파일에 한 번만 합침
+    get_store().flush()
+    return total - len(failed), last_id, failed
+
+def load_embedding_matrix(model_name: str = EMBED_MODEL_ID) -> tuple[np.ndarray, np.ndarray]:
+    """RecipeEmbedding 전체 → (recipe_id 배열, (n, dim) float32 행렬). dtype 이 같으면 단일 버퍼 읽기."""
     with Session(engine) as db:
-        fridge_ids: list[int] = db.exec(
-            select(IngredientMaster.id)
-            .join(UserIngredient, IngredientMaster.id == UserIngredient.ingredient_id)
-            .where(UserIngredient.user_id == user_id)
+        rows = db.exec(
+            select(RecipeEmbedding.recipe_id, RecipeEmbedding.vector,
+                   RecipeEmbedding.dtype, RecipeEmbedding.dim)
+            .where(RecipeEmbedding.model_name == model_name)
+            .order_by(RecipeEmbedding.recipe_id)
         ).all()
+    ids = np.fromiter((r[0] for r in rows), dtype=np.int64, count=len(rows))
+    if not rows:
+        return ids, np.empty((0, 0), dtype=np.float32)
+    if len({(r[2], r[3]) for r in rows}) == 1:
+        return ids, RecipeEmbedding.stack([r[1] for r in rows], rows[0][2], rows[0][3])
+    # dtype 이 섞여 있으면(예: float16 전환 중) 행 단위로 변환
+    return ids, np.stack([RecipeEmbedding.stack([r[1]], r[2], r[3])[0] for r in rows])
+
+def _load_vectors() -> tuple[np.ndarray, np.ndarray, List[Dict]]:
+    """numpy 벡터 저장소 초기 적재용: (recipe_id, 행렬, payload) — 같은 순서."""
+    ids, matrix = load_embedding_matrix()
+    with Session(engine) as db:
+        recipes = {r.id: r for r in db.exec(select(Recipe).where(Recipe.id.in_(ids.tolist())))}
+    return ids, matrix, [_payload(recipes[int(i)]) if int(i) in recipes else {"recipe_id": int(i)}
+                         for i in ids]
+
+# 이 프로세스에서 id <= _embed_watermark 인 레시피는 이미 임베딩됨 (첫 패스는 0부터 → 빈틈 복구)
+# · 저장에 실패한 배치가 있으면 그 최소 id 앞까지만 전진
+# · 훑고 지나간 뒤에 커밋된 낮은 id 는 EMBED_RESCAN_SEC 마다 처음부터 다시 훑어 복구
+_embed_watermark = 0
+_embed_rescan_at = 0.0
+_embed_lock = threading.Lock()
+
+def _unembedded():
+    # NOT IN 서브쿼리 대신 LEFT JOIN … IS NULL + recipe id keyset
+    # 다른 인코더 백엔드로 만든 벡터도 "임베딩 안 됨" → 백엔드를 바꾸면 스윕이 다시 임베딩해 덮어씀
+    return (
+        select(Recipe)
+        .outerjoin(RecipeEmbedding, and_(RecipeEmbedding.recipe_id == Recipe.id,
+                                         RecipeEmbedding.model_name == EMBED_MODEL_ID))
+        .where(RecipeEmbedding.recipe_id.is_(None))
+    )
 
-    # 2) 벡터 검색
-    qv = model.encode([query], normalize_embeddings=True)[0]
-    resp = qc.query_points(COL, query=qv, using="vector", limit=40, with_payload=True)
+def embed_recipe_ids(recipe_ids: Sequence[int], batch: int = BATCH_SIZE) -> tuple[int, List[int]]:
+    """recipe_ids 중 아직 임베딩되지 않은 레시피만 임베딩. 반환: (임베딩 건수, 저장에 실패한 id)"""
+    ids = sorted(set(recipe_ids))
+    with _embed_lock, Session(engine) as db:
+        def fetch(last_id: int) -> List[Recipe]:
+            rest = [i for i in ids if i > last_id]
+            while rest:
+                chunk, rest = rest[:batch], rest[batch:]
+                recs = db.exec(
+                    _unembedded().where(Recipe.id.in_(chunk)).order_by(Recipe.id)
+                ).all()
+                if recs:        # 이미 임베딩된 것만 있는 chunk 는 건너뜀
+                    return recs
+            return []
+
+        total, _, failed = _embed_batches(db, fetch, batch)
+        return total, failed
+
+def embed_new_recipes(batch: int = BATCH_SIZE, recipe_ids: Optional[List[int]] = None) -> int:
+    """
+    아직 임베딩되지 않은 레시피를 임베딩.
+    recipe_ids 를 주면 그 레시피들만, 아니면 워터마크 이후 레시피를 keyset 으로 훑습니다.
+    """
+    global _embed_watermark, _embed_rescan_at
+    if recipe_ids is not None:
+        return embed_recipe_ids(recipe_ids, batch)[0]
+    with _embed_lock, Session(engine) as db:
+        def fetch(last_id: int) -> List[Recipe]:
+            return db.exec(
+                _unembedded()
+                .where(Recipe.id > last_id)
+                .order_by(Recipe.id)
+                .limit(batch)
+            ).all()
 
-    # 3) 검색된 레시피 ID 리스트
-    resp_rids = [p.payload["recipe_id"] for p in resp.points]
+        start_id = _embed_watermark
+        if time.monotonic() >= _embed_rescan_at:
+            start_id, _embed_rescan_at = 0, time.monotonic() + EMBED_RESCAN_SEC
+        total, last_id, failed = _embed_batches(db, fetch, batch, start_id=start_id)
+        # 다시 훑은 경우에도 기존 워터마크 이하는 이미 임베딩됨 → 뒤로 가지 않되, 실패분 앞에서 멈춤
+        _embed_watermark = min([max(_embed_watermark, last_id)] + [i - 1 for i in failed])
+        return total
+
+def reindex_all(batch: int = BATCH_SIZE) -> int:
+    """모든 레시피를 다시 임베딩해 덮어씁니다. (예전 uuid 포인트 정리는 reset_qdrant 선행)"""
+    with _embed_lock, Session(engine) as db:
+        def fetch(last_id: int) -> List[Recipe]:
+            return db.exec(
+                select(Recipe).where(Recipe.id > last_id).order_by(Recipe.id).limit(batch)
+            ).all()
 
-    # 4) IngredientRecipeMapping 으로 overlap 카운트 조회
-    with Session(engine) as db:
-        rows: list[tuple[int,int]] = db.exec(
-            select(
-                IngredientRecipeMapping.recipe_id,
-                func.count(IngredientRecipeMapping.ingredient_id)
-            )
-            .where(
-                IngredientRecipeMapping.recipe_id.in_(resp_rids),
-                IngredientRecipeMapping.ingredient_id.in_(fridge_ids)
-            )
-            .group_by(IngredientRecipeMapping.recipe_id)
-        ).all()
+        total, _, _ = _embed_batches(db, fetch, batch)
+        return total
 
-    # recipe_id → 겹친 재료 수 매핑
-    overlap_count = {rid: cnt for rid, cnt in rows}
+# ───────── 임베딩 작업 (ingest_jobs, worker.py) ─────────────
+EMBED_JOB = "embed"
 
-    # 5) score 계산
-    scored: list[tuple[float,int]] = []
-    for p in resp.points:
-        rid = p.payload["recipe_id"]
-        overlap = overlap_count.get(rid, 0)
-        score = p.score + boost * overlap
-        scored.append((score, rid))
+def run_embed_job(payload: Dict) -> Dict:
+    """
+    {"recipe_ids"} 중 아직 임베딩되지 않은 레시피를 임베딩하는 작업 처리기.
+    재료 수집 작업이 레시피 저장과 같은 커밋으로 넣으므로, 프로세스가 죽어도 요청이 남음.
+    저장에 실패한 id 가 있으면 예외 → 작업 큐가 backoff 후 재시도 (이미 된 것은 건너뜀).
+    """
+    n, failed = embed_recipe_ids(payload["recipe_ids"])
+    if failed:
+        raise RuntimeError(f"임베딩 저장 실패 {len(failed)}건: {failed[:10]}")
+    return {"embedded": n}
 
-    # 6) 내림차순 정렬 & top_k 고유 추출
+# ───────── 2) 사용자 맞춤 추천 ────────────────────────────
+class Fridge(NamedTuple):
+    ids:   List[int]
+    names: List[str]
+
+class FridgeCache:
+    """
+    user_id → Fridge(재료 id, 재료 이름) LRU 캐시
+    · 냉장고를 바꾸는 핸들러(user_ingredients 생성/삭제)가 invalidate() 호출
+    · 사용자별 version: 조회 도중 invalidate 되면 그 결과는 저장하지 않음
+    · TTL 은 다른 워커 프로세스에서 일어난 변경에 대한 안전장치
+    """
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl     = ttl
+        self._data: "OrderedDict[int, tuple[float, Fridge]]" = OrderedDict()
+        self._versions: Dict[int, int] = {}
+        self._lock = threading.Lock()
+        self.hits = self.misses = 0
+
+    def version(self, user_id: int) -> int:
+        with self._lock:
+            return self._versions.get(user_id, 0)
+
+    def get(self, user_id: int) -> Optional[Fridge]:
+        with self._lock:
+            item = self._data.get(user_id)
+            if item is None or time.monotonic() - item[0] > self.ttl:
+                self.misses += 1
+                return None
+            self._data.move_to_end(user_id)
+            self.hits += 1
+            return item[1]
+
+    def put(self, user_id: int, version: int, fridge: Fridge) -> None:
+        with self._lock:
+            if self._versions.get(user_id, 0) != version:
+                return                                   # 조회 중 냉장고가 바뀜
+            self._data[user_id] = (time.monotonic(), fridge)
+            self._data.move_to_end(user_id)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def invalidate(self, user_id: int) -> None:
+        with self._lock:
+            self._versions[user_id] = self._versions.get(user_id, 0) + 1
+            self._data.pop(user_id, None)
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "size":     len(self._data),
+                "maxsize":  self.maxsize,
+                "hits":     self.hits,
+                "misses":   self.misses,
+                "hit_rate": self.hits / total if total else 0.0,
+            }
+
+fridge_cache = FridgeCache(FRIDGE_CACHE_SIZE, FRIDGE_CACHE_TTL)
+
+def get_fridges(db: Session, user_ids: Sequence[int]) -> Dict[int, Fridge]:
+    """캐시 우선, 미스인 사용자들만 id·이름을 한 쿼리로 읽어 캐시에 저장."""
+    fridges: Dict[int, Fridge] = {}
+    versions: Dict[int, int] = {}
+    for uid in dict.fromkeys(user_ids):
+        fridge = fridge_cache.get(uid)
+        if fridge is not None:
+            fridges[uid] = fridge
+        else:
+            versions[uid] = fridge_cache.version(uid)
+    if not versions:
+        return fridges
+
+    rows = db.exec(
+        select(UserIngredient.user_id, IngredientMaster.id, IngredientMaster.name)
+        .join(UserIngredient, IngredientMaster.id == UserIngredient.ingredient_id)
+        .where(UserIngredient.user_id.in_(list(versions)))
+    ).all()
+    loaded: Dict[int, Fridge] = {uid: Fridge([], []) for uid in versions}
+    for uid, ing_id, name in rows:
+        loaded[uid].ids.append(ing_id)
+        loaded[uid].names.append(name)
+    for uid, fridge in loaded.items():
+        fridge_cache.put(uid, versions[uid], fridge)
+    fridges.update(loaded)
+    return fridges
+
+def get_fridge(db: Session, user_id: int) -> Fridge:
+    return get_fridges(db, [user_id])[user_id]
+
+def _ensure_indexed(db: Session, recipe_ids: List[int]) -> None:
+    if not ingredient_index.loaded:
+        ingredient_index.load(engine)
+    missing = ingredient_index.missing(recipe_ids)
+    if missing:
+        # 다른 프로세스(시드/백그라운드 작업)가 추가한 레시피 → 해당 id 만 읽어 채움
+        ingredient_index.load_recipes(db, missing)
+
+def overlap_counts(db: Session, recipe_ids: List[int], fridge_ids: List[int]) -> np.ndarray:
+    """recipe_ids 순서대로 냉장고 재료와 겹치는 재료 수 (ingredient_index 사용)."""
+    _ensure_indexed(db, recipe_ids)
+    return ingredient_index.overlap(recipe_ids, fridge_ids)
+
+def _rank(hits: Sequence[Hit], overlaps: np.ndarray, top_k: int, boost: float) -> List[int]:
+    # score 계산
+    scored: list[tuple[float,int]] = [
+        (h.score + boost * int(overlap), h.recipe_id)
+        for h, overlap in zip(hits, overlaps)
+    ]
+
+    # 내림차순 정렬 & top_k 고유 추출
     unique_rids: list[int] = []
     seen = set()
     for score, rid in sorted(scored, key=lambda x: x[0], reverse=True):
@@ -169,22 +857,134 @@ def recommend_for_user(user_id: int, query: str, top_k: int = 10, boost: float =
             unique_rids.append(rid)
         if len(unique_rids) >= top_k:
             break
+    return unique_rids
 
-    # 7) DB에서 레시피 일괄 조회
+def _fetch_recipes(db: Session, recipe_ids: List[int]) -> List[Recipe]:
+    """recipe_ids 순서를 유지한 Recipe 목록."""
+    recipes = db.exec(
+        select(Recipe).where(Recipe.id.in_(recipe_ids))
+    ).all()
+    recipe_map = {r.id: r for r in recipes}
+    return [recipe_map[rid] for rid in recipe_ids if rid in recipe_map]
+
+def _rank_and_fetch(user_id: int, hits: Sequence[Hit], top_k: int,
+                    boost: float) -> Tuple[Fridge, List[Recipe]]:
+    """
+    검색 이후의 DB 작업을 세션 하나에서 처리.
+    세션은 첫 쿼리 때 커넥션을 잡으므로, 냉장고 캐시 적중 + 역색인 적중이면
+    레시피 조회 한 번이 유일한 DB 왕복입니다.
+    """
     with Session(engine) as db:
-        recipes = db.exec(
-            select(Recipe).where(Recipe.id.in_(unique_rids))
-        ).all()
+        with stage("overlap_sql"):
+            fridge = get_fridge(db, user_id)
+            overlaps = overlap_counts(db, [h.recipe_id for h in hits], fridge.ids)
+            unique_rids = _rank(hits, overlaps, top_k, boost)
+        with stage("recipe_fetch"):
+            return fridge, _fetch_recipes(db, unique_rids)
+
+def search_hits(qv: np.ndarray, flt: Optional[SearchFilter] = None) -> Sequence[Hit]:
+    """벡터 검색 (근접 중복 쿼리면 hit_cache 결과 재사용)."""
+    with stage("vector_search"):
+        generation = hit_cache.generation()
+        hits = hit_cache.get(qv, flt)
+        if hits is None:
+            hits = get_store().search(qv, limit=40, flt=flt)
+            hit_cache.put(qv, flt, hits, generation)
+    count_candidates(len(hits))
+    return hits
+
+def recommend_for_user(user_id: int, query: str, top_k: int = 10, boost: float = 0.2,
+                       flt: Optional[SearchFilter] = None):
+    # 1) 벡터 검색 (근접 중복 쿼리는 캐시)
+    hits = search_hits(encode_query(query), flt)
+
+    # 2) 냉장고(캐시) + overlap 가산점 반영 후 top_k 추출 + 레시피 조회 (순서 유지)
+    _, recipes = _rank_and_fetch(user_id, hits, top_k, boost)
+    return recipes
+
+def recommend_batch(pairs: Sequence[Tuple[int, str]], top_k: int = 10, boost: float = 0.2,
+                    flts: Optional[Sequence[Optional[SearchFilter]]] = None) -> List[List[Recipe]]:
+    """
+    (user_id, query) 여러 건을 한 번에 추천 (오프라인 평가, 일괄 추천 작업용).
+    인코딩 1회 → 벡터 배치 검색 1회 → 냉장고/역색인 보충/레시피 조회를 세션 하나에서.
+    결과는 입력 순서대로 recommend_for_user 와 같은 형태.
+    평가 결과가 캐시 상태에 좌우되지 않도록 근접 중복 캐시(hit_cache)는 쓰지 않습니다.
+    """
+    if not pairs:
+        return []
+    qvs = encode_queries([q for _, q in pairs])
+    with stage("vector_search"):
+        hits_per = get_store().search_batch(qvs, limit=40, flts=flts)
+    count_candidates(sum(len(hits) for hits in hits_per))
 
-    # 8) 원래 order 대로 재정렬
-    recipe_map = {r.id: r for r in recipes}
-    ordered_recipes = [recipe_map[rid] for rid in unique_rids if rid in recipe_map]
+    with Session(engine) as db:
+        with stage("overlap_sql"):
+            fridges = get_fridges(db, [uid for uid, _ in pairs])
+            _ensure_indexed(db, list(dict.fromkeys(h.recipe_id for hits in hits_per for h in hits)))
+            ranked = [
+                _rank(hits, ingredient_index.overlap([h.recipe_id for h in hits], fridges[uid].ids),
+                      top_k, boost)
+                for (uid, _), hits in zip(pairs, hits_per)
+            ]
+        with stage("recipe_fetch"):
+            recipes = {r.id: r for r in _fetch_recipes(db, list(dict.fromkeys(
+                rid for rids in ranked for rid in rids
+            )))}
+    return [[recipes[rid] for rid in rids if rid in recipes] for rids in ranked]
+
+# ───────── 2-1) 비동기 추천 (이벤트 루프를 막지 않음) ─────────
+# 인코딩은 마이크로 배칭 스레드, 벡터 검색은 AsyncQdrantClient(또는 스레드),
+# 동기 DB 세션/역색인 보충 로드는 전용 DB 스레드 풀에서 실행합니다.
+_db_executor = ThreadPoolExecutor(max_workers=RAG_DB_THREADS, thread_name_prefix="rag-db")
+
+async def run_db(fn, *args):
+    # contextvars 를 넘겨 DB 스레드의 stage() 계측도 현재 요청에 합산되게
+    ctx = contextvars.copy_context()
+    return await asyncio.get_running_loop().run_in_executor(_db_executor, ctx.run, fn, *args)
+
+async def aencode_query(query: str) -> np.ndarray:
+    key = _norm(query)
+    with stage("encode"):
+        vec = query_cache.get(key)
+        if vec is None:
+            # 요청 취소(클라이언트 끊김, wait_for 시간 초과)가 배치 Future 까지 전파되지 않도록 shield
+            vec = query_cache.put(key, await asyncio.shield(asyncio.wrap_future(query_encoder.submit(key))))
+    return vec
+
+async def _asearch(query: str, flt: Optional[SearchFilter]) -> Sequence[Hit]:
+    qv = await aencode_query(query)
+    with stage("vector_search"):
+        generation = hit_cache.generation()
+        hits = hit_cache.get(qv, flt)
+        if hits is None:
+            hits = await get_store().asearch(qv, limit=40, flt=flt)
+            hit_cache.put(qv, flt, hits, generation)
+    count_candidates(len(hits))
+    return hits
+
+async def arecommend_with_fridge(user_id: int, query: str, top_k: int = 10, boost: float = 0.2,
+                                 flt: Optional[SearchFilter] = None) -> Tuple[Fridge, List[Recipe]]:
+    """arecommend_for_user 와 같되, 순위 계산에 쓴 냉장고(id·이름)도 함께 반환."""
+    hits = await _asearch(query, flt)
+    return await run_db(_rank_and_fetch, user_id, hits, top_k, boost)
+
+async def arecommend_for_user(user_id: int, query: str, top_k: int = 10, boost: float = 0.2,
+                              flt: Optional[SearchFilter] = None) -> List[Recipe]:
+    _, recipes = await arecommend_with_fridge(user_id, query, top_k, boost, flt)
+    return recipes
 
-    return ordered_recipes
 # ───────── main ─────────────────────────────────────────
 if __name__ == "__main__":
-    # reset_qdrant()
-    embed_new_recipes()
+    parser = argparse.ArgumentParser(description="레시피 임베딩 & Qdrant 업서트")
+    parser.add_argument("--reindex", action="store_true",
+                        help="컬렉션을 새로 만들고 전체 레시피를 다시 임베딩")
+    args = parser.parse_args()
+
+    if args.reindex:
+        reset_qdrant()
+        reindex_all()
+    else:
+        embed_new_recipes()
 
     for r in recommend_for_user(1, "파스타", 20):
         print(f"- {r.id} | {r.name} | {r.method} | {r.category}")
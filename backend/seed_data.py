@@ -1,49 +1,47 @@
 """
 seed_recipes.py
 ──────────────────────────────────────────────────
-· 배포(또는 로컬 초기화) 시 코어 레시피 - 약 1,000건 - 을
+· 배포(또는 로컬 초기화) 시 SEED_INGREDIENTS 로 검색되는 코어 레시피를
   Postgres + SQLModel 테이블에 선삽입(seeding)합니다.
+· 수집(app/food_api.py, 비동기·동시·속도 제한)과 DB 저장(별도 스레드)을
+  큐로 분리해 네트워크 대기와 insert 가 겹치도록 합니다.
+· 키워드별 결과는 total_count 까지 모두 가져오며, SEED_MAX_ROWS 로 제한 가능
+· API 응답은 디스크 캐시(FOOD_API_CACHE_DIR)에 남으며, --offline 이면 캐시만으로 재현
 · FastAPI 프로젝트 루트에서:
-      $ python seed_recipes.py
+      $ python seed_recipes.py [--offline]
 ──────────────────────────────────────────────────
 """
 from __future__ import annotations
 
+import argparse
+import asyncio
 import logging
 import os
+import queue
 import sys
-import time
-from typing import Dict, List
-from urllib.parse import quote
+import threading
+from typing import List, Optional
 
-import httpx
-from sqlmodel import Session, select
+from sqlmodel import Session
 
 # ────────────────────────────────────────────────
 # 내부 모듈 import
 from app.db import engine
-from app.models import (
-    IngredientMaster,
-    Recipe,
-    IngredientRecipeMapping,
-    Instruction,
-)
-from app.routers.user_ingredients import parse_parts_dtls  # 기존 util 재사용
+from app.food_api import API_KEY, FOOD_API_MODE, FoodSafetyClient
+from app.ingest import ingest_items
 
 # ────────────────────────────────────────────────
 # 환경 변수
-API_KEY: str | None = os.getenv("FOOD_SAFETY_API_KEY")
-SERVICE_ID: str = os.getenv("FOOD_SAFETY_SERVICE_ID", "COOKRCP01")
-
-# 시드용 검색 키워드(10개 × 100건 ≒ 1 000 레시피)
+# 시드용 검색 키워드
 SEED_INGREDIENTS: List[str] = [
     "계란", "두부", "김치", "우유", "양파",
     "대파", "감자", "당근", "닭고기", "돼지고기",
 ]
 
-BASE_URL = "http://openapi.foodsafetykorea.go.kr/api"
-PAGE_SIZE = 100                       # 1 ~ 100 row
-REQUEST_TIMEOUT = 10                  # 초
+# 키워드당 최대 row 수 (비우면 total_count 전체)
+SEED_MAX_ROWS: Optional[int] = int(os.environ["SEED_MAX_ROWS"]) if os.getenv("SEED_MAX_ROWS") else None
+# 수집 → 저장 사이에 쌓아 둘 최대 페이지 수 (DB 가 느리면 수집이 잠시 멈춤)
+SEED_QUEUE_PAGES = int(os.getenv("SEED_QUEUE_PAGES", "8"))
 
 log = logging.getLogger("seed_recipes")
 logging.basicConfig(level=logging.INFO, format="%(levelname)s › %(message)s")
@@ -51,150 +49,74 @@ logging.basicConfig(level=logging.INFO, format="%(levelname)s › %(message)s")
 
 # ────────────────────────────────────────────────
 # 헬퍼
-def fetch_json(url: str) -> Dict:
-    """단순 GET → JSON(dict), 오류 시 {} 반환."""
+def ingest_page(db: Session, rows: List[dict]) -> None:
+    """한 페이지를 커밋 1회로 저장 (저장할 수 없는 레시피는 ingest_items 가 건너뜀)."""
     try:
-        with httpx.Client(timeout=REQUEST_TIMEOUT) as client:
-            r = client.get(url)
-        if r.status_code != 200:
-            log.error("HTTP %s - %s", r.status_code, url)
-            return {}
-        return r.json()
-    except (httpx.HTTPError, ValueError) as e:
-        log.error("요청/파싱 오류: %s – %s", e, url)
-        return {}
-
-
-def ensure_ingredient_master(db: Session, name: str) -> IngredientMaster:
-    """중복 확인 후 IngredientMaster 행을 확보·반환."""
-    im = db.exec(select(IngredientMaster).where(IngredientMaster.name == name)).first()
-    if not im:
-        im = IngredientMaster(name=name)
-        db.add(im)
-        db.commit()
-        db.refresh(im)
-    return im
-
-
-def ingest_one_item(db: Session, item: Dict) -> None:
-    """
-    단일 레시피(JSON row) ↦ Recipe / IngredientRecipeMapping / Instruction 삽입.
-    기존에 동일한 recipe_hash(여기선 제목) 가 있으면 skip.
-    """
-    title: str | None = item.get("RCP_NM")
-    if not title:
+        result = ingest_items(db, rows)
+    except Exception as e:  # 연결 오류 등 – 이 페이지만 버리고 계속 진행
+        log.warning("   ⚠︎  페이지 저장 실패 (%d건): %s", len(rows), e)
         return
-
-    recipe_hash = title  # 👉 ‘제목’만으로 단순 중복 방지
-
-    recipe: Recipe | None = db.exec(
-        select(Recipe).where(Recipe.recipe_hash == recipe_hash)
-    ).first()
-
-    is_new = recipe is None
-    if is_new:
-        recipe = Recipe(
-            name=title,
-            category=item.get("RCP_PAT2"),        # e.g. 밥/죽/떡
-            method=item.get("RCP_WAY2"),          # e.g. 끓이기 / 볶기
-            description=item.get("RCP_PARTS_DTLS"),
-            calories=_int(item.get("INFO_ENG")),
-            protein=_int(item.get("INFO_PRO")),
-            carbs=_int(item.get("INFO_CAR")),
-            fat=_int(item.get("INFO_FAT")),
-            sodium=_int(item.get("INFO_NA")),
-            recipe_hash=recipe_hash,
-        )
-        db.add(recipe)
-        db.commit()
-        db.refresh(recipe)
-
-    # ── (1) 재료 매핑 ───────────────────────────
-    # 새 레시피인 경우에만 parse 후 IngredientRecipeMapping 삽입
-    if is_new:
-        for ing_name, _, _ in parse_parts_dtls(item.get("RCP_PARTS_DTLS", "")):
-            im = ensure_ingredient_master(db, ing_name)
-            exists = db.exec(
-                select(IngredientRecipeMapping)
-                .where(
-                    IngredientRecipeMapping.recipe_id == recipe.id,
-                    IngredientRecipeMapping.ingredient_id == im.id,
-                )
-            ).first()
-            if not exists:
-                db.add(
-                    IngredientRecipeMapping(
-                        recipe_id=recipe.id,
-                        ingredient_id=im.id,
-                    )
-                )
-
-    # ── (2) 조리 순서(Instructions) ───────────────
-    # MANUAL01 ··· MANUAL20 → step 1 ~ 20
-    if is_new:
-        blank = 0
-        for i in range(1, 21):
-            txt = (item.get(f"MANUAL{i:02d}") or "").strip()
-            if not txt:
-                blank += 1
-                if blank >= 2:
-                    break
-                continue
-            blank = 0
-            already = db.exec(
-                select(Instruction).where(
-                    Instruction.recipe_id == recipe.id,
-                    Instruction.step == i,
-                )
-            ).first()
-            if not already:
-                db.add(
-                    Instruction(
-                        recipe_id=recipe.id,
-                        step=i,
-                        instruction=txt,
-                    )
-                )
-
-    db.commit()  # flush + commit 한 번에
-
-
-def _int(text: str | None) -> int | None:
-    """빈 문자열 → None, 그 외 int 변환."""
-    try:
-        return int(float(text)) if text and text.strip() else None
-    except ValueError:
-        return None
+    log.info("   ↳  신규 레시피 %d건%s", len(result.new_recipe_ids),
+             f", 건너뜀 {result.skipped}건" if result.skipped else "")
 
 
 # ────────────────────────────────────────────────
 # 메인 루프
-def seed() -> None:
-    if not API_KEY:
+def _ingest_worker(pages: "queue.Queue[Optional[List[dict]]]") -> None:
+    """큐에서 페이지를 꺼내 저장 (None 이 오면 종료)."""
+    with Session(engine) as db:
+        while True:
+            rows = pages.get()
+            if rows is None:
+                return
+            ingest_page(db, rows)
+
+
+def _put(pages: "queue.Queue[Optional[List[dict]]]", item: Optional[List[dict]],
+         worker: threading.Thread) -> bool:
+    """저장 스레드가 살아 있는 동안만 큐에 넣음. 스레드가 죽었으면 False (꽉 찬 큐에서 멈추지 않음)."""
+    while worker.is_alive():
+        try:
+            pages.put(item, timeout=1)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+
+async def _fetch_into(pages: "queue.Queue[Optional[List[dict]]]", mode: str,
+                      worker: threading.Thread) -> None:
+    async with FoodSafetyClient(mode=mode) as api:
+        async for kwd, rows in api.iter_pages(SEED_INGREDIENTS, SEED_MAX_ROWS):
+            log.info("   ↳  %s: 가져온 레시피 %d건", kwd, len(rows))
+            # 큐가 가득 차면 이벤트 루프를 막지 않고 스레드에서 대기
+            if not await asyncio.to_thread(_put, pages, rows, worker):
+                raise RuntimeError("저장 스레드(seed-ingest)가 종료되어 수집을 중단합니다")
+        log.info("수집 통계: %s", api.stats)
+
+
+def seed(offline: bool = False) -> None:
+    mode = "replay" if offline else FOOD_API_MODE
+    if not API_KEY and mode != "replay":
         sys.exit("❌  환경변수 FOOD_SAFETY_API_KEY 가 필요합니다.")
 
-    with Session(engine) as db:
-        for kwd in SEED_INGREDIENTS:
-            log.info("▶  %s (max %d rows)", kwd, PAGE_SIZE)
-            url = (
-                f"{BASE_URL}/{API_KEY}/{SERVICE_ID}/json/1/{PAGE_SIZE}"
-                f"/RCP_PARTS_DTLS={quote(kwd)}"
-            )
-            rows: List[dict] = (
-                fetch_json(url).get(SERVICE_ID, {}).get("row", []) or []
-            )
-            log.info("   ↳  가져온 레시피 %d건", len(rows))
-            for item in rows:
-                try:
-                    ingest_one_item(db, item)
-                except Exception as e:  # 개별 레시피 오류는 계속 진행
-                    log.warning("   ⚠︎  %s", e)
-            # 분할 커밋은 ingest_one_item 내부에서 이루어짐
-            time.sleep(0.25)  # API 부하 완화
+    pages: "queue.Queue[Optional[List[dict]]]" = queue.Queue(maxsize=SEED_QUEUE_PAGES)
+    worker = threading.Thread(target=_ingest_worker, args=(pages,), name="seed-ingest")
+    worker.start()
+    try:
+        asyncio.run(_fetch_into(pages, mode, worker))
+    finally:
+        stopped = _put(pages, None, worker)
+        worker.join()
+    if not stopped:
+        sys.exit("❌  저장 스레드(seed-ingest)가 비정상 종료했습니다.")
 
     log.info("✔  시드 완료 – 스크립트 종료")
 
 
 # ────────────────────────────────────────────────
 if __name__ == "__main__":
-    seed()
+    parser = argparse.ArgumentParser(description="코어 레시피 시드")
+    parser.add_argument("--offline", action="store_true",
+                        help="API 를 호출하지 않고 응답 캐시(FOOD_API_CACHE_DIR)만 사용")
+    seed(parser.parse_args().offline)
@@ -0,0 +1,42 @@
+"""
+tests/conftest.py
+──────────────────────────────────────────────────
+· 모듈들이 import 시점에 환경 변수를 읽으므로, 어떤 app 모듈보다 먼저
+  외부 서비스가 필요 없는 설정(임시 SQLite / numpy 벡터 저장소 / 캐시 끔)으로 고정
+    $ cd backend && python -m pytest -q
+──────────────────────────────────────────────────
+"""
+import os
+import sys
+import tempfile
+
+_TMP = tempfile.mkdtemp(prefix="recipe-tests-")
+
+os.environ.update({
+    "DATABASE_URL":       f"sqlite:///{os.path.join(_TMP, 'test.db')}",
+    "VECTOR_BACKEND":     "numpy",
+    "VECTOR_MMAP_PATH":   os.path.join(_TMP, "vectors.npy"),
+    "QUERY_CACHE_PATH":   "",
+    "LLM_CACHE_BACKEND":  "memory",
+    "FOOD_API_CACHE_DIR": "",
+    "OPENAI_API_KEY":     "test",
+    "EMBED_SWEEP_SEC":    "0",
+})
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+
+
+@pytest.fixture
+def engine():
+    """테스트마다 빈 테이블 (임시 SQLite 파일)."""
+    from sqlmodel import SQLModel
+
+    import app.models  # noqa: F401  (테이블 등록)
+    from app.db import engine as _engine
+
+    _engine.echo = False
+    SQLModel.metadata.drop_all(_engine)
+    SQLModel.metadata.create_all(_engine)
+    return _engine
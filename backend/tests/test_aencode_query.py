@@ -0,0 +1,48 @@
+import asyncio
+import threading
+
+import numpy as np
+
+import recipe_rag_pipeline as rp
+
+
+class _SlowEncode:
+    def __init__(self):
+        self.started = threading.Event()
+        self.release = threading.Event()
+
+    def __call__(self, texts):
+        self.started.set()
+        self.release.wait(5)
+        return np.stack([np.full(2, len(t), dtype=np.float32) for t in texts])
+
+
+def test_cancelled_request_does_not_cancel_encoder_future(monkeypatch):
+    enc = _SlowEncode()
+    mb = rp.MicroBatchEncoder(enc, max_batch=8, max_wait_ms=0)
+    monkeypatch.setattr(rp, "query_encoder", mb)
+    submitted = []
+    orig_submit = mb.submit
+    monkeypatch.setattr(mb, "submit", lambda text: submitted.append(orig_submit(text)) or submitted[-1])
+    rp.query_cache.clear()
+
+    async def go():
+        warm = asyncio.ensure_future(rp.aencode_query("첫 요청"))
+        await asyncio.sleep(0)
+        assert await asyncio.to_thread(enc.started.wait, 5)
+        task = asyncio.ensure_future(rp.aencode_query("취소될 요청"))
+        await asyncio.sleep(0.05)
+        task.cancel()
+        await asyncio.sleep(0.05)   # 취소 전파(call_soon 콜백)가 끝난 뒤에 배치를 풀어 줌
+        enc.release.set()
+        await warm
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+        return await rp.aencode_query("다음 요청")
+
+    vec = asyncio.run(go())
+    assert isinstance(vec, np.ndarray)
+    assert not submitted[1].cancelled()
+    assert submitted[1].result(5)[0] == len(rp._norm("취소될 요청"))
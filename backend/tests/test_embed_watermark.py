@@ -0,0 +1,98 @@
+import numpy as np
+import pytest
+from sqlmodel import Session, select
+
+import recipe_rag_pipeline as rp
+from app.models import Recipe, RecipeEmbedding
+
+
+class _FakeModel:
+    def encode(self, docs, batch_size=None, normalize_embeddings=True):
+        return np.ones((len(docs), 4), dtype=np.float32)
+
+
+@pytest.fixture
+def pipeline(engine, monkeypatch):
+    monkeypatch.setattr(rp, "_model", _FakeModel())
+    monkeypatch.setattr(rp, "_upsert_points", lambda ids, vecs, payloads: None)
+    monkeypatch.setattr(rp, "_embed_watermark", 0)
+    monkeypatch.setattr(rp, "_embed_rescan_at", 0.0)
+    monkeypatch.setattr(rp, "EMBED_RESCAN_SEC", 3600)
+    return engine
+
+
+def _add_recipes(engine, ids):
+    with Session(engine) as db:
+        for i in ids:
+            db.add(Recipe(id=i, name=f"r{i}", recipe_hash=f"h{i}"))
+        db.commit()
+
+
+def _embedded(engine):
+    with Session(engine) as db:
+        return sorted(db.exec(select(RecipeEmbedding.recipe_id)).all())
+
+
+def test_failed_batch_is_retried_on_next_pass(pipeline, monkeypatch):
+    _add_recipes(pipeline, range(1, 7))
+    real = rp._save_embeddings
+    calls = {"n": 0}
+
+    def flaky(db, upload, rows):
+        calls["n"] += 1
+        if calls["n"] == 1:             # 첫 배치(1~3) 롤백 흉내
+            upload.result()
+            return [r.recipe_id for r in rows]
+        return real(db, upload, rows)
+
+    monkeypatch.setattr(rp, "_save_embeddings", flaky)
+    assert rp.embed_new_recipes(batch=3) == 3
+    assert _embedded(pipeline) == [4, 5, 6]
+    assert rp._embed_watermark == 0
+
+    assert rp.embed_new_recipes(batch=3) == 3
+    assert _embedded(pipeline) == [1, 2, 3, 4, 5, 6]
+    assert rp._embed_watermark == 3     # 이번 패스에서 마지막으로 본 id 까지만 전진
+
+
+def test_late_committed_lower_id_is_found_by_rescan(pipeline, monkeypatch):
+    _add_recipes(pipeline, [1, 2, 5])
+    assert rp.embed_new_recipes(batch=10) == 3
+    assert rp._embed_watermark == 5
+
+    # 워터마크(5)보다 낮은 id 가 뒤늦게 커밋됨 → 워터마크 이후만 훑는 패스는 못 봄
+    _add_recipes(pipeline, [3])
+    assert rp.embed_new_recipes(batch=10) == 0
+
+    monkeypatch.setattr(rp, "_embed_rescan_at", 0.0)
+    assert rp.embed_new_recipes(batch=10) == 1
+    assert _embedded(pipeline) == [1, 2, 3, 5]
+    assert rp._embed_watermark == 5
+
+
+def test_hit_cache_cleared_when_another_process_embeds(pipeline):
+    _add_recipes(pipeline, [1, 2])
+    version = rp.sync_hit_cache(None)
+    qv = np.ones(4, dtype=np.float32) / 2
+    rp.hit_cache.put(qv, None, [rp.Hit(1, 1.0)], rp.hit_cache.generation())
+    assert rp.sync_hit_cache(version) == version
+    assert rp.hit_cache.get(qv) is not None
+
+    with Session(pipeline) as db:          # worker.py 가 저장한 것처럼 DB 에만 기록
+        db.add(RecipeEmbedding.from_array(2, np.ones(4), rp.EMBED_MODEL_ID))
+        db.commit()
+    assert rp.sync_hit_cache(version) != version
+    assert rp.hit_cache.get(qv) is None
+
+
+def test_vectors_from_another_encoder_backend_are_reembedded(pipeline):
+    _add_recipes(pipeline, [1, 2])
+    with Session(pipeline) as db:
+        db.add(RecipeEmbedding.from_array(1, np.zeros(4), f"{rp.MODEL_NAME}:onnx-int8"))
+        db.add(RecipeEmbedding.from_array(2, np.ones(4), rp.EMBED_MODEL_ID))
+        db.commit()
+    assert rp.embed_recipe_ids([1, 2]) == (1, [])
+    with Session(pipeline) as db:
+        assert set(db.exec(select(RecipeEmbedding.model_name)).all()) == {rp.EMBED_MODEL_ID}
+    ids, matrix = rp.load_embedding_matrix()
+    assert ids.tolist() == [1, 2] and matrix.shape == (2, 4)
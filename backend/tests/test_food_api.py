@@ -0,0 +1,122 @@
+import json
+from datetime import timedelta
+
+import httpx
+import pytest
+from sqlmodel import Session, select
+
+from app import food_api, ingredient_fetch
+from app.food_api import SERVICE_ID, FoodApiError, ResponseCache, fetch_rows
+from app.ingest import ingredient_ids
+from app.models import IngestJob, IngredientFetchLog
+from recipe_rag_pipeline import EMBED_JOB
+
+ROW = {"RCP_NM": "두부조림", "RCP_PARTS_DTLS": "두부 1모, 간장 2큰술", "MANUAL01": "두부를 썬다."}
+OK = {SERVICE_ID: {"total_count": "1", "row": [ROW],
+                   "RESULT": {"CODE": "INFO-000", "MSG": "정상처리되었습니다."}}}
+EMPTY = {SERVICE_ID: {"total_count": "0", "RESULT": {"CODE": "INFO-200", "MSG": "해당하는 데이터가 없습니다."}}}
+KEY_ERROR = {"RESULT": {"CODE": "INFO-100", "MSG": "인증키가 유효하지 않습니다."}}
+QUOTA = {"RESULT": {"CODE": "INFO-300", "MSG": "유효 호출건수를 이미 초과하셨습니다."}}
+
+
+@pytest.fixture
+def serve(monkeypatch):
+    """fetch_rows / FoodSafetyClient 의 httpx 클라이언트가 bodies[0], bodies[1] … 을 차례로 응답하게 함."""
+    calls = []
+    real, real_async = httpx.Client, httpx.AsyncClient
+
+    def use(*bodies):
+        def handler(request):
+            calls.append(request.url)
+            return httpx.Response(200, json=bodies[min(len(calls), len(bodies)) - 1])
+        transport = httpx.MockTransport(handler)
+        monkeypatch.setattr(food_api.httpx, "Client", lambda **kw: real(transport=transport))
+        monkeypatch.setattr(food_api.httpx, "AsyncClient", lambda **kw: real_async(transport=transport))
+        return calls
+    return use
+
+
+def _page(total, n, start):
+    rows = [dict(ROW, RCP_NM=f"두부조림{i}") for i in range(start, start + n)]
+    return {SERVICE_ID: {"total_count": str(total), "row": rows,
+                         "RESULT": {"CODE": "INFO-000", "MSG": "정상처리되었습니다."}}}
+
+
+def test_parse_accepts_rows_and_no_data():
+    assert food_api._parse(OK) == (1, [ROW])
+    assert food_api._parse(EMPTY) == (0, [])
+
+
+@pytest.mark.parametrize("body", [KEY_ERROR, QUOTA, {}, [],
+                                  {SERVICE_ID: {"RESULT": {"CODE": "ERROR-336", "MSG": "요청 범위 오류"}}}])
+def test_parse_rejects_error_bodies(body):
+    with pytest.raises(FoodApiError):
+        food_api._parse(body)
+
+
+def test_error_body_is_raised_and_not_cached(serve, monkeypatch, tmp_path):
+    cache = ResponseCache(str(tmp_path), ttl=3600)
+    monkeypatch.setattr(food_api, "response_cache", cache)
+    serve(QUOTA)
+    with pytest.raises(FoodApiError):
+        fetch_rows("두부", mode="live")
+    assert cache.get("두부", 1, food_api.PAGE_SIZE, None) is None
+
+    serve(OK)
+    assert fetch_rows("두부", mode="live") == [ROW]
+    assert cache.get("두부", 1, food_api.PAGE_SIZE, None) == OK
+
+
+def test_error_body_does_not_mark_ingredient_fresh(engine, serve, monkeypatch):
+    calls = serve(QUOTA, OK)
+    with pytest.raises(FoodApiError):
+        ingredient_fetch.recipe_ids_for("두부")
+    with Session(engine) as db:
+        iid = ingredient_ids(db, ["두부"])["두부"]
+        log = db.get(IngredientFetchLog, iid)
+        assert log.fetched_at is None and log.fetching_since is None
+
+    ids = ingredient_fetch.recipe_ids_for("두부")
+    assert len(ids) == 1 and len(calls) == 2
+    # 수집 기록과 같은 커밋으로 embed 작업이 남아 있음
+    with Session(engine) as db:
+        [job] = db.exec(select(IngestJob).where(IngestJob.kind == EMBED_JOB)).all()
+        assert job.payload == {"recipe_ids": ids}
+    with Session(engine) as db:
+        log = db.get(IngredientFetchLog, iid)
+        assert log.fetched_at is not None and log.row_count == 1 and log.recipe_ids == ids
+
+
+def test_ingredient_fetch_pages_through_total_count_up_to_cap(engine, serve, monkeypatch):
+    monkeypatch.setattr(ingredient_fetch, "INGREDIENT_FETCH_MAX_ROWS", 250)
+    size = food_api.PAGE_SIZE
+    calls = serve(_page(400, size, 0), _page(400, size, size), _page(400, 50, 2 * size))
+    ids = ingredient_fetch.recipe_ids_for("두부")
+    assert len(ids) == 250
+    assert sorted(str(u).split("/json/")[1].split("/RCP")[0] for u in calls) == \
+        ["1/100", "101/200", "201/250"]
+
+
+def test_ingredient_refetch_ignores_cache_older_than_fetch_ttl(engine, serve, monkeypatch, tmp_path):
+    cache = ResponseCache(str(tmp_path), ttl=7 * 86400)
+    monkeypatch.setattr(food_api, "response_cache", cache)
+    monkeypatch.setattr(ingredient_fetch, "INGREDIENT_FETCH_TTL", 60)
+    cache.put("두부", 1, food_api.PAGE_SIZE, EMPTY)
+    assert cache.get("두부", 1, food_api.PAGE_SIZE, 60) == EMPTY    # 방금 저장 → 그대로 사용
+    assert ingredient_fetch.recipe_ids_for("두부") == []
+
+    # 2분이 지난 것으로: 수집 기록은 TTL 만료, 캐시 페이지는 FOOD_API_CACHE_TTL 안
+    path = cache.path("두부", 1, food_api.PAGE_SIZE)
+    with open(path, encoding="utf-8") as f:
+        entry = json.load(f)
+    entry["fetched_at"] -= 120
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(entry, f)
+    with Session(engine) as db:
+        log = db.get(IngredientFetchLog, ingredient_ids(db, ["두부"])["두부"])
+        log.fetched_at -= timedelta(seconds=120)
+        db.add(log)
+        db.commit()
+    calls = serve(OK)
+    assert len(ingredient_fetch.recipe_ids_for("두부")) == 1
+    assert len(calls) == 1
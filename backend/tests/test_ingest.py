@@ -0,0 +1,71 @@
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy.dialects import mysql, postgresql
+from sqlmodel import Session, select
+
+from app.ingest import ingest_items, insert_ignore, name_cache
+from app.models import IngredientMaster, IngredientRecipeMapping, Instruction, Recipe
+
+
+def _row(title, parts="계란 2, 대파 1", **extra):
+    return {"RCP_NM": title, "RCP_PARTS_DTLS": parts, "MANUAL01": "섞는다", **extra}
+
+
+@pytest.fixture
+def db(engine):
+    name_cache.clear()
+    with Session(engine) as s:
+        yield s
+
+
+def test_ingest_batch(db):
+    result = ingest_items(db, [_row("계란말이"), _row("파전", "대파 2, 밀가루 100g"), _row("계란말이")])
+    assert len(result.recipe_ids) == len(result.new_recipe_ids) == 2
+    assert result.skipped == 0
+    assert sorted(db.exec(select(IngredientMaster.name)).all()) == ["계란", "대파", "밀가루"]
+    assert len(db.exec(select(IngredientRecipeMapping)).all()) == 4
+    assert len(db.exec(select(Instruction)).all()) == 2
+
+    again = ingest_items(db, [_row("계란말이")])
+    assert again.recipe_ids == result.recipe_ids[:1] and again.new_recipe_ids == []
+
+
+def test_bad_row_is_skipped_not_whole_batch(db):
+    rows = [
+        _row("계란말이"),
+        _row("망가진 레시피", RCP_PAT2={"not": "bindable"}),   # DB 에 넣을 수 없는 값
+        "not a row",
+        _row("파전", "대파 2, 밀가루 100g"),
+    ]
+    result = ingest_items(db, rows)
+    assert result.skipped == 2
+    assert len(result.new_recipe_ids) == 2
+    assert sorted(db.exec(select(Recipe.name)).all()) == ["계란말이", "파전"]
+    # 건너뛴 레시피의 재료 매핑은 남지 않고, 나머지는 커밋됨
+    assert len(db.exec(select(IngredientRecipeMapping)).all()) == 4
+    assert name_cache.lookup(["계란", "대파", "밀가루"]).keys() == {"계란", "대파", "밀가루"}
+
+
+def test_insert_ignore_skips_duplicates_on_sqlite(db):
+    insert_ignore(db, IngredientMaster, [{"name": "계란"}, {"name": "대파"}], "name")
+    insert_ignore(db, IngredientMaster, [{"name": "대파"}, {"name": "두부"}], "name")
+    insert_ignore(db, IngredientMaster, [], "name")
+    db.commit()
+    assert sorted(db.exec(select(IngredientMaster.name)).all()) == ["계란", "대파", "두부"]
+
+
+@pytest.mark.parametrize("dialect, expected", [
+    (mysql.dialect(), "ON DUPLICATE KEY UPDATE name = VALUES(name)"),
+    (postgresql.dialect(), "ON CONFLICT DO NOTHING"),
+])
+def test_insert_ignore_dialect_sql(dialect, expected):
+    executed = []
+    fake = SimpleNamespace(
+        get_bind=lambda: SimpleNamespace(dialect=dialect),
+        execute=lambda stmt, rows: executed.append((stmt, rows)),
+    )
+    insert_ignore(fake, IngredientMaster, [{"name": "계란"}, {"name": "대파"}], "name")
+    [(stmt, rows)] = executed
+    assert expected in str(stmt.compile(dialect=dialect))
+    assert rows == [{"name": "계란"}, {"name": "대파"}]
@@ -0,0 +1,40 @@
+import numpy as np
+
+from ingredient_index import RecipeIngredientIndex
+
+
+def _index():
+    idx = RecipeIngredientIndex()
+    for rid, ings in {1: [10, 11, 12], 2: [11], 3: []}.items():
+        idx.add(rid, ings)
+    return idx
+
+
+def test_overlap_keeps_recipe_order():
+    idx = _index()
+    assert idx.overlap([3, 2, 1], [11, 12]).tolist() == [0, 1, 2]
+    assert idx.overlap([1, 1], [10]).tolist() == [1, 1]
+
+
+def test_overlap_ignores_duplicate_fridge_ids():
+    assert _index().overlap([1], [10, 10, 11, 11]).tolist() == [2]
+
+
+def test_overlap_unknown_recipe_and_empty_inputs():
+    idx = _index()
+    assert idx.overlap([99, 1], [10]).tolist() == [0, 1]
+    assert idx.overlap([1, 2], []).tolist() == [0, 0]
+    out = idx.overlap([], [10])
+    assert out.shape == (0,) and out.dtype == np.int64
+
+
+def test_add_merges_ingredients():
+    idx = _index()
+    idx.add(2, [11, 13])
+    assert idx.overlap([2], [11, 13]).tolist() == [2]
+    assert idx.missing([1, 2, 4]) == [4]
+
+
+def test_group_sorts_and_dedups_rows():
+    grouped = RecipeIngredientIndex._group([(2, 5), (1, 9), (1, 3), (1, 9)])
+    assert {k: v.tolist() for k, v in grouped.items()} == {1: [3, 9], 2: [5]}
@@ -0,0 +1,143 @@
+import threading
+from datetime import timedelta
+
+import pytest
+from sqlmodel import Session
+
+from app import jobs
+from app.models import IngestJob
+
+
+@pytest.fixture
+def clock(engine, monkeypatch):
+    """jobs._now 를 직접 움직여 임대 만료/backoff 를 기다리지 않고 확인."""
+    now = {"t": jobs._now() + timedelta(seconds=1)}   # enqueue 의 run_after(실제 시각) 이후
+    monkeypatch.setattr(jobs, "_now", lambda: now["t"])
+
+    def advance(sec: float):
+        now["t"] += timedelta(seconds=sec)
+    return advance
+
+
+def _enqueue(engine, max_attempts=3) -> int:
+    with Session(engine) as db:
+        job = jobs.enqueue(db, "test", {"x": 1}, max_attempts=max_attempts)
+        db.commit()
+        return job.id
+
+
+def _get(engine, job_id) -> IngestJob:
+    with Session(engine) as db:
+        return db.get(IngestJob, job_id)
+
+
+def test_claim_is_exclusive(engine, clock):
+    job_id = _enqueue(engine)
+    [job] = jobs.claim("w1")
+    assert job.id == job_id and job.attempts == 1 and job.locked_by == "w1"
+    assert jobs.claim("w2") == []
+
+
+def test_fail_requeues_with_backoff_then_fails(engine, clock, monkeypatch):
+    monkeypatch.setattr(jobs, "backoff_sec", lambda attempts: 10 * attempts)
+    job_id = _enqueue(engine, max_attempts=2)
+
+    [job] = jobs.claim("w1")
+    assert jobs.fail(job, "w1", "boom")
+    row = _get(engine, job_id)
+    assert row.status == jobs.QUEUED and row.last_error == "boom"
+    assert jobs.claim("w1") == []          # run_after 전에는 안 잡힘
+
+    clock(11)
+    [job] = jobs.claim("w1")
+    assert job.attempts == 2
+    assert jobs.fail(job, "w1", "boom again")
+    row = _get(engine, job_id)
+    assert row.status == jobs.FAILED and row.locked_by is None
+
+
+def test_backoff_is_capped(monkeypatch):
+    monkeypatch.setattr(jobs.random, "random", lambda: 0.5)   # jitter 없음
+    assert jobs.backoff_sec(1) == jobs.JOB_BACKOFF_SEC
+    assert jobs.backoff_sec(3) == jobs.JOB_BACKOFF_SEC * 4
+    assert jobs.backoff_sec(50) == jobs.JOB_BACKOFF_MAX_SEC
+
+
+def test_expired_lease_moves_to_next_worker(engine, clock):
+    job_id = _enqueue(engine)
+    [stale] = jobs.claim("w1")
+
+    clock(jobs.JOB_LEASE_SEC + 1)
+    [job] = jobs.claim("w2")
+    assert job.id == job_id and job.attempts == 2
+
+    # 임대를 잃은 w1 은 연장/완료/실패 어느 것도 반영하지 못함
+    assert not jobs.renew(stale, "w1")
+    assert not jobs.complete(stale, "w1", {"late": True})
+    assert not jobs.fail(stale, "w1", "late")
+    assert jobs.complete(job, "w2", {"ok": True})
+    row = _get(engine, job_id)
+    assert row.status == jobs.DONE and row.result == {"ok": True}
+
+
+def test_same_worker_id_cannot_finish_previous_attempt(engine, clock):
+    _enqueue(engine)
+    [stale] = jobs.claim("w1")
+    clock(jobs.JOB_LEASE_SEC + 1)
+    [job] = jobs.claim("w1")               # 같은 슬롯 이름으로 다시 임대
+    assert not jobs.complete(stale, "w1")
+    assert jobs.complete(job, "w1")
+
+
+def test_expired_lease_without_attempts_left_fails(engine, clock):
+    job_id = _enqueue(engine, max_attempts=1)
+    jobs.claim("w1")
+    clock(jobs.JOB_LEASE_SEC + 1)
+    assert jobs.claim("w2") == []
+    row = _get(engine, job_id)
+    assert row.status == jobs.FAILED and row.last_error == "lease expired"
+
+
+def test_renew_keeps_long_job_from_being_reclaimed(engine, clock):
+    _enqueue(engine)
+    [job] = jobs.claim("w1")
+    for _ in range(3):
+        clock(jobs.JOB_LEASE_SEC * 0.6)
+        assert jobs.renew(job, "w1")
+        assert jobs.claim("w2") == []
+    assert jobs.complete(job, "w1")
+
+
+def test_worker_renews_lease_while_handler_runs(engine, monkeypatch):
+    import worker
+
+    renewed = threading.Event()
+    real_renew = worker.renew
+
+    def renew(job, worker_id):
+        ok = real_renew(job, worker_id)
+        renewed.set()
+        return ok
+
+    def handler(payload):
+        assert renewed.wait(5)
+        return {"ok": True}
+
+    monkeypatch.setattr(worker, "JOB_HEARTBEAT_SEC", 0.01)
+    monkeypatch.setattr(worker, "renew", renew)
+    monkeypatch.setattr(worker, "HANDLERS", {"test": handler})
+    job_id = _enqueue(engine)
+
+    stats = worker.Worker(concurrency=1, poll_sec=0.01, once=True).run()
+    assert stats["done"] == 1
+    assert _get(engine, job_id).status == jobs.DONE
+
+
+def test_embed_job_fails_while_vectors_are_not_saved(monkeypatch):
+    import recipe_rag_pipeline as rp
+
+    monkeypatch.setattr(rp, "embed_recipe_ids", lambda ids: (1, [2]))
+    with pytest.raises(RuntimeError):
+        rp.run_embed_job({"recipe_ids": [1, 2]})
+    monkeypatch.setattr(rp, "embed_recipe_ids", lambda ids: (2, []))
+    assert rp.run_embed_job({"recipe_ids": [1, 2]}) == {"embedded": 2}
@@ -0,0 +1,54 @@
+import json
+
+import pytest
+
+from app.routers.rag import JsonArrayStream
+
+ITEMS = [
+    {"id": 1, "reason": "따옴표 \" 와 역슬래시 \\ 포함"},
+    {"id": 2, "reason": "괄호 ]}[{ 는 문자열 안", "tags": [1, [2, 3]], "meta": {"a": {"b": None}}},
+    {"id": 3, "reason": "유니코드 é / 줄바꿈\n"},
+]
+TEXT = "```json\n" + json.dumps(ITEMS, ensure_ascii=False) + "\n``` 끝"
+
+
+def _feed(parser, chunks):
+    return [item for c in chunks for item in parser.feed(c)]
+
+
+@pytest.mark.parametrize("size", [1, 2, 3, 7, len(TEXT)])
+def test_every_chunk_boundary(size):
+    parser = JsonArrayStream()
+    assert _feed(parser, [TEXT[i:i + size] for i in range(0, len(TEXT), size)]) == ITEMS
+    assert parser.done
+
+
+def test_split_inside_escape_sequence():
+    raw = json.dumps([{"reason": 'a\\"b'}])                 # [{"reason": "a\\\"b"}]
+    cut = raw.index("\\") + 1
+    parser = JsonArrayStream()
+    assert _feed(parser, [raw[:cut], raw[cut:]]) == [{"reason": 'a\\"b'}]
+
+
+def test_items_are_returned_as_soon_as_they_close():
+    parser = JsonArrayStream()
+    assert parser.feed('[{"id": 1}, {"id"') == [{"id": 1}]
+    assert parser.feed(': 2}') == [{"id": 2}]
+    assert not parser.done
+    assert parser.feed("]") == [] and parser.done
+
+
+def test_text_after_array_is_ignored():
+    parser = JsonArrayStream()
+    assert parser.feed('[{"id": 1}] [{"id": 2}]') == [{"id": 1}]
+
+
+def test_truncated_stream_is_not_done():
+    parser = JsonArrayStream()
+    assert _feed(parser, ['[{"id": 1}, {"id": 2, "reason": "잘린']) == [{"id": 1}]
+    assert not parser.done
+
+
+def test_empty_array():
+    parser = JsonArrayStream()
+    assert parser.feed("[]") == [] and parser.done
@@ -0,0 +1,71 @@
+import threading
+
+import numpy as np
+
+from recipe_rag_pipeline import MicroBatchEncoder
+
+
+class _SlowEncode:
+    """첫 배치가 시작되면 release 될 때까지 붙잡아 두는 가짜 model.encode."""
+
+    def __init__(self):
+        self.started = threading.Event()
+        self.release = threading.Event()
+        self.calls = []
+
+    def __call__(self, texts):
+        self.calls.append(list(texts))
+        self.started.set()
+        self.release.wait(5)
+        return np.stack([np.full(2, len(t), dtype=np.float32) for t in texts])
+
+
+def test_cancelled_caller_does_not_kill_encoder_thread():
+    enc = _SlowEncode()
+    mb = MicroBatchEncoder(enc, max_batch=8, max_wait_ms=0)
+
+    first = mb.submit("a")
+    assert enc.started.wait(5)
+    # 첫 배치 처리 중에 들어와 다음 배치를 기다리는 호출 중 하나가 취소됨
+    cancelled = mb.submit("bb")
+    kept = mb.submit("ccc")
+    assert cancelled.cancel()
+    enc.release.set()
+
+    assert first.result(5)[0] == 1
+    assert kept.result(5)[0] == 3
+    assert ["bb"] not in enc.calls and ["bb", "ccc"] not in enc.calls
+    # 스레드가 살아 있어 이후 요청도 처리됨
+    assert mb.encode("dddd", timeout=5)[0] == 4
+
+
+def test_encode_error_is_delivered_and_loop_continues():
+    calls = {"n": 0}
+
+    def flaky(texts):
+        calls["n"] += 1
+        if calls["n"] == 1:
+            raise RuntimeError("boom")
+        return np.zeros((len(texts), 2), dtype=np.float32)
+
+    mb = MicroBatchEncoder(flaky, max_batch=4, max_wait_ms=0)
+    fut = mb.submit("x")
+    try:
+        fut.result(5)
+    except RuntimeError as e:
+        assert str(e) == "boom"
+    else:
+        raise AssertionError("expected RuntimeError")
+    assert mb.encode("y", timeout=5).shape == (2,)
+
+
+def test_duplicate_texts_encoded_once_per_batch():
+    enc = _SlowEncode()
+    mb = MicroBatchEncoder(enc, max_batch=8, max_wait_ms=0)
+    head = mb.submit("warm")
+    assert enc.started.wait(5)
+    futs = [mb.submit("same") for _ in range(3)]
+    enc.release.set()
+    head.result(5)
+    assert [f.result(5)[0] for f in futs] == [4, 4, 4]
+    assert enc.calls[1:] == [["same"]]
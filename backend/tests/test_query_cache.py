@@ -0,0 +1,71 @@
+import sqlite3
+import threading
+import time
+
+import numpy as np
+
+from recipe_rag_pipeline import QueryEmbeddingCache
+
+
+def _last_used(path, ns="ns"):
+    with sqlite3.connect(path) as conn:
+        return dict(conn.execute("SELECT query, last_used FROM query_vectors WHERE namespace = ?", (ns,)))
+
+
+def test_sqlite_file_uses_wal(tmp_path):
+    path = str(tmp_path / "q.sqlite3")
+    QueryEmbeddingCache(4, path, namespace="ns")
+    with sqlite3.connect(path) as conn:
+        assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+
+
+def test_hits_update_last_used_and_reload_in_recency_order(tmp_path):
+    path = str(tmp_path / "q.sqlite3")
+    cache = QueryEmbeddingCache(3, path, namespace="ns")
+    for i, q in enumerate(["a", "b", "c"]):
+        cache.put(q, np.full(2, i, dtype=np.float32))
+    cache.flush()
+    before = _last_used(path)
+
+    assert cache.get("a") is not None           # a 가 가장 최근 사용
+    assert _last_used(path)["a"] == before["a"]  # 아직 모아 두는 중
+    cache.flush()
+    assert _last_used(path)["a"] > before["c"]
+
+    # 재시작: 용량 2 → 최근 사용 순 상위 2개(a, c)만 남고 b 는 정리됨
+    reloaded = QueryEmbeddingCache(2, path, namespace="ns")
+    assert list(reloaded._data) == ["c", "a"]
+    assert set(_last_used(path)) == {"a", "c"}
+
+
+def test_touch_batch_flushes_without_explicit_flush(tmp_path):
+    path = str(tmp_path / "q.sqlite3")
+    cache = QueryEmbeddingCache(8, path, namespace="ns")
+    cache.touch_batch = 2
+    cache.put("a", np.zeros(2)); cache.put("b", np.ones(2))
+    cache.flush()
+    before = _last_used(path)
+    cache.get("a"); cache.get("b")
+    deadline = time.monotonic() + 5           # 백그라운드 스레드가 반영
+    while time.monotonic() < deadline:
+        after = _last_used(path)
+        if after["a"] > before["a"] and after["b"] > before["b"]:
+            break
+        time.sleep(0.01)
+    assert after["a"] > before["a"] and after["b"] > before["b"]
+
+
+def test_put_and_get_do_not_wait_for_sqlite(tmp_path):
+    path = str(tmp_path / "q.sqlite3")
+    cache = QueryEmbeddingCache(8, path, namespace="ns")
+    cache.touch_batch = 1
+    cache._io_lock.acquire()                  # 파일 쓰기가 막힌 상태 (다른 워커가 잠금 등)
+    try:
+        done = threading.Event()
+        threading.Thread(target=lambda: (cache.put("a", np.ones(2)), cache.get("a"), done.set())).start()
+        assert done.wait(1)
+        assert "a" not in _last_used(path)
+    finally:
+        cache._io_lock.release()
+    cache.flush()
+    assert "a" in _last_used(path)
@@ -0,0 +1,127 @@
+import asyncio
+import json
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from app.llm_cache import llm_cache
+from app.recipe_summary import ingredient_names
+from app.routers import rag
+
+RECIPES = [
+    {"id": 1, "name": "계란찜", "category": "반찬", "method": "찌기",
+     "description": "●주재료 : 계란, 대파, 두부, ●양념 : 간장, 고춧가루, 후춧가루 약간()"},
+    {"id": 2, "name": "두부조림", "category": "반찬", "method": "조리기", "description": "두부, 간장"},
+]
+
+
+def _fake_client(content: str):
+    async def create(**kwargs):
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))],
+                               usage=None)
+    return SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+
+
+@pytest.mark.parametrize("rec", [
+    "계란찜",
+    {"name": "계란찜", "reason": "x"},
+    {"id": "1", "reason": "x"},
+    {"id": True, "reason": "x"},
+    {"id": 99, "reason": "x"},
+    {"id": 1},
+    {"id": 1, "reason": None},
+])
+def test_check_llm_rec_rejects_malformed(rec):
+    with pytest.raises(ValueError):
+        rag.check_llm_rec(rec, {1, 2})
+
+
+def test_malformed_llm_array_is_not_cached(monkeypatch):
+    llm_cache.clear()
+    monkeypatch.setattr(rag, "client", _fake_client(json.dumps([{"id": 1, "reason": "좋아요"}, "oops"])))
+    with pytest.raises(ValueError):
+        asyncio.run(rag.generate_llm_recommendations("계란 요리", [], RECIPES))
+    assert llm_cache.get(rag.llm_cache_key("계란 요리", RECIPES, "gpt-3.5-turbo")) is None
+
+
+def test_malformed_llm_array_falls_back(monkeypatch):
+    llm_cache.clear()
+    monkeypatch.setattr(rag, "client", _fake_client(json.dumps([{"id": 7, "reason": "후보 밖"}])))
+    recs, fallback = asyncio.run(rag.recommend_with_deadline("계란 요리", [], RECIPES))
+    assert fallback
+    assert [r["id"] for r in recs] == [1, 2]
+
+
+def test_fallback_is_counted_in_prometheus_by_reason(monkeypatch):
+    from prometheus_client import CollectorRegistry, Counter
+
+    from app import metrics
+
+    registry = CollectorRegistry()
+    monkeypatch.setattr(metrics, "_llm_fallbacks",
+                        Counter("rag_llm_fallbacks_total", "", ["reason"], registry=registry))
+    monkeypatch.setattr(metrics, "_llm_timeouts",
+                        Counter("rag_llm_timeouts_total", "", registry=registry))
+    rag._record_llm_failure(ValueError("bad json"))
+    rag._record_llm_failure(asyncio.TimeoutError())
+    assert registry.get_sample_value("rag_llm_fallbacks_total", {"reason": "parse_error"}) == 1
+    assert registry.get_sample_value("rag_llm_fallbacks_total", {"reason": "timeout"}) == 1
+    assert registry.get_sample_value("rag_llm_timeouts_total") == 1
+
+
+def test_valid_llm_array_is_returned_and_cached(monkeypatch):
+    llm_cache.clear()
+    data = [{"id": 2, "name": "두부조림", "reason": "두부가 있어요"}]
+    monkeypatch.setattr(rag, "client", _fake_client("```json\n" + json.dumps(data) + "\n```"))
+    assert asyncio.run(rag.generate_llm_recommendations("두부", [], RECIPES)) == data
+    assert llm_cache.get(rag.llm_cache_key("두부", RECIPES, "gpt-3.5-turbo")) == data
+
+
+def test_fallback_reason_uses_ingredient_names():
+    recs = rag.fallback_recommendations("계란 요리", RECIPES, n=1)
+    assert recs[0]["reason"].startswith("계란, 대파, 두부, 간장(으)로 만드는 반찬 찌기 요리예요.")
+    assert "●" not in recs[0]["reason"] and ":" not in recs[0]["reason"]
+
+
+def test_ingredient_names_strips_section_markers():
+    assert ingredient_names("●주재료 : 계란 2개, 대파 10g\n●양념 : 소금 약간(1g)") == ["계란", "대파", "소금"]
+    assert ingredient_names(None) == []
+
+
+def test_cache_key_changes_with_prompt_and_summary(monkeypatch):
+    base = rag.llm_cache_key("계란 요리", RECIPES, "gpt-3.5-turbo")
+    assert rag.llm_cache_key("  계란   요리 ", RECIPES, "gpt-3.5-turbo") == base
+
+    resummarized = [dict(RECIPES[0], description="계란, 대파"), RECIPES[1]]
+    assert rag.llm_cache_key("계란 요리", resummarized, "gpt-3.5-turbo") != base
+
+    orig = rag.build_llm_messages
+    monkeypatch.setattr(rag, "build_llm_messages",
+                        lambda q, r: [{"role": "system", "content": "새 시스템 문구"}] + orig(q, r)[1:])
+    assert rag.llm_cache_key("계란 요리", RECIPES, "gpt-3.5-turbo") != base
+
+
+def test_slow_cache_does_not_block_event_loop(monkeypatch):
+    llm_cache.clear()
+    data = [{"id": 1, "reason": "계란이 있어요"}]
+    monkeypatch.setattr(rag, "client", _fake_client(json.dumps(data)))
+    # sqlite 캐시가 잠금을 기다리는 상황
+    monkeypatch.setattr(llm_cache, "get", lambda key: time.sleep(0.3))
+    monkeypatch.setattr(llm_cache, "put", lambda key, data, tokens=0: time.sleep(0.3))
+
+    async def main():
+        ticks = 0
+
+        async def tick():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.01)
+                ticks += 1
+
+        ticker = asyncio.ensure_future(tick())
+        assert await rag.generate_llm_recommendations("계란", [], RECIPES) == data
+        ticker.cancel()
+        return ticks
+
+    assert asyncio.run(main()) >= 20
@@ -0,0 +1,29 @@
+import queue
+import threading
+
+import seed_data
+
+
+def test_put_gives_up_when_ingest_thread_is_dead():
+    pages = queue.Queue(maxsize=1)
+    pages.put([{"RCP_NM": "가득 참"}])
+    dead = threading.Thread(target=lambda: None)
+    dead.start()
+    dead.join()
+    assert seed_data._put(pages, None, dead) is False
+
+
+def test_put_waits_for_room_while_ingest_thread_runs():
+    pages = queue.Queue(maxsize=1)
+    pages.put([{"RCP_NM": "가득 참"}])
+    got = []
+
+    def consume():
+        while (rows := pages.get()) is not None:
+            got.append(rows)
+
+    worker = threading.Thread(target=consume)
+    worker.start()
+    assert seed_data._put(pages, None, worker) is True
+    worker.join(5)
+    assert not worker.is_alive() and got == [[{"RCP_NM": "가득 참"}]]
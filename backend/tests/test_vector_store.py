@@ -0,0 +1,156 @@
+import os
+import threading
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from vector_store import KEYWORD_FIELDS, RANGE_FIELDS, NumpyStore, QdrantStore, SearchFilter
+
+
+def _unit(rows):
+    m = np.asarray(rows, dtype=np.float32)
+    return m / np.linalg.norm(m, axis=1, keepdims=True)
+
+
+def _empty_loader():
+    return np.empty(0, dtype=np.int64), np.empty((0, 0), dtype=np.float32), []
+
+
+@pytest.fixture
+def store(tmp_path):
+    s = NumpyStore(str(tmp_path / "vec.npy"), _empty_loader)
+    s.reset(2)
+    return s
+
+
+PAYLOADS = [
+    {"recipe_id": 1, "category": "국", "method": "끓이기", "calories": 100, "protein": 5},
+    {"recipe_id": 2, "category": "국", "method": "볶기",   "calories": 300, "protein": None},
+    {"recipe_id": 3, "category": "반찬", "method": "볶기",  "calories": None, "protein": 20},
+]
+
+
+def _fill(store):
+    store.upsert([1, 2, 3], _unit([[1, 0], [1, 0.1], [1, 0.2]]), PAYLOADS)
+
+
+def test_upsert_appends_delta_and_flush_writes_matrix_once(store, monkeypatch):
+    writes = []
+    real = store._write
+    monkeypatch.setattr(store, "_write", lambda *a: writes.append(1) or real(*a))
+
+    for i in range(1, 11):
+        store.upsert([i], _unit([[1, i]]), [{"recipe_id": i}])
+    assert writes == []                                        # 배치마다 행렬을 다시 쓰지 않음
+    assert len(store.search(np.array([1, 0], dtype=np.float32), 20)) == 10   # delta 도 검색됨
+
+    store.flush()
+    assert writes == [1]
+    assert not os.path.exists(store._delta_path)
+    assert np.load(store.path).shape == (10, 2)
+
+
+def test_upsert_overwrites_same_id(store):
+    store.upsert([1], _unit([[0, 1]]), [{"recipe_id": 1}])
+    store.upsert([1], _unit([[1, 0]]), [{"recipe_id": 1, "category": "국"}])
+    store.flush()
+    hits = store.search(np.array([1, 0], dtype=np.float32), 5)
+    assert [h.recipe_id for h in hits] == [1] and hits[0].score == pytest.approx(1.0)
+    assert store.search(np.array([1, 0], dtype=np.float32), 5, SearchFilter(category="국"))
+
+
+def test_unflushed_delta_survives_restart(store, tmp_path):
+    _fill(store)                                               # flush 전에 "죽음"
+    reopened = NumpyStore(store.path, _empty_loader)
+    assert {h.recipe_id for h in reopened.search(np.array([1, 0], dtype=np.float32), 5)} == {1, 2, 3}
+
+
+def test_other_process_sees_flushed_vectors(store):
+    reader = NumpyStore(store.path, _empty_loader)
+    assert reader.search(np.array([1, 0], dtype=np.float32), 5) == []
+    _fill(store)
+    store.flush()
+    assert len(reader.search(np.array([1, 0], dtype=np.float32), 5)) == 3
+
+
+@pytest.mark.parametrize("flt, expected", [
+    (SearchFilter(category="국"), [1, 2]),
+    (SearchFilter(method="볶기"), [2, 3]),
+    (SearchFilter(category="국", method="볶기"), [2]),
+    (SearchFilter(calories=(None, 200)), [1]),                # 값 없음(NaN)은 제외
+    (SearchFilter(calories=(100, 300)), [1, 2]),
+    (SearchFilter(protein=(10, None)), [3]),
+    (SearchFilter(category="없음"), []),
+    (SearchFilter(), [1, 2, 3]),
+])
+def test_search_filter_masks(store, flt, expected):
+    _fill(store)
+    store.flush()
+    hits = store.search(np.array([1, 0], dtype=np.float32), 10, flt)
+    assert sorted(h.recipe_id for h in hits) == expected
+
+
+def test_search_batch_matches_search(store):
+    _fill(store)
+    store.flush()
+    qvs = _unit([[1, 0], [0, 1]])
+    flts = [SearchFilter(category="국"), None]
+    assert store.search_batch(qvs, 2, flts) == [store.search(q, 2, f) for q, f in zip(qvs, flts)]
+
+
+def test_search_during_flush_sees_consistent_snapshot(store):
+    stop = threading.Event()
+    errors = []
+
+    def search():
+        while not stop.is_set():
+            try:
+                for h in store.search(np.array([1, 0], dtype=np.float32), 50, SearchFilter(category="국")):
+                    assert h.recipe_id % 2 == 0
+            except Exception as e:          # 행렬/컬럼 길이가 어긋나면 IndexError 등
+                errors.append(e)
+
+    t = threading.Thread(target=search)
+    t.start()
+    for i in range(2, 200, 2):
+        store.upsert([i, i + 1], _unit([[1, i], [1, i + 1]]),
+                     [{"recipe_id": i, "category": "국"}, {"recipe_id": i + 1}])
+        if i % 20 == 0:
+            store.flush()
+    stop.set()
+    t.join()
+    assert errors == []
+
+
+def test_inconsistent_files_keep_previous_snapshot(store, monkeypatch):
+    _fill(store)
+    store.flush()
+    q = np.array([1, 0], dtype=np.float32)
+    assert len(store.search(q, 5)) == 3
+
+    # 다른 프로세스가 ids 만 바꾸고 행렬은 아직 못 쓴 상태가 계속됨
+    np.save(store._ids_path, np.array([1, 2, 3, 4], dtype=np.int64))
+    os.utime(store.path, ns=(0, 0))
+    monkeypatch.setattr("vector_store.time.sleep", lambda s: None)
+    assert len(store.search(q, 5)) == 3
+
+    with pytest.raises(RuntimeError):
+        NumpyStore(store.path, _empty_loader).search(q, 5)
+
+
+def test_qdrant_ensure_indexes_adds_only_missing_fields():
+    created = []
+    schema = {"category": object()}
+    client = SimpleNamespace(
+        collection_exists=lambda name: True,
+        get_collection=lambda name: SimpleNamespace(payload_schema=schema),
+        create_payload_index=lambda col, field, kind: created.append(field) or schema.update({field: kind}),
+    )
+    store = QdrantStore(client, "recipes")
+    store.ensure_indexes()
+    store.ensure_indexes()                                  # 두 번째는 할 일 없음
+    assert sorted(created) == sorted(set(KEYWORD_FIELDS + RANGE_FIELDS) - {"category"})
+
+    client.collection_exists = lambda name: False            # 컬렉션이 아직 없으면 건너뜀
+    QdrantStore(client, "none").ensure_indexes()
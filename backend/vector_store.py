@@ -0,0 +1,428 @@
+"""
+vector_store.py
+──────────────────────────────────────────────────
+· 추천 파이프라인이 사용하는 벡터 검색 백엔드 (VECTOR_BACKEND)
+    - qdrant       : 원격 Qdrant 서버 (QDRANT_URL, 기본값)
+    - qdrant-local : 임베디드 Qdrant (QDRANT_PATH 디렉토리, ":memory:" 가능)
+    - numpy        : RecipeEmbedding 으로 만든 memmap float32 행렬 완전 탐색
+                     (matmul 1회 + argpartition top-k, 네트워크 홉 없음)
+· 지연 비교:
+      $ python -m benchmarks.vector_store --sizes 1000,10000,100000
+──────────────────────────────────────────────────
+"""
+from __future__ import annotations
+
+import asyncio
+import base64
+import json
+import logging
+import os
+import threading
+import time
+from typing import Callable, Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+from qdrant_client import AsyncQdrantClient, QdrantClient, models as qd
+
+log = logging.getLogger("vector_store")
+
+
+class Hit(NamedTuple):
+    recipe_id: int
+    score:     float
+
+
+# 필터 가능한 payload 필드 (reset / ensure_indexes 시 Qdrant payload index 생성)
+KEYWORD_FIELDS = ("category", "method")
+RANGE_FIELDS   = ("calories", "protein")
+
+
+class SearchFilter(NamedTuple):
+    """검색 시 인덱스 안에서 적용할 조건. 범위는 (이상, 이하), None 이면 제한 없음."""
+    category: Optional[str] = None
+    method:   Optional[str] = None
+    calories: Tuple[Optional[float], Optional[float]] = (None, None)
+    protein:  Tuple[Optional[float], Optional[float]] = (None, None)
+
+    def is_empty(self) -> bool:
+        return (
+            all(getattr(self, f) is None for f in KEYWORD_FIELDS)
+            and all(getattr(self, f) == (None, None) for f in RANGE_FIELDS)
+        )
+
+    def to_qdrant(self) -> Optional[qd.Filter]:
+        must = [
+            qd.FieldCondition(key=f, match=qd.MatchValue(value=getattr(self, f)))
+            for f in KEYWORD_FIELDS if getattr(self, f) is not None
+        ] + [
+            qd.FieldCondition(key=f, range=qd.Range(gte=getattr(self, f)[0], lte=getattr(self, f)[1]))
+            for f in RANGE_FIELDS if getattr(self, f) != (None, None)
+        ]
+        return qd.Filter(must=must) if must else None
+
+
+class VectorStore:
+    """백엔드 공통 인터페이스. 벡터는 정규화되어 있다고 가정 (cosine = 내적)."""
+
+    def reset(self, dim: int) -> None:
+        raise NotImplementedError
+
+    def ensure_indexes(self) -> None:
+        """검색 필터용 인덱스가 없으면 만듦 (여러 번 불러도 같음). 기본은 할 일 없음."""
+
+    def upsert(self, ids: Sequence[int], vectors: np.ndarray, payloads: Sequence[Dict]) -> None:
+        raise NotImplementedError
+
+    def flush(self) -> None:
+        """upsert 로 쌓인 변경을 저장. 즉시 반영되는 백엔드는 할 일 없음."""
+
+    def search(self, qv: np.ndarray, limit: int, flt: Optional[SearchFilter] = None) -> List[Hit]:
+        raise NotImplementedError
+
+    async def asearch(self, qv: np.ndarray, limit: int, flt: Optional[SearchFilter] = None) -> List[Hit]:
+        """이벤트 루프를 막지 않는 검색. 기본은 스레드에서 search() 실행."""
+        return await asyncio.to_thread(self.search, qv, limit, flt)
+
+    def search_batch(self, qvs: np.ndarray, limit: int,
+                     flts: Optional[Sequence[Optional[SearchFilter]]] = None) -> List[List[Hit]]:
+        """여러 쿼리를 한 번에 검색 (입력 순서대로). 기본은 search() 반복."""
+        flts = flts or [None] * len(qvs)
+        return [self.search(qv, limit, flt) for qv, flt in zip(qvs, flts)]
+
+    def ping(self) -> None:
+        """연결/로드 상태 확인 (워밍업용)."""
+        raise NotImplementedError
+
+
+# ───────── Qdrant (서버 / 임베디드) ─────────────────────────
+class QdrantStore(VectorStore):
+    def __init__(self, client: QdrantClient, collection: str,
+                 async_client: Optional[AsyncQdrantClient] = None):
+        self.client       = client
+        self.collection   = collection
+        self.async_client = async_client       # 서버 모드에서만 (임베디드는 스레드로 대체)
+
+    def reset(self, dim: int) -> None:
+        if self.collection in [c.name for c in self.client.get_collections().collections]:
+            self.client.delete_collection(collection_name=self.collection)
+        self.client.create_collection(
+            collection_name=self.collection,
+            vectors_config={"vector": qd.VectorParams(size=dim, distance="Cosine")}
+        )
+        self.ensure_indexes()
+
+    def ensure_indexes(self) -> None:
+        """
+        필터 조건이 over-fetch 없이 인덱스 안에서 처리되도록 payload index 생성.
+        reset() 없이 쓰던 기존 컬렉션도 시작 시 빠진 인덱스만 채움 (컬렉션이 없으면 할 일 없음).
+        """
+        if not self.client.collection_exists(self.collection):
+            return
+        existing = self.client.get_collection(self.collection).payload_schema or {}
+        for fields, schema in ((KEYWORD_FIELDS, qd.PayloadSchemaType.KEYWORD),
+                               (RANGE_FIELDS, qd.PayloadSchemaType.INTEGER)):
+            for field in fields:
+                if field not in existing:
+                    self.client.create_payload_index(self.collection, field, schema)
+                    log.info("payload index 생성: %s.%s", self.collection, field)
+
+    def upsert(self, ids: Sequence[int], vectors: np.ndarray, payloads: Sequence[Dict]) -> None:
+        # 포인트 ID = recipe_id → 같은 레시피를 다시 올리면 덮어쓰기(중복 없음)
+        self.client.upsert(
+            collection_name=self.collection,
+            points=[
+                qd.PointStruct(id=int(i), vector={"vector": np.asarray(v).tolist()}, payload=p)
+                for i, v, p in zip(ids, vectors, payloads)
+            ],
+            wait=True,
+        )
+
+    def search(self, qv: np.ndarray, limit: int, flt: Optional[SearchFilter] = None) -> List[Hit]:
+        resp = self.client.query_points(
+            self.collection, query=qv, using="vector", limit=limit, with_payload=["recipe_id"],
+            query_filter=flt.to_qdrant() if flt else None,
+        )
+        return [Hit(p.payload["recipe_id"], p.score) for p in resp.points]
+
+    def search_batch(self, qvs: np.ndarray, limit: int,
+                     flts: Optional[Sequence[Optional[SearchFilter]]] = None) -> List[List[Hit]]:
+        # query_batch_points: 요청 N개를 한 번의 왕복으로
+        flts = flts or [None] * len(qvs)
+        resps = self.client.query_batch_points(
+            self.collection,
+            requests=[
+                qd.QueryRequest(
+                    query=np.asarray(qv).tolist(), using="vector", limit=limit,
+                    with_payload=["recipe_id"], filter=flt.to_qdrant() if flt else None,
+                )
+                for qv, flt in zip(qvs, flts)
+            ],
+        )
+        return [[Hit(p.payload["recipe_id"], p.score) for p in r.points] for r in resps]
+
+    async def asearch(self, qv: np.ndarray, limit: int, flt: Optional[SearchFilter] = None) -> List[Hit]:
+        if self.async_client is None:
+            return await super().asearch(qv, limit, flt)
+        resp = await self.async_client.query_points(
+            self.collection, query=qv, using="vector", limit=limit, with_payload=["recipe_id"],
+            query_filter=flt.to_qdrant() if flt else None,
+        )
+        return [Hit(p.payload["recipe_id"], p.score) for p in resp.points]
+
+    def ping(self) -> None:
+        self.client.get_collections()
+
+
+# ───────── NumPy 완전 탐색 ─────────────────────────────────
+Loader = Callable[[], Tuple[np.ndarray, np.ndarray, List[Dict]]]
+
+
+class _Snapshot(NamedTuple):
+    """검색 한 번이 보는 행렬 상태. 통째로 교체되므로 검색 도중 ids/행렬/컬럼이 섞이지 않음."""
+    ids:      np.ndarray
+    matrix:   np.ndarray
+    payloads: List[Dict]
+    columns:  Dict[str, np.ndarray]
+    row:      Dict[int, int]
+
+
+def _snapshot(ids: np.ndarray, matrix: np.ndarray, payloads: List[Dict]) -> _Snapshot:
+    # 필터용 컬럼 (값 없음 → None / NaN 이라 어떤 조건에도 맞지 않음)
+    columns = {f: np.array([p.get(f) for p in payloads], dtype=object) for f in KEYWORD_FIELDS}
+    columns.update({
+        f: np.array([np.nan if p.get(f) is None else p[f] for p in payloads], dtype=np.float64)
+        for f in RANGE_FIELDS
+    })
+    return _Snapshot(ids, matrix, payloads, columns, {int(i): n for n, i in enumerate(ids)})
+
+
+def _merge(state: _Snapshot, updates: Dict[int, Tuple[np.ndarray, Dict]]) -> _Snapshot:
+    """state 에 updates(recipe_id → (벡터, payload)) 를 한 번에 덮어쓰기/추가."""
+    if not updates:
+        return state
+    matrix = np.array(state.matrix)                        # mmap → 쓰기 가능한 복사본
+    if matrix.shape[0] == 0:
+        matrix = matrix.reshape(0, len(next(iter(updates.values()))[0]))
+    payloads = list(state.payloads)
+    new_ids, new_rows = [], []
+    for i, (v, p) in updates.items():
+        row = state.row.get(i)
+        if row is None:
+            new_ids.append(i)
+            new_rows.append(v)
+            payloads.append(p)
+        else:
+            matrix[row] = v
+            payloads[row] = p
+    ids = state.ids
+    if new_ids:
+        ids    = np.concatenate([state.ids, np.asarray(new_ids, dtype=np.int64)])
+        matrix = np.vstack([matrix, np.stack(new_rows)])
+    return _snapshot(ids, matrix, payloads)
+
+
+class NumpyStore(VectorStore):
+    """
+    (n, dim) float32 행렬을 .npy 파일로 두고 mmap 으로 열어 검색합니다.
+    recipe id 와 필터용 payload 는 옆 파일(.ids.npy / .payload.json)에 둡니다.
+    파일이 없으면 loader() (= RecipeEmbedding 전체) 로 만들고,
+    다른 프로세스가 파일을 갱신하면(mtime 변경) 다음 검색 때 다시 엽니다.
+    · upsert 는 배치를 .delta.jsonl 에 한 줄 덧붙이기만 함 (배치 크기만큼만 쓰기)
+    · flush() 가 base + delta 를 합쳐 행렬 파일을 한 번 다시 쓰고 delta 를 비움
+      → 임베딩 패스마다 1회 (재색인 때 배치마다 전체 행렬을 다시 쓰지 않음)
+    · 읽을 때는 base 뒤에 delta 를 적용 → flush 전에 프로세스가 죽어도 올린 벡터는 남음
+    """
+
+    def __init__(self, path: str, loader: Loader):
+        self.path    = path if path.endswith(".npy") else path + ".npy"
+        self.loader  = loader
+        self._state  = _snapshot(np.empty(0, dtype=np.int64), np.empty((0, 0), dtype=np.float32), [])
+        self._version: Optional[tuple] = None
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+
+    @property
+    def _ids_path(self) -> str:
+        return self.path[:-4] + ".ids.npy"
+
+    @property
+    def _payload_path(self) -> str:
+        return self.path[:-4] + ".payload.json"
+
+    @property
+    def _delta_path(self) -> str:
+        return self.path[:-4] + ".delta.jsonl"
+
+    def _file_version(self) -> Optional[tuple]:
+        """(base mtime, delta 크기). 둘 중 하나라도 바뀌면 다시 로드."""
+        try:
+            base = os.stat(self.path).st_mtime
+        except FileNotFoundError:
+            return None
+        try:
+            delta = os.stat(self._delta_path).st_size
+        except FileNotFoundError:
+            delta = 0
+        return base, delta
+
+    def _write(self, ids: np.ndarray, matrix: np.ndarray, payloads: List[Dict]) -> None:
+        # 쓰는 도중의 파일을 다른 프로세스가 읽지 않도록 임시 파일 → rename (행렬은 마지막에)
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        tmp = self._payload_path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(payloads, f, ensure_ascii=False)
+        os.replace(tmp, self._payload_path)
+        for dst, arr in ((self._ids_path, ids), (self.path, matrix)):
+            tmp = dst[:-4] + ".tmp.npy"
+            np.save(tmp, arr)
+            os.replace(tmp, dst)
+
+    def _read_delta(self) -> Dict[int, Tuple[np.ndarray, Dict]]:
+        updates: Dict[int, Tuple[np.ndarray, Dict]] = {}
+        try:
+            f = open(self._delta_path, encoding="utf-8")
+        except FileNotFoundError:
+            return updates
+        with f:
+            for line in f:
+                try:
+                    rec = json.loads(line)
+                except ValueError:
+                    continue                # 쓰다 만 마지막 줄
+                vecs = np.frombuffer(base64.b64decode(rec["vectors"]), dtype="<f4")
+                vecs = vecs.reshape(len(rec["ids"]), -1)
+                for i, v, p in zip(rec["ids"], vecs, rec["payloads"]):
+                    updates[int(i)] = (v, p)
+        return updates
+
+    def _load(self) -> None:
+        if not os.path.exists(self.path):
+            ids, matrix, payloads = self.loader()
+            self._write(ids, np.ascontiguousarray(matrix, dtype=np.float32), payloads)
+            log.info("벡터 행렬 생성: %d x %d → %s", *matrix.shape, self.path)
+        for _ in range(5):
+            version = self._file_version()
+            ids, matrix = np.load(self._ids_path), np.load(self.path, mmap_mode="r")
+            with open(self._payload_path, encoding="utf-8") as f:
+                payloads = json.load(f)
+            if len(ids) == matrix.shape[0] == len(payloads):
+                break
+            time.sleep(0.05)                # 다른 프로세스가 파일들을 교체하는 중
+        else:
+            # 어긋난 배열로 스냅샷을 만들지 않음. 이전 스냅샷이 있으면 그대로 쓰고 다음 검색 때 재시도
+            if self._version is None:
+                raise RuntimeError(
+                    f"벡터 파일 길이 불일치: ids {len(ids)}, 행렬 {matrix.shape[0]}, "
+                    f"payload {len(payloads)} ({self.path})"
+                )
+            log.warning("벡터 파일 길이 불일치 → 이전 스냅샷 유지 (%s)", self.path)
+            return
+        # 이미 base 에 들어간 delta 를 다시 적용해도 같은 결과 (recipe id 기준 덮어쓰기)
+        self._state, self._version = _merge(_snapshot(ids, matrix, payloads), self._read_delta()), version
+
+    def _ensure_loaded(self) -> None:
+        if self._version is None or self._file_version() != self._version:
+            with self._lock:
+                self._load()
+
+    def _snap(self) -> _Snapshot:
+        self._ensure_loaded()
+        with self._lock:
+            return self._state
+
+    def reset(self, dim: int) -> None:
+        with self._flush_lock, self._lock:
+            ids, matrix = np.empty(0, dtype=np.int64), np.empty((0, dim), dtype=np.float32)
+            self._write(ids, matrix, [])
+            if os.path.exists(self._delta_path):
+                os.remove(self._delta_path)
+            self._state, self._version = _snapshot(ids, matrix, []), self._file_version()
+
+    def upsert(self, ids: Sequence[int], vectors: np.ndarray, payloads: Sequence[Dict]) -> None:
+        vectors = np.ascontiguousarray(vectors, dtype="<f4")
+        line = json.dumps({
+            "ids":      [int(i) for i in ids],
+            "vectors":  base64.b64encode(vectors.tobytes()).decode("ascii"),
+            "payloads": list(payloads),
+        }, ensure_ascii=False)
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        with self._lock, open(self._delta_path, "a", encoding="utf-8") as f:
+            f.write(line + "\n")
+
+    def flush(self) -> None:
+        """delta 를 base 행렬에 합쳐 다시 쓰고 delta 를 비움."""
+        with self._flush_lock:
+            self._ensure_loaded()
+            with self._lock:
+                state, version = self._state, self._version
+            if not version or version[1] == 0:
+                return
+            self._write(state.ids, state.matrix, state.payloads)
+            with self._lock:
+                # 합치는 동안 덧붙은 배치가 있으면 delta 를 남겨 둠 (다음 로드/flush 때 적용)
+                if self._file_version()[1] == version[1]:
+                    os.remove(self._delta_path)
+                    self._version = self._file_version()
+            log.info("벡터 행렬 저장: %d x %d → %s", *state.matrix.shape, self.path)
+
+    @staticmethod
+    def _mask(state: _Snapshot, flt: SearchFilter) -> np.ndarray:
+        mask = np.ones(len(state.ids), dtype=bool)
+        for f in KEYWORD_FIELDS:
+            if getattr(flt, f) is not None:
+                mask &= state.columns[f] == getattr(flt, f)
+        for f in RANGE_FIELDS:
+            lo, hi = getattr(flt, f)
+            col = state.columns[f]
+            with np.errstate(invalid="ignore"):
+                if lo is not None:
+                    mask &= col >= lo
+                if hi is not None:
+                    mask &= col <= hi
+        return mask
+
+    def search(self, qv: np.ndarray, limit: int, flt: Optional[SearchFilter] = None) -> List[Hit]:
+        state = self._snap()
+        if state.matrix.shape[0] == 0:
+            return []
+        return self._top(state, state.matrix @ np.asarray(qv, dtype=np.float32), limit, flt)
+
+    def search_batch(self, qvs: np.ndarray, limit: int,
+                     flts: Optional[Sequence[Optional[SearchFilter]]] = None) -> List[List[Hit]]:
+        # 행렬 곱 한 번으로 (n, b) 점수 → 열마다 top-k
+        state = self._snap()
+        flts = flts or [None] * len(qvs)
+        if state.matrix.shape[0] == 0:
+            return [[] for _ in flts]
+        scores = state.matrix @ np.asarray(qvs, dtype=np.float32).T
+        return [self._top(state, scores[:, j], limit, flt) for j, flt in enumerate(flts)]
+
+    def _top(self, state: _Snapshot, scores: np.ndarray, limit: int,
+             flt: Optional[SearchFilter]) -> List[Hit]:
+        candidates = None
+        if flt is not None and not flt.is_empty():
+            candidates = np.flatnonzero(self._mask(state, flt))
+            scores = scores[candidates]
+        n = scores.shape[0]
+        if n == 0:
+            return []
+        k = min(limit, n)
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        rows = candidates[top] if candidates is not None else top
+        return [Hit(int(state.ids[r]), float(s)) for r, s in zip(rows, scores[top])]
+
+    def ping(self) -> None:
+        self._ensure_loaded()
+
+
+def create_store(backend: str, collection: str, *, qdrant_url: str, qdrant_path: str,
+                 mmap_path: str, loader: Loader) -> VectorStore:
+    if backend == "qdrant":
+        return QdrantStore(QdrantClient(qdrant_url), collection, AsyncQdrantClient(qdrant_url))
+    if backend == "qdrant-local":
+        client = QdrantClient(":memory:") if qdrant_path == ":memory:" else QdrantClient(path=qdrant_path)
+        return QdrantStore(client, collection)
+    if backend == "numpy":
+        return NumpyStore(mmap_path, loader)
+    raise ValueError(f"알 수 없는 벡터 백엔드: {backend} (가능: qdrant, qdrant-local, numpy)")
@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+"""
+worker.py
+──────────────────────────────────────────────────
+· ingest_jobs 작업 큐(app/jobs.py)를 처리하는 독립 프로세스
+    $ python worker.py                    # WORKER_CONCURRENCY 개 슬롯
+    $ python worker.py --concurrency 8
+    $ python worker.py --once             # 실행 가능한 작업이 없을 때까지 처리 후 종료
+· 식약처 API 수집 / DB 삽입 / 임베딩이 API 서버(uvicorn) 프로세스의 CPU·스레드를 쓰지 않음
+  → 재료 추가가 몰려도 추천 응답 지연에 영향 없음, 워커 수는 따로 늘릴 수 있음
+· 슬롯마다 스레드 하나: claim → 처리기 실행 → complete / fail(backoff 후 재시도)
+· heartbeat 스레드가 JOB_HEARTBEAT_SEC 마다 실행 중인 작업의 임대를 연장
+  → 오래 걸리는 작업도 다른 워커가 중복으로 가져가지 않음
+· embed-sweep 스레드가 시작 시 한 번, 그 뒤 EMBED_SWEEP_SEC 마다 embed_new_recipes() 워터마크 패스
+  → 실패/유실된 임베딩 요청으로 생긴 빈틈을 복구 (0 이면 끔)
+· SIGTERM/SIGINT: 새 작업은 받지 않고 진행 중인 작업을 끝낸 뒤 종료
+──────────────────────────────────────────────────
+"""
+from __future__ import annotations
+
+import argparse
+import logging
+import os
+import signal
+import socket
+import threading
+from typing import Callable, Dict
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from app.db import init_db
+from app.ingredient_fetch import INGREDIENT_JOB, run_ingredient_job
+from app.jobs import JOB_HEARTBEAT_SEC, claim, complete, fail, renew
+from recipe_rag_pipeline import EMBED_JOB, embed_new_recipes, run_embed_job
+
+WORKER_CONCURRENCY = int(os.getenv("WORKER_CONCURRENCY", "4"))
+WORKER_POLL_SEC    = float(os.getenv("WORKER_POLL_SEC", "1"))
+EMBED_SWEEP_SEC    = float(os.getenv("EMBED_SWEEP_SEC", "300"))
+
+log = logging.getLogger("worker")
+
+# kind → 처리기 (payload → result dict, 예외는 재시도 대상)
+HANDLERS: Dict[str, Callable[[Dict], Dict]] = {
+    INGREDIENT_JOB: run_ingredient_job,
+    EMBED_JOB:      run_embed_job,
+}
+
+
+class Worker:
+    def __init__(self, concurrency: int = WORKER_CONCURRENCY, poll_sec: float = WORKER_POLL_SEC,
+                 once: bool = False):
+        self.concurrency = concurrency
+        self.poll_sec    = poll_sec
+        self.once        = once
+        self.name        = f"{socket.gethostname()}:{os.getpid()}"
+        self.stats       = {"done": 0, "retried": 0, "failed": 0}
+        self._stop       = threading.Event()
+        self._lock       = threading.Lock()
+        self._running: Dict[int, tuple] = {}     # job.id → (job, worker_id)
+
+    def stop(self, *_):
+        if not self._stop.is_set():
+            log.info("종료 요청 – 진행 중인 작업을 마치고 종료합니다")
+        self._stop.set()
+
+    def _count(self, key: str):
+        with self._lock:
+            self.stats[key] += 1
+
+    def _heartbeat(self, done: threading.Event) -> None:
+        while not done.wait(JOB_HEARTBEAT_SEC):
+            with self._lock:
+                running = list(self._running.values())
+            for job, worker_id in running:
+                try:
+                    if not renew(job, worker_id):
+                        log.warning("작업 %s 임대를 잃음 – 결과는 반영되지 않습니다", job.id)
+                except Exception:
+                    log.exception("작업 %s 임대 연장 실패", job.id)
+
+    def _sweep(self, done: threading.Event) -> None:
+        while True:
+            try:
+                n = embed_new_recipes()
+                if n:
+                    log.info("주기 임베딩 패스: 누락 레시피 %d건 임베딩", n)
+            except Exception:
+                log.exception("주기 임베딩 패스 실패")
+            if done.wait(EMBED_SWEEP_SEC):
+                return
+
+    def run_one(self, job, worker_id: str) -> None:
+        handler = HANDLERS.get(job.kind)
+        with self._lock:
+            self._running[job.id] = (job, worker_id)
+        try:
+            if handler is None:
+                raise ValueError(f"unknown job kind: {job.kind}")
+            result = handler(job.payload)
+        except Exception as e:
+            log.warning("작업 %s(%s) 실패 (%d/%d회): %s",
+                        job.id, job.kind, job.attempts, job.max_attempts, e)
+            with self._lock:
+                self._running.pop(job.id, None)
+            fail(job, worker_id, f"{type(e).__name__}: {e}")
+            self._count("failed" if job.attempts >= job.max_attempts else "retried")
+            return
+        with self._lock:
+            self._running.pop(job.id, None)
+        if complete(job, worker_id, result):
+            self._count("done")
+        else:
+            log.warning("작업 %s 는 다른 워커로 넘어가 완료 처리하지 않았습니다", job.id)
+
+    def _loop(self, slot: int) -> None:
+        worker_id = f"{self.name}:{slot}"
+        while not self._stop.is_set():
+            try:
+                jobs = claim(worker_id)
+            except Exception:
+                log.exception("작업 조회 실패 – %.0f초 후 재시도", self.poll_sec)
+                self._stop.wait(self.poll_sec)
+                continue
+            if not jobs:
+                if self.once:
+                    return
+                self._stop.wait(self.poll_sec)
+                continue
+            for job in jobs:
+                self.run_one(job, worker_id)
+
+    def run(self) -> Dict[str, int]:
+        log.info("워커 %s 시작 (concurrency=%d)", self.name, self.concurrency)
+        threads = [threading.Thread(target=self._loop, args=(i,), name=f"job-{i}")
+                   for i in range(self.concurrency)]
+        beat_done = threading.Event()
+        beat = threading.Thread(target=self._heartbeat, args=(beat_done,), name="job-heartbeat",
+                                daemon=True)
+        beat.start()
+        sweep = None
+        if EMBED_SWEEP_SEC > 0:
+            sweep = threading.Thread(target=self._sweep, args=(beat_done,), name="embed-sweep",
+                                     daemon=True)
+            sweep.start()
+        for t in threads:
+            t.start()
+        for t in threads:
+            # join(timeout) 반복 → 메인 스레드가 시그널을 받을 수 있게
+            while t.is_alive():
+                t.join(timeout=1)
+        beat_done.set()
+        if sweep is not None:
+            sweep.join()                    # 진행 중인 패스는 끝까지
+        log.info("워커 %s 종료: %s", self.name, self.stats)
+        return self.stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="백그라운드 수집 작업 워커")
+    parser.add_argument("--concurrency", type=int, default=WORKER_CONCURRENCY,
+                        help="동시에 처리할 작업 수 (스레드)")
+    parser.add_argument("--poll", type=float, default=WORKER_POLL_SEC,
+                        help="작업이 없을 때 다시 조회하기까지 대기(초)")
+    parser.add_argument("--once", action="store_true",
+                        help="실행 가능한 작업을 모두 처리하면 종료")
+    args = parser.parse_args()
+
+    init_db()
+    worker = Worker(args.concurrency, args.poll, args.once)
+    signal.signal(signal.SIGTERM, worker.stop)
+    signal.signal(signal.SIGINT, worker.stop)
+    worker.run()
+
+
+if __name__ == "__main__":
+    main()